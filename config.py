@@ -39,3 +39,107 @@ ADMIN_IDS = os.getenv('ADMIN_IDS', '').split(',') if os.getenv('ADMIN_IDS') else
 
 # ID группы для логов и уведомлений
 LOG_GROUP_ID = os.getenv('LOG_GROUP_ID', '')
+# Уведомления клиенту о смене статуса заказа объединяются: сообщение уходит после
+# NOTIFY_COALESCE_MS мс без новых изменений, но не позже NOTIFY_COALESCE_MAX_MS от первого
+# (0 - отправлять каждое изменение сразу)
+NOTIFY_COALESCE_MS = float(os.getenv('NOTIFY_COALESCE_MS', '1500'))
+NOTIFY_COALESCE_MAX_MS = float(os.getenv('NOTIFY_COALESCE_MAX_MS', '10000'))
+# Общий клиент Telegram для отправки из синхронного кода (уведомления, логи в группу):
+# одновременных запросов и ожидающих отправок (на каждый класс приоритета - уведомления,
+# логи в группу, рассылки) и сколько мс ждать места в полной очереди
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv('TELEGRAM_SEND_CONCURRENCY', '8'))
+TELEGRAM_MAX_PENDING = int(os.getenv('TELEGRAM_MAX_PENDING', '1000'))
+TELEGRAM_SUBMIT_TIMEOUT_MS = float(os.getenv('TELEGRAM_SUBMIT_TIMEOUT_MS', '1000'))
+# Лимиты частоты отправки в Telegram: сообщений в секунду всего и в личный чат,
+# сообщений в минуту в группу. Лимит ~30 сообщений/с общий на токен, а бот и
+# веб-приложение - разные процессы, поэтому он делится между ними (сумма - не больше 30);
+# скрипты (scripts/broadcast.py) расходуют долю веб-приложения
+TELEGRAM_BOT_GLOBAL_RATE = float(os.getenv('TELEGRAM_BOT_GLOBAL_RATE', '20'))
+TELEGRAM_WEBAPP_GLOBAL_RATE = float(os.getenv('TELEGRAM_WEBAPP_GLOBAL_RATE', '10'))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+TELEGRAM_GROUP_RATE_PER_MIN = float(os.getenv('TELEGRAM_GROUP_RATE_PER_MIN', '20'))
+# Рассылки клиентам: получателей на страницу (контрольная точка после каждой),
+# сообщений рассылки в очереди клиента Telegram одновременно и через сколько секунд
+# без прогресса рассылка считается брошенной и продолжается другим процессом
+BROADCAST_PAGE_SIZE = int(os.getenv('BROADCAST_PAGE_SIZE', '100'))
+BROADCAST_WINDOW = int(os.getenv('BROADCAST_WINDOW', '20'))
+BROADCAST_STALE_SECONDS = float(os.getenv('BROADCAST_STALE_SECONDS', '120'))
+
+# Конкурентная обработка апдейтов бота
+# Сколько апдейтов обрабатывается одновременно (апдейты одного чата - всегда по очереди)
+BOT_CONCURRENT_UPDATES = int(os.getenv('BOT_CONCURRENT_UPDATES', '32'))
+# Сколько тяжелых обработчиков (списки, статистика) может выполняться одновременно
+BOT_HEAVY_HANDLER_LIMIT = int(os.getenv('BOT_HEAVY_HANDLER_LIMIT', '4'))
+
+# Постраничный просмотр списков в боте
+BOT_PAGE_SIZE = int(os.getenv('BOT_PAGE_SIZE', '10'))
+# Сколько секунд страница списка хранится в кэше пользователя
+BOT_PAGE_CACHE_TTL = float(os.getenv('BOT_PAGE_CACHE_TTL', '15'))
+
+# Пакетный импорт заказов (строк в одной транзакции / максимум строк в файле)
+ORDER_IMPORT_CHUNK_SIZE = int(os.getenv('ORDER_IMPORT_CHUNK_SIZE', '500'))
+ORDER_IMPORT_MAX_ROWS = int(os.getenv('ORDER_IMPORT_MAX_ROWS', '10000'))
+
+# Архив завершенных заказов (отдельный файл SQLite рядом с основной БД)
+ARCHIVE_DATABASE_PATH = os.getenv(
+    'ARCHIVE_DATABASE_PATH',
+    str(Path(DATABASE_PATH).with_name(Path(DATABASE_PATH).stem + '_archive.db'))
+)
+# Через сколько дней после последнего изменения заказ в конечном статусе уходит в архив
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+# Сколько заказов переносится одной транзакцией
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '200'))
+
+# Пакетный прием событий отслеживания от перевозчиков (POST /api/tracking/bulk)
+# Токен перевозчика передается в заголовке Authorization: Bearer <token>
+CARRIER_API_TOKEN = os.getenv('CARRIER_API_TOKEN', '')
+TRACKING_BULK_CHUNK_SIZE = int(os.getenv('TRACKING_BULK_CHUNK_SIZE', '1000'))
+TRACKING_BULK_MAX_EVENTS = int(os.getenv('TRACKING_BULK_MAX_EVENTS', '10000'))
+
+# Онлайн-резервное копирование БД (scripts/backup_db.py)
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'data/backups')
+# Сколько последних копий хранить для каждого файла БД
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '7'))
+# Страниц за один шаг копирования и пауза между шагами (сек), чтобы не блокировать запись
+BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', '256'))
+BACKUP_STEP_SLEEP = float(os.getenv('BACKUP_STEP_SLEEP', '0.05'))
+# Сколько раз пошаговое копирование может начаться заново из-за записи в БД,
+# прежде чем остаток копируется одним шагом (короткая транзакция чтения)
+BACKUP_MAX_RESTARTS = int(os.getenv('BACKUP_MAX_RESTARTS', '3'))
+# Интервал копирования в режиме schedule (часы) и сжатие копий gzip
+BACKUP_INTERVAL_HOURS = float(os.getenv('BACKUP_INTERVAL_HOURS', '24'))
+BACKUP_COMPRESS = os.getenv('BACKUP_COMPRESS', '0') == '1'
+
+# Режим журнала WAL: чтения не блокируются записью
+DATABASE_WAL = os.getenv('DATABASE_WAL', '1') == '1'
+# Пул соединений только для чтения (GET-маршруты и экраны просмотра в боте)
+DB_READ_POOL_SIZE = int(os.getenv('DB_READ_POOL_SIZE', '4'))
+# Сколько секунд ждать свободное соединение, после чего чтение идет обычным путем
+DB_READ_POOL_TIMEOUT = float(os.getenv('DB_READ_POOL_TIMEOUT', '5'))
+# Все записи процесса идут через поток-писатель своего шарда с групповой фиксацией (0 - каждый
+# вызов пишет своим соединением). Пачка - не больше DB_WRITE_BATCH_MAX операций;
+# DB_WRITE_BATCH_WAIT_MS - сколько добирать операции в пачку после первой
+DB_WRITE_QUEUE = os.getenv('DB_WRITE_QUEUE', '1') == '1'
+DB_WRITE_BATCH_MAX = int(os.getenv('DB_WRITE_BATCH_MAX', '64'))
+DB_WRITE_BATCH_WAIT_MS = float(os.getenv('DB_WRITE_BATCH_WAIT_MS', '0'))
+# Сколько секунд ждать блокировку записи, занятую другим процессом, и сколько раз
+# повторить пачку после "database is locked"
+DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', '5'))
+DB_WRITE_RETRIES = int(os.getenv('DB_WRITE_RETRIES', '5'))
+# Число шардов заказов: заказы с отслеживанием, чатом, платежами и тикетами раскладываются
+# по файлам по хэшу client_id. 1 - одна БД. На работающей БД число шардов не меняют
+# (кроме первого включения): заказы клиента ищутся в шарде, вычисленном по текущему числу
+DB_SHARDS = max(1, int(os.getenv('DB_SHARDS', '1')))
+# Кэши пользователей и сессий в процессе; бот и веб-приложение сбрасывают в них измененные
+# другим процессом ключи по таблице changes, опрашивая БД каждые DB_CHANGES_POLL_MS мс.
+# DB_CHANGES_KEEP - сколько последних изменений хранить, DB_CACHE_SIZE=0 - без кэша
+DB_CHANGES_POLL_MS = float(os.getenv('DB_CHANGES_POLL_MS', '20'))
+DB_CHANGES_KEEP = int(os.getenv('DB_CHANGES_KEEP', '10000'))
+DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', '2048'))
+# Кэш ответов GET-маршрутов веб-приложения (заказ с отслеживанием, тикеты, статистика):
+# бюджет памяти в МБ, 0 - без кэша. Ответы сбрасываются по тегам изменений из таблицы changes
+RESPONSE_CACHE_MB = float(os.getenv('RESPONSE_CACHE_MB', '32'))
+RESPONSE_CACHE_BYTES = int(RESPONSE_CACHE_MB * 1024 * 1024)
+
+# Сколько заказов отдает GET /api/bootstrap на стартовом экране WebApp
+WEBAPP_BOOTSTRAP_ORDERS = int(os.getenv('WEBAPP_BOOTSTRAP_ORDERS', '20'))
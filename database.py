@@ -1,68 +1,414 @@
+import atexit
+import heapq
 import sqlite3
+import json
 import os
-from typing import Optional, List, Tuple
-from config import DATABASE_PATH
-from models.user import UserRole
+import threading
+import uuid
+import zlib
+from contextlib import contextmanager
+from operator import itemgetter
+from pathlib import Path
+from typing import Optional, List, Sequence, Tuple
+from config import (
+    DATABASE_PATH, ARCHIVE_DATABASE_PATH, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE,
+    DATABASE_WAL, DB_READ_POOL_SIZE, DB_READ_POOL_TIMEOUT, DB_SHARDS,
+    DB_WRITE_QUEUE, DB_WRITE_BATCH_MAX, DB_WRITE_BATCH_WAIT_MS, DB_BUSY_TIMEOUT, DB_WRITE_RETRIES,
+    DB_CHANGES_POLL_MS, DB_CHANGES_KEEP, DB_CACHE_SIZE, NOTIFY_COALESCE_MS, NOTIFY_COALESCE_MAX_MS,
+    RESPONSE_CACHE_BYTES
+)
+from models.records import Record, fetch_records, record_type
+from models.user import User, UserRole
+from db_pool import ReadOnlyPool, read_lane_active
+from db_writer import WriteQueue
+from db_changes import ChangeFeed, InvalidatingCache, record_changes
+from db_singleflight import SingleFlight
+from utils.notification_coalescer import NotificationCoalescer, format_updates
+
+# Значение db_path для БД в памяти
+MEMORY_DATABASE = ':memory:'
+# Конечные статусы заказа: такие заказы больше не меняются и могут уйти в архив
+ARCHIVE_STATUSES = ('delivered', 'completed', 'cancelled')
+# Порядок статусов заказа: пакетные события отслеживания двигают статус только вперед
+ORDER_STATUS_FLOW = ('pending', 'accepted', 'in_transit', 'delivered', 'completed')
+# Таблицы, которые переносятся в архив вместе с заказом (таблица, колонка с id заказа)
+ARCHIVE_TABLES = (
+    ('orders', 'id'),
+    ('tracking', 'order_id'),
+    ('chat_messages', 'order_id'),
+    ('payments', 'order_id'),
+    ('tickets', 'order_id'),
+)
+# Колонки заказа, которые можно запросить через fields=
+ORDER_COLUMNS = (
+    'id', 'client_id', 'manager_id', 'status', 'description', 'from_address', 'to_address',
+    'from_contact', 'to_contact', 'weight', 'price', 'payment_status', 'payment_method',
+    'tracking_number', 'offer_price', 'offer_currency', 'offer_delivery_days', 'offer_comment',
+    'offer_status', 'created_at', 'updated_at'
+)
+# Краткое представление заказа для списков (view=summary): целиком читается из индексов
+# idx_orders_client_summary / idx_orders_manager_summary, без обращения к строкам таблицы
+ORDER_SUMMARY_FIELDS = ('id', 'tracking_number', 'status', 'client_id', 'manager_id', 'price', 'created_at')
+# Поля тикета в ответе и соответствующие им выражения запроса
+TICKET_COLUMNS = {
+    'id': 't.id',
+    'order_id': 't.order_id',
+    'manager_id': 't.manager_id',
+    'status': 't.status',
+    'assigned_at': 't.assigned_at',
+    'accepted_at': 't.accepted_at',
+    'client_id': 'o.client_id',
+    'description': 'o.description',
+    'from_address': 'o.from_address',
+    'to_address': 'o.to_address',
+    'price': 'o.price',
+    'order_status': 'o.status',
+    'tracking_number': 'o.tracking_number',
+    'order_created_at': 'o.created_at',
+}
+# Прежние имена полей тикета, которые по-прежнему отдаются в полном представлении
+TICKET_LEGACY_COLUMNS = {
+    'ticket_id': 't.id',
+    'ticket_status': 't.status',
+    'order_id_full': 'o.id',
+}
+TICKET_SUMMARY_FIELDS = ('id', 'order_id', 'status', 'assigned_at', 'order_status', 'tracking_number', 'price')
+# Записей журнала изменений заказов в одном ответе GET /api/sync (на шард)
+ORDER_SYNC_LIMIT = 500
+# Шардирование: у каждого шарда свой диапазон id заказов, тикетов, платежей и т.д.
+# (шард k выдает id начиная с k * SHARD_ID_SPAN), поэтому шард строки определяется по ее id
+SHARD_ID_SPAN = 10 ** 12
+# Сколько раз пачка импорта повторяется с новыми tracking number при совпадении
+TRACKING_NUMBER_ATTEMPTS = 3
+SHARDED_TABLES = ('orders', 'tickets', 'tracking', 'payments', 'chat_messages', 'order_changes')
+
+
+def shard_file_path(db_path: str, shard: int) -> str:
+    """Файл шарда: шард 0 - основная БД, остальные - <имя>_shard<k> рядом с ней"""
+    if shard == 0:
+        return db_path
+    path = Path(db_path)
+    return str(path.with_name(f'{path.stem}_shard{shard}{path.suffix}'))
+
+
+def select_fields(fields: Optional[Sequence[str]], allowed: Sequence[str]) -> Optional[List[str]]:
+    """
+    Проверяет запрошенный набор полей: None - все поля, иначе список без повторов,
+    всегда начинающийся с id. Неизвестное поле - ValueError.
+    """
+    if fields is None:
+        return None
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(['id', *fields]))
 
 
 class Database:
-    def __init__(self):
-        self.db_path = DATABASE_PATH
-        # Создаем директорию для БД, если её нет
-        db_dir = os.path.dirname(self.db_path)
-        if db_dir and not os.path.exists(db_dir):
-            os.makedirs(db_dir, exist_ok=True)
-        self.init_database()
-    
-    def get_connection(self):
-        """Создает и возвращает соединение с базой данных"""
-        conn = sqlite3.connect(self.db_path)
+    def __init__(self, db_path: Optional[str] = None, template: Optional['Database'] = None,
+                 shards: Optional[int] = None):
+        """
+        db_path - путь к файлу БД (по умолчанию DATABASE_PATH).
+        ':memory:' - БД в памяти с общим кэшем: все соединения объекта видят одни данные,
+        БД живет, пока жив объект. template - БД, копия которой снимается через backup API
+        вместо создания схемы (быстрое клонирование заготовки для тестов и замеров).
+        shards - число шардов заказов (по умолчанию DB_SHARDS, у копии - как у template).
+        """
+        self.db_path = db_path or DATABASE_PATH
+        self.archive_path = ARCHIVE_DATABASE_PATH
+        self.in_memory = self.db_path == MEMORY_DATABASE or template is not None
+        if shards is None:
+            shards = template.shard_count if template is not None else DB_SHARDS
+        self.shard_count = max(1, shards)
+        self._memory_anchors = []
+        if self.in_memory:
+            name = f'logistics_{uuid.uuid4().hex}'
+            self.db_path = f'file:{name}?mode=memory&cache=shared'
+            self.archive_path = f'file:{name}_archive?mode=memory&cache=shared'
+            self.shard_paths = [self.db_path] + [
+                f'file:{name}_shard{shard}?mode=memory&cache=shared' for shard in range(1, self.shard_count)
+            ]
+            # БД в памяти существует, пока открыто хотя бы одно соединение с ней
+            self._memory_anchors = [
+                sqlite3.connect(path, uri=True, check_same_thread=False)
+                for path in (self.db_path, self.archive_path, *self.shard_paths[1:])
+            ]
+        else:
+            # Создаем директорию для БД, если её нет
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir and not os.path.exists(db_dir):
+                os.makedirs(db_dir, exist_ok=True)
+            self.shard_paths = [shard_file_path(self.db_path, shard) for shard in range(self.shard_count)]
+
+        if template is not None:
+            for source_path, anchor in zip(template._source_paths(), self._memory_anchors):
+                if source_path is None:
+                    continue
+                source = sqlite3.connect(source_path, uri=template.in_memory)
+                try:
+                    source.backup(anchor)
+                finally:
+                    source.close()
+        else:
+            self.init_database()
+        # В памяти с общим кэшем читатель в транзакции блокирует запись - пул не используется
+        pool_size = 0 if self.in_memory else DB_READ_POOL_SIZE
+        self.read_pool = ReadOnlyPool(self.db_path, pool_size, DB_READ_POOL_TIMEOUT)
+        self._shard_pools = [ReadOnlyPool(path, pool_size, DB_READ_POOL_TIMEOUT) for path in self.shard_paths[1:]]
+        self.writer = WriteQueue(
+            self._connect_writer, DB_WRITE_BATCH_MAX, DB_WRITE_BATCH_WAIT_MS / 1000, DB_WRITE_RETRIES
+        ) if DB_WRITE_QUEUE else None
+        # Ключи изменений (своих и записанных другим процессом) сбрасываются в кэше БД
+        # и в кэше ответов веб-приложения; БД в памяти видна только этому процессу,
+        # опрос ей не нужен
+        self.changes = ChangeFeed(self.get_connection, self.shard_count, DB_CHANGES_POLL_MS / 1000,
+                                  poll=not self.in_memory and (DB_CACHE_SIZE > 0 or RESPONSE_CACHE_BYTES > 0))
+        self.cache = InvalidatingCache(self.changes, DB_CACHE_SIZE)
+        # Одинаковые одновременные тяжелые чтения выполняются один раз
+        self.flights = SingleFlight()
+        self.changes.subscribe(self.flights.forget)
+        # Смены статуса одного заказа за короткое окно уходят клиенту одним сообщением
+        self.notifier = NotificationCoalescer(
+            self._send_order_notification, NOTIFY_COALESCE_MS / 1000, NOTIFY_COALESCE_MAX_MS / 1000
+        )
+
+    def clone(self) -> 'Database':
+        """Новая БД в памяти с копией схемы и данных этой БД"""
+        return type(self)(MEMORY_DATABASE, template=self)
+
+    def close(self) -> None:
+        """
+        Отправляет накопленные уведомления, дожидается очереди записи, закрывает пулы
+        чтения; БД в памяти при этом освобождается
+        """
+        self.notifier.close()
+        if self.writer is not None:
+            self.writer.close()
+        self.changes.close()
+        self.read_pool.close()
+        for pool in self._shard_pools:
+            pool.close()
+        for anchor in self._memory_anchors:
+            anchor.close()
+        self._memory_anchors = []
+
+    def _source_paths(self) -> Tuple[Optional[str], ...]:
+        """Основная БД, архив (None, если файла архива нет) и шарды для копирования"""
+        if self.in_memory:
+            return (self.db_path, self.archive_path, *self.shard_paths[1:])
+        archive_path = self.archive_path if os.path.exists(self.archive_path) else None
+        return (self.db_path, archive_path, *self.shard_paths[1:])
+    
+    def get_connection(self, shard: int = 0):
+        """Создает и возвращает соединение с базой данных (shard - номер шарда заказов)"""
+        conn = sqlite3.connect(self.shard_paths[shard], uri=self.in_memory, timeout=DB_BUSY_TIMEOUT)
         conn.row_factory = sqlite3.Row
         return conn
-    
-    def init_database(self):
-        """Инициализирует базу данных и создает необходимые таблицы"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Создаем таблицу пользователей с ролью
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                role TEXT DEFAULT 'client',
-                privacy_accepted INTEGER DEFAULT 0,
-                notifications_enabled INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Добавляем колонку privacy_accepted если её нет (для существующих БД)
+
+    def _connect_writer(self, shard: int) -> sqlite3.Connection:
+        """Соединение потока-писателя (живет, пока работает очередь записи)"""
+        conn = sqlite3.connect(self.shard_paths[shard], uri=self.in_memory, timeout=DB_BUSY_TIMEOUT,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _write(self, operation, shard: int = 0, keys: Sequence[str] = (), orders=None):
+        """
+        Выполняет запись operation(cursor) в шарде одной транзакцией и возвращает ее результат:
+        через очередь записи процесса (групповая фиксация) или, если она выключена,
+        отдельным соединением. operation не фиксирует транзакцию сама.
+
+        keys - ключи изменений записи; orders - id затронутых заказов (или функция
+        от результата, возвращающая их): для них добавляются ключи заказа, клиента и
+        менеджера до и после записи. Ключи пишутся в changes той же транзакцией и после
+        фиксации сбрасываются в кэшах процесса.
+        """
+        touched = set()
+
+        def tracked(cursor):
+            touched.clear()
+            if orders is not None and not callable(orders):
+                touched.update(self._order_keys(cursor, orders))
+            result = operation(cursor)
+            touched.update(keys)
+            if callable(orders):
+                touched.update(self._order_keys(cursor, orders(result)))
+            elif orders is not None:
+                # Менеджер заказа мог смениться - сбрасываются и прежний, и новый
+                touched.update(self._order_keys(cursor, orders))
+            record_changes(cursor, touched, DB_CHANGES_KEEP)
+            return result
+
+        if self.writer is not None:
+            result = self.writer.execute(tracked, shard)
+        else:
+            conn = self.get_connection(shard)
+            try:
+                result = tracked(conn.cursor())
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+        self.changes.publish(touched)
+        return result
+
+    @staticmethod
+    def _order_keys(cursor, order_ids: Sequence[int]) -> set:
+        """Ключи изменений заказов: order:<id>, user:<клиент>, manager:<менеджер> и orders (любой заказ)"""
+        order_ids = [order_id for order_id in order_ids if order_id]
+        if not order_ids:
+            return set()
+        keys = {'orders', *(f'order:{order_id}' for order_id in order_ids)}
+        cursor.execute(
+            'SELECT client_id, manager_id FROM orders WHERE id IN (SELECT value FROM json_each(?))',
+            (json.dumps(order_ids),)
+        )
+        for client_id, manager_id in cursor.fetchall():
+            keys.add(f'user:{client_id}')
+            if manager_id:
+                keys.add(f'manager:{manager_id}')
+        return keys
+
+    @staticmethod
+    def _order_managers(cursor, order_ids: Sequence[int]) -> dict:
+        """Текущие менеджеры заказов {order_id: manager_id} (до записи, меняющей назначение)"""
+        cursor.execute(
+            'SELECT id, manager_id FROM orders WHERE id IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(order_ids)),)
+        )
+        return {order_id: manager_id for order_id, manager_id in cursor.fetchall()}
+
+    @staticmethod
+    def _log_order_changes(cursor, kind: str, order_ids: Sequence[int],
+                           previous_managers: Optional[dict] = None) -> None:
+        """
+        Добавляет записи в журнал order_changes в текущей транзакции. Клиент и менеджер
+        берутся из заказа после записи; previous_managers - менеджеры до нее: прежний
+        менеджер тоже получает изменение и узнает, что заказ ушел из его списка.
+        """
+        if not order_ids:
+            return
+        previous_managers = previous_managers or {}
+        cursor.execute(
+            'SELECT id, client_id, manager_id FROM orders WHERE id IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(order_ids)),)
+        )
+        cursor.executemany('''
+            INSERT INTO order_changes (order_id, kind, client_id, manager_id, previous_manager_id)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (order_id, kind, client_id, manager_id,
+             previous_managers.get(order_id) if previous_managers.get(order_id) != manager_id else None)
+            for order_id, client_id, manager_id in cursor.fetchall()
+        ])
+
+    def get_read_connection(self, shard: int = 0):
+        """
+        Соединение для чтения: внутри read_lane (GET-маршруты, экраны просмотра)
+        берется из пула только-чтения, иначе - обычное соединение.
+        """
+        if read_lane_active():
+            conn = (self.read_pool if shard == 0 else self._shard_pools[shard - 1]).acquire()
+            if conn is not None:
+                return conn
+        return self.get_connection(shard)
+
+    @contextmanager
+    def _read_cursor(self, shard: int = 0):
+        """Курсор соединения для чтения; соединение возвращается в пул и при ошибке запроса"""
+        conn = self.get_read_connection(shard)
         try:
-            cursor.execute('ALTER TABLE users ADD COLUMN privacy_accepted INTEGER DEFAULT 0')
-        except sqlite3.OperationalError:
-            pass  # Колонка уже существует
-        
-        # Добавляем колонку notifications_enabled если её нет
+            yield conn.cursor()
+        finally:
+            conn.close()
+
+    def shard_for_client(self, client_id: int) -> int:
+        """Шард заказов клиента: стабильный хэш client_id"""
+        if self.shard_count == 1:
+            return 0
+        return zlib.crc32(str(client_id).encode()) % self.shard_count
+
+    def shard_for_id(self, row_id) -> int:
+        """Шард строки по ее id (заказ, тикет, платеж): у каждого шарда свой диапазон id"""
+        if self.shard_count == 1:
+            return 0
         try:
-            cursor.execute('ALTER TABLE users ADD COLUMN notifications_enabled INTEGER DEFAULT 0')
-        except sqlite3.OperationalError:
-            pass  # Колонка уже существует
-        
-        # Создаем таблицу для хранения данных пользователей
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                data_key TEXT,
-                data_value TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
-            )
-        ''')
+            return min(max(int(row_id), 0) // SHARD_ID_SPAN, self.shard_count - 1)
+        except (TypeError, ValueError):
+            return 0
+
+    def _scope_shards(self, user_id: int, role: str) -> List[int]:
+        """Шарды, в которых лежат заказы, видимые пользователю"""
+        if role == UserRole.CLIENT:
+            # Заказы, созданные до включения шардирования, остаются в основном файле
+            return sorted({0, self.shard_for_client(user_id)})
+        return list(range(self.shard_count))
+
+    @contextmanager
+    def _shard_cursors(self, shards: Sequence[int], cursor=None):
+        """
+        Курсоры чтения по списку шардов (scatter-gather). Если передан cursor,
+        он используется для шарда 0 - тогда чтения основной БД идут в том же снимке.
+        """
+        connections = []
+        cursors = []
+        try:
+            for shard in shards:
+                if shard == 0 and cursor is not None:
+                    cursors.append(cursor)
+                    continue
+                conn = self.get_read_connection(shard)
+                connections.append(conn)
+                cursors.append(conn.cursor())
+            yield cursors
+        finally:
+            for conn in connections:
+                conn.close()
+
+    def _gather(self, shards: Sequence[int], fetch, cursor=None) -> list:
+        """Выполняет fetch(cursor) на каждом шарде, результаты - в порядке шардов"""
+        with self._shard_cursors(shards, cursor) as cursors:
+            return [fetch(shard_cursor) for shard_cursor in cursors]
+
+    @staticmethod
+    def _merge_sorted(parts: List[list], key, limit: Optional[int] = None, reverse: bool = True) -> list:
+        """Сливает отсортированные по key списки шардов в один (по умолчанию новые сверху)"""
+        if len(parts) == 1:
+            rows = parts[0]
+        else:
+            rows = list(heapq.merge(*parts, key=key, reverse=reverse))
+        return rows if limit is None else rows[:limit]
+
+    @staticmethod
+    def _sort_columns(columns: Optional[List[str]], key: str, shards: Sequence[int]) -> Optional[List[str]]:
+        """Проекция для чтения с нескольких шардов: поле сортировки нужно для слияния"""
+        if columns is None or key in columns or len(shards) == 1:
+            return columns
+        return columns + [key]
+
+    @staticmethod
+    def _project(rows: List[Record], columns: Optional[List[str]]) -> List[Record]:
+        """Убирает из записей поля, добавленные только для слияния (они идут последними)"""
+        if not rows or columns is None or len(rows[0]) == len(columns):
+            return rows
+        cls = record_type(tuple(columns))
+        size = len(columns)
+        return [cls._make(row[:size]) for row in rows]
+
+    def init_database(self):
+        """Инициализирует базу данных и создает необходимые таблицы во всех шардах"""
+        for shard in range(self.shard_count):
+            self._init_schema(shard)
+
+    def _init_schema(self, shard: int = 0):
+        conn = self.get_connection(shard)
+        cursor = conn.cursor()
+
+        if DATABASE_WAL and not self.in_memory:
+            # Читатели видят последний снимок и не ждут пишущее соединение
+            cursor.execute('PRAGMA journal_mode=WAL')
         
         # Создаем таблицу для заказов с расширенными полями
         cursor.execute('''
@@ -134,6 +480,12 @@ class Database:
             )
         ''')
         
+        # Ключ события перевозчика для отбрасывания повторов при пакетной загрузке
+        try:
+            cursor.execute('ALTER TABLE tracking ADD COLUMN external_id TEXT')
+        except sqlite3.OperationalError:
+            pass
+        
         # Создаем таблицу для платежей
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS payments (
@@ -149,6 +501,152 @@ class Database:
             )
         ''')
         
+        # Таблица сообщений чата
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id INTEGER NOT NULL,
+                sender_id INTEGER NOT NULL,
+                sender_role TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (order_id) REFERENCES orders(id)
+            )
+        ''')
+
+        # Индексы для выборок заказов по роли/статусу с сортировкой по дате
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_client_status ON orders(client_id, status, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_manager_status ON orders(manager_id, status, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders(status, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at)')
+        # Индексы для выборок истории и платежей по заказу
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tracking_order ON tracking(order_id, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_order ON payments(order_id, status)')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_tracking_external
+            ON tracking(order_id, external_id) WHERE external_id IS NOT NULL
+        ''')
+        # Индексы для переноса в архив: отбор кандидатов и связанных строк чата
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_status_updated ON orders(status, updated_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_order ON chat_messages(order_id, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_order ON tickets(order_id)')
+        # Покрывающие индексы кратких списков (view=summary): id берется из rowid
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_orders_client_summary
+            ON orders(client_id, created_at, status, tracking_number, manager_id, price)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_orders_manager_summary
+            ON orders(manager_id, created_at, status, tracking_number, client_id, price)
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_manager ON tickets(manager_id, status, assigned_at, order_id)')
+
+        # Ключи изменений для сброса кэшей в других процессах (см. db_changes)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Журнал изменений заказов для инкрементальной синхронизации (GET /api/sync):
+        # только добавление, пишется в транзакции самой записи
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS order_changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                order_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                client_id INTEGER,
+                manager_id INTEGER,
+                previous_manager_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_changes_client ON order_changes(client_id, seq)')
+
+        if shard == 0:
+            # Пользователи, сессии и рассылки хранятся только в основной БД,
+            # в шарды попадают только заказы и связанные с ними таблицы
+            self._init_global_tables(conn, cursor)
+        else:
+            # Счетчики AUTOINCREMENT шарда начинаются с его диапазона id
+            start = shard * SHARD_ID_SPAN
+            for table in SHARDED_TABLES:
+                cursor.execute('UPDATE sqlite_sequence SET seq = ? WHERE name = ? AND seq < ?', (start, table, start))
+                cursor.execute('''
+                    INSERT INTO sqlite_sequence (name, seq)
+                    SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+                ''', (table, start, table))
+
+        conn.commit()
+        conn.close()
+
+    def _init_global_tables(self, conn: sqlite3.Connection, cursor: sqlite3.Cursor):
+        """Создает таблицы основной БД, не относящиеся к заказам"""
+        # Создаем таблицу пользователей с ролью
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                role TEXT DEFAULT 'client',
+                privacy_accepted INTEGER DEFAULT 0,
+                notifications_enabled INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Добавляем колонку privacy_accepted если её нет (для существующих БД)
+        try:
+            cursor.execute('ALTER TABLE users ADD COLUMN privacy_accepted INTEGER DEFAULT 0')
+        except sqlite3.OperationalError:
+            pass  # Колонка уже существует
+
+        # Добавляем колонку notifications_enabled если её нет
+        try:
+            cursor.execute('ALTER TABLE users ADD COLUMN notifications_enabled INTEGER DEFAULT 0')
+        except sqlite3.OperationalError:
+            pass  # Колонка уже существует
+
+        # Создаем таблицу для хранения данных пользователей
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                data_key TEXT,
+                data_value TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+            )
+        ''')
+
+        try:
+            cursor.execute('ALTER TABLE user_data ADD COLUMN updated_at TIMESTAMP')
+        except sqlite3.OperationalError:
+            pass  # Колонка уже существует
+
+        # Один ключ - одна строка. Старые БД хранили каждое сохранение отдельной строкой:
+        # перед созданием уникального индекса один раз оставляем только последние значения
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_user_data_key'")
+        if not cursor.fetchone():
+            # Бот и веб-приложение могут стартовать одновременно: сжатие и индекс - под
+            # блокировкой записи, иначе между ними другой процесс успеет добавить дубликат
+            conn.commit()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                removed = self._compact_user_data(cursor)
+                cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_user_data_key ON user_data(user_id, data_key)')
+                cursor.execute('COMMIT')
+            except sqlite3.Error:
+                cursor.execute('ROLLBACK')
+                raise
+            if removed:
+                import logging
+                logging.info(f"user_data: удалено устаревших значений: {removed}")
+
         # Создаем таблицу для адресов пользователей
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_addresses (
@@ -163,19 +661,6 @@ class Database:
                 FOREIGN KEY (user_id) REFERENCES users(user_id)
             )
         ''')
-        
-        # Таблица сообщений чата
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chat_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id INTEGER NOT NULL,
-                sender_id INTEGER NOT NULL,
-                sender_role TEXT NOT NULL,
-                message TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (order_id) REFERENCES orders(id)
-            )
-        ''')
 
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_sessions (
@@ -185,73 +670,91 @@ class Database:
                 FOREIGN KEY (user_id) REFERENCES users(user_id)
             )
         ''')
-        
-        conn.commit()
-        conn.close()
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_role_created ON users(role, created_at)')
+
+        # Рассылки клиентам: last_user_id - контрольная точка, с которой рассылка
+        # продолжается после сбоя; heartbeat_at - когда отправитель последний раз отчитался
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                created_by INTEGER,
+                status TEXT DEFAULT 'running',
+                total INTEGER DEFAULT 0,
+                last_user_id INTEGER DEFAULT 0,
+                delivered INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0,
+                blocked INTEGER DEFAULT 0,
+                elapsed REAL DEFAULT 0,
+                heartbeat_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        # Получатели рассылки: клиенты с включенными уведомлениями по возрастанию user_id
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_users_notifications
+            ON users(role, user_id) WHERE notifications_enabled = 1
+        ''')
     
     def add_user(self, user_id: int, username: Optional[str] = None, 
                  first_name: Optional[str] = None, last_name: Optional[str] = None,
                  role: str = UserRole.CLIENT, privacy_accepted: bool = False) -> bool:
         """Добавляет или обновляет пользователя в базе данных"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Проверяем, существует ли пользователь
-        cursor.execute('SELECT user_id FROM users WHERE user_id = ?', (user_id,))
-        exists = cursor.fetchone()
-        
-        if exists:
-            # Обновляем существующего пользователя
-            cursor.execute('''
-                UPDATE users 
-                SET username = ?, first_name = ?, last_name = ?, 
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE user_id = ?
-            ''', (username, first_name, last_name, user_id))
-        else:
-            # Добавляем нового пользователя
-            cursor.execute('''
-                INSERT INTO users (user_id, username, first_name, last_name, role, privacy_accepted)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (user_id, username, first_name, last_name, role, 1 if privacy_accepted else 0))
-        
-        conn.commit()
-        conn.close()
+        def write(cursor):
+            # Проверяем, существует ли пользователь
+            cursor.execute('SELECT user_id FROM users WHERE user_id = ?', (user_id,))
+            exists = cursor.fetchone()
+
+            if exists:
+                # Обновляем существующего пользователя
+                cursor.execute('''
+                    UPDATE users 
+                    SET username = ?, first_name = ?, last_name = ?, 
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = ?
+                ''', (username, first_name, last_name, user_id))
+            else:
+                # Добавляем нового пользователя
+                cursor.execute('''
+                    INSERT INTO users (user_id, username, first_name, last_name, role, privacy_accepted)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (user_id, username, first_name, last_name, role, 1 if privacy_accepted else 0))
+
+        self._write(write, keys=[f'user:{user_id}', 'users'])
         return True
     
-    def get_user(self, user_id: int) -> Optional[dict]:
-        """Получает информацию о пользователе"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+    def get_user(self, user_id: int) -> Optional[User]:
+        """Получает информацию о пользователе (из кэша, пока запись user:<id> не изменилась)"""
+        key = f'user:{user_id}'
+        found, user, version = self.cache.get(key)
+        if found:
+            return user
+        with self._read_cursor() as cursor:
+            user = self._fetch_user(cursor, user_id)
+        self.cache.set(key, user, version)
+        return user
+
+    @staticmethod
+    def _fetch_user(cursor, user_id: int) -> Optional[User]:
         cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
-        row = cursor.fetchone()
-        
-        conn.close()
-        if row:
-            user_dict = dict(row)
-            # Преобразуем privacy_accepted в boolean
-            if 'privacy_accepted' in user_dict:
-                user_dict['privacy_accepted'] = bool(user_dict['privacy_accepted'])
-            # Преобразуем notifications_enabled в boolean
-            if 'notifications_enabled' in user_dict:
-                user_dict['notifications_enabled'] = bool(user_dict['notifications_enabled'])
-            return user_dict
-        return None
+        users = fetch_records(cursor, User)
+        if not users:
+            return None
+        user = users[0]
+        # Флаги хранятся как 0/1, наружу отдаем boolean
+        return user._make(
+            bool(value) if name in ('privacy_accepted', 'notifications_enabled') else value
+            for name, value in user.items()
+        )
     
     def set_notifications_enabled(self, user_id: int, enabled: bool) -> bool:
         """Включает или выключает уведомления для пользователя"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        self._write(lambda cursor: cursor.execute('''
             UPDATE users 
             SET notifications_enabled = ?, updated_at = CURRENT_TIMESTAMP
             WHERE user_id = ?
-        ''', (1 if enabled else 0, user_id))
-        
-        conn.commit()
-        conn.close()
+        ''', (1 if enabled else 0, user_id)), keys=[f'user:{user_id}'])
         return True
     
     def is_notifications_enabled(self, user_id: int) -> bool:
@@ -263,17 +766,11 @@ class Database:
     
     def accept_privacy(self, user_id: int) -> bool:
         """Отмечает, что пользователь принял политику конфиденциальности"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        self._write(lambda cursor: cursor.execute('''
             UPDATE users 
             SET privacy_accepted = 1, updated_at = CURRENT_TIMESTAMP
             WHERE user_id = ?
-        ''', (user_id,))
-        
-        conn.commit()
-        conn.close()
+        ''', (user_id,)), keys=[f'user:{user_id}'])
         return True
     
     def has_accepted_privacy(self, user_id: int) -> bool:
@@ -285,93 +782,145 @@ class Database:
     
     def set_user_role(self, user_id: int, role: str) -> bool:
         """Устанавливает роль пользователя"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        return self._write(lambda cursor: cursor.execute('''
             UPDATE users 
             SET role = ?, updated_at = CURRENT_TIMESTAMP
             WHERE user_id = ?
-        ''', (role, user_id))
-        
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
-        return success
+        ''', (role, user_id)).rowcount > 0, keys=[f'user:{user_id}'])
     
-    def get_all_users(self, role: Optional[str] = None) -> List[dict]:
+    def get_all_users(self, role: Optional[str] = None) -> List[User]:
         """Получает список всех пользователей, опционально фильтруя по роли"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        if role:
-            cursor.execute('SELECT * FROM users WHERE role = ? ORDER BY created_at DESC', (role,))
-        else:
-            cursor.execute('SELECT * FROM users ORDER BY created_at DESC')
-        
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        return self.flights.do(('all_users', getattr(role, 'value', role)), lambda: self._fetch_all_users(role))
+
+    def _fetch_all_users(self, role: Optional[str]) -> List[User]:
+        with self._read_cursor() as cursor:
+            if role:
+                cursor.execute('SELECT * FROM users WHERE role = ? ORDER BY created_at DESC', (role,))
+            else:
+                cursor.execute('SELECT * FROM users ORDER BY created_at DESC')
+            return fetch_records(cursor, User)
     
+    def count_users(self, role: Optional[str] = None) -> int:
+        """Считает пользователей (опционально по роли) по индексу"""
+        with self._read_cursor() as cursor:
+            if role:
+                cursor.execute('SELECT COUNT(*) FROM users WHERE role = ?', (role,))
+            else:
+                cursor.execute('SELECT COUNT(*) FROM users')
+            return cursor.fetchone()[0]
+
+    def get_users_page(self, role: str, limit: int = 10, cursor: Optional[Tuple[str, int]] = None,
+                       direction: str = 'older') -> Tuple[List[User], int]:
+        """
+        Возвращает страницу пользователей роли (новые сверху) и их общее количество.
+        cursor - пара (created_at, user_id), direction - как в get_orders_page.
+        """
+        newer = direction == 'newer'
+        compare, sort = ('>', 'ASC') if newer else ('<', 'DESC')
+        where = 'role = ?'
+        params = [role]
+        if cursor:
+            where += f' AND (created_at, user_id) {compare} (?, ?)'
+            params.extend(cursor)
+
+        with self._read_cursor() as db_cursor:
+            db_cursor.execute(f'''
+                SELECT * FROM users WHERE {where}
+                ORDER BY created_at {sort}, user_id {sort} LIMIT ?
+            ''', params + [limit])
+            rows = fetch_records(db_cursor, User)
+            db_cursor.execute('SELECT COUNT(*) FROM users WHERE role = ?', (role,))
+            total = db_cursor.fetchone()[0]
+        if newer:
+            rows.reverse()
+        return rows, total
+
     def save_user_data(self, user_id: int, data_key: str, data_value: str) -> bool:
-        """Сохраняет данные пользователя"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        """Сохраняет данные пользователя (значение по ключу перезаписывается)"""
+        return self.save_user_data_many(user_id, {data_key: data_value})
+
+    def save_user_data_many(self, user_id: int, values: dict) -> bool:
+        """Сохраняет несколько значений пользователя одной транзакцией"""
+        if not values:
+            return True
+        self._write(lambda cursor: cursor.executemany('''
             INSERT INTO user_data (user_id, data_key, data_value)
             VALUES (?, ?, ?)
-        ''', (user_id, data_key, data_value))
-        
-        conn.commit()
-        conn.close()
+            ON CONFLICT(user_id, data_key) DO UPDATE SET
+                data_value = excluded.data_value,
+                updated_at = CURRENT_TIMESTAMP
+        ''', [(user_id, key, value) for key, value in values.items()]))
         return True
     
     def get_user_data(self, user_id: int, data_key: str) -> Optional[str]:
         """Получает данные пользователя по ключу"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        return self.get_user_data_many(user_id, [data_key]).get(data_key)
+
+    def get_user_data_many(self, user_id: int, data_keys: List[str]) -> dict:
+        """Получает несколько значений пользователя одним запросом: {ключ: значение}"""
+        with self._read_cursor() as cursor:
+            return self._fetch_user_data(cursor, user_id, data_keys)
+
+    @staticmethod
+    def _fetch_user_data(cursor, user_id: int, data_keys: List[str]) -> dict:
         cursor.execute('''
-            SELECT data_value FROM user_data 
-            WHERE user_id = ? AND data_key = ?
-            ORDER BY created_at DESC
-            LIMIT 1
-        ''', (user_id, data_key))
-        
-        result = cursor.fetchone()
-        conn.close()
-        return result['data_value'] if result else None
+            SELECT data_key, data_value FROM user_data
+            WHERE user_id = ? AND data_key IN (SELECT value FROM json_each(?))
+        ''', (user_id, json.dumps(list(data_keys))))
+        return {row['data_key']: row['data_value'] for row in cursor.fetchall()}
+
+    @staticmethod
+    def _compact_user_data(cursor) -> int:
+        """Оставляет по одному (последнему) значению на ключ пользователя"""
+        cursor.execute('''
+            DELETE FROM user_data WHERE id NOT IN (
+                SELECT (
+                    SELECT latest.id FROM user_data latest
+                    WHERE latest.user_id IS d.user_id AND latest.data_key IS d.data_key
+                    ORDER BY latest.created_at DESC, latest.id DESC
+                    LIMIT 1
+                )
+                FROM user_data d
+                GROUP BY d.user_id, d.data_key
+            )
+        ''')
+        return cursor.rowcount
     
     def create_order(self, client_id: int, description: str, from_address: str = None,
                      to_address: str = None, from_contact: str = None, to_contact: str = None,
                      weight: float = None, price: float = None, manager_id: Optional[int] = None) -> int:
         """Создает новый заказ"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Генерируем tracking number
-        import random
-        import string
-        tracking_number = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-        
-        cursor.execute('''
-            INSERT INTO orders (client_id, manager_id, description, from_address, to_address,
-                              from_contact, to_contact, weight, price, tracking_number, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')
-        ''', (client_id, manager_id, description, from_address, to_address,
-              from_contact, to_contact, weight, price, tracking_number))
-        
-        order_id = cursor.lastrowid
-        
-        # Создаем тикет для менеджера, если указан
-        if manager_id:
+        tracking_number = self._generate_tracking_number()
+
+        def write(cursor):
             cursor.execute('''
-                INSERT INTO tickets (order_id, manager_id, status)
-                VALUES (?, ?, 'new')
-            ''', (order_id, manager_id))
-            ticket_id = cursor.lastrowid
-            
+                INSERT INTO orders (client_id, manager_id, description, from_address, to_address,
+                                  from_contact, to_contact, weight, price, tracking_number, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+            ''', (client_id, manager_id, description, from_address, to_address,
+                  from_contact, to_contact, weight, price, tracking_number))
+            order_id = cursor.lastrowid
+
+            # Создаем тикет для менеджера, если указан
+            ticket_id = None
+            if manager_id:
+                cursor.execute('''
+                    INSERT INTO tickets (order_id, manager_id, status)
+                    VALUES (?, ?, 'new')
+                ''', (order_id, manager_id))
+                ticket_id = cursor.lastrowid
+
+            # Создаем начальную запись отслеживания
+            cursor.execute('''
+                INSERT INTO tracking (order_id, status, location, description)
+                VALUES (?, 'pending', 'Создан', 'Заказ создан и ожидает обработки')
+            ''', (order_id,))
+            self._log_order_changes(cursor, 'created', [order_id])
+            return order_id, ticket_id
+
+        order_id, ticket_id = self._write(write, self.shard_for_client(client_id), orders=lambda result: result[:1])
+
+        if ticket_id:
             # Отправляем уведомление о новом тикете
             try:
                 from utils.telegram_logger import send_log_sync, format_ticket_notification, init_log_group
@@ -393,15 +942,6 @@ class Database:
                 import logging
                 logging.error(f"Ошибка отправки уведомления о тикете: {e}")
         
-        # Создаем начальную запись отслеживания
-        cursor.execute('''
-            INSERT INTO tracking (order_id, status, location, description)
-            VALUES (?, 'pending', 'Создан', 'Заказ создан и ожидает обработки')
-        ''', (order_id,))
-        
-        conn.commit()
-        # order_id уже получен выше, не нужно получать снова
-        
         # Отправляем уведомление о новом заказе
         try:
             from utils.telegram_logger import send_log_sync, format_order_notification, init_log_group
@@ -431,16 +971,176 @@ class Database:
             import logging
             logging.error(f"Ошибка отправки уведомления клиенту: {e}")
         
-        conn.close()
         return order_id
     
+    @staticmethod
+    def _generate_tracking_number() -> str:
+        """Генерирует tracking number заказа"""
+        import random
+        import string
+        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
+
+    def bulk_create_orders(self, orders: List[dict]) -> List[dict]:
+        """
+        Создает пачку заказов одной транзакцией на шард: заказы, начальное отслеживание
+        и тикеты вставляются через executemany. Возвращает результат по каждому
+        заказу в исходном порядке: order_id/tracking_number или error.
+        Уведомления не отправляются - см. send_import_notifications.
+        """
+        if not orders:
+            return []
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        # Проверяем клиентов и менеджеров пачки одним запросом
+        user_ids = {o['client_id'] for o in orders} | {o['manager_id'] for o in orders if o.get('manager_id')}
+        cursor.execute(
+            'SELECT user_id, role FROM users WHERE user_id IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(user_ids)),)
+        )
+        roles = {row['user_id']: row['role'] for row in cursor.fetchall()}
+
+        results = []
+        valid = []
+        for order in orders:
+            if order['client_id'] not in roles:
+                results.append({'error': 'Client not found'})
+            elif order.get('manager_id') and roles.get(order['manager_id']) != UserRole.MANAGER:
+                results.append({'error': 'Manager not found'})
+            else:
+                result = {'tracking_number': self._generate_tracking_number(), 'client_id': order['client_id']}
+                results.append(result)
+                valid.append((order, result))
+
+        conn.close()
+
+        # Каждый шард пишется своей транзакцией; сбой одного шарда не откатывает другие
+        by_shard = {}
+        for order, result in valid:
+            by_shard.setdefault(self.shard_for_client(order['client_id']), []).append((order, result))
+        for shard, shard_valid in by_shard.items():
+            self._insert_orders(shard, shard_valid)
+
+        return results
+
+    def _insert_orders(self, shard: int, valid: List[Tuple[dict, dict]]) -> None:
+        """Вставляет проверенные заказы пачки в шард одной транзакцией, заполняя result"""
+        def write(cursor):
+            cursor.executemany('''
+                INSERT INTO orders (client_id, manager_id, description, from_address, to_address,
+                                  from_contact, to_contact, weight, price, tracking_number, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+            ''', [
+                (order['client_id'], order.get('manager_id'), order['description'],
+                 order.get('from_address'), order.get('to_address'),
+                 order.get('from_contact'), order.get('to_contact'),
+                 order.get('weight'), order.get('price'), result['tracking_number'])
+                for order, result in valid
+            ])
+
+            # executemany не возвращает id строк - находим их по уникальному tracking number
+            cursor.execute(
+                'SELECT id, tracking_number FROM orders WHERE tracking_number IN (SELECT value FROM json_each(?))',
+                (json.dumps([result['tracking_number'] for _, result in valid]),)
+            )
+            ids = {row['tracking_number']: row['id'] for row in cursor.fetchall()}
+            for _, result in valid:
+                result['order_id'] = ids[result['tracking_number']]
+
+            cursor.executemany('''
+                INSERT INTO tracking (order_id, status, location, description)
+                VALUES (?, 'pending', 'Создан', 'Заказ создан и ожидает обработки')
+            ''', [(result['order_id'],) for _, result in valid])
+
+            cursor.executemany('''
+                INSERT INTO tickets (order_id, manager_id, status)
+                VALUES (?, ?, 'new')
+            ''', [(result['order_id'], order['manager_id']) for order, result in valid if order.get('manager_id')])
+            self._log_order_changes(cursor, 'created', [result['order_id'] for _, result in valid])
+
+        for attempt in range(TRACKING_NUMBER_ATTEMPTS):
+            try:
+                self._write(write, shard, orders=lambda _: [result['order_id'] for order, result in valid])
+                return
+            except sqlite3.IntegrityError as e:
+                # Случайный tracking number совпал с существующим - пачка повторяется с новыми номерами
+                if 'tracking_number' not in str(e) or attempt == TRACKING_NUMBER_ATTEMPTS - 1:
+                    error = e
+                    break
+                for _, result in valid:
+                    result['tracking_number'] = self._generate_tracking_number()
+            except sqlite3.Error as e:
+                error = e
+                break
+        import logging
+        logging.error(f"Ошибка пакетного создания заказов: {error}")
+        for _, result in valid:
+            result.clear()
+            result['error'] = 'Database error'
+
+    def send_import_notifications(self, created: dict) -> None:
+        """
+        Отправляет по одному сводному уведомлению на клиента ({client_id: [order_id, ...]})
+        и одну сводку в группу логов вместо уведомления на каждый заказ.
+        """
+        if not created:
+            return
+
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT user_id FROM users
+            WHERE notifications_enabled = 1 AND user_id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(list(created)),))
+        enabled = [row['user_id'] for row in cursor.fetchall()]
+        conn.close()
+
+        for client_id in enabled:
+            try:
+                self._send_orders_imported_notification(client_id, created[client_id])
+            except Exception as e:
+                import logging
+                logging.error(f"Ошибка отправки уведомления клиенту: {e}")
+
+        try:
+            from utils.telegram_logger import send_log_sync, format_import_notification, init_log_group
+            from config import LOG_GROUP_ID
+
+            if LOG_GROUP_ID:
+                init_log_group(LOG_GROUP_ID)
+                send_log_sync(format_import_notification(created), parse_mode='HTML')
+        except Exception as e:
+            import logging
+            logging.error(f"Ошибка отправки сводки импорта: {e}")
+
+    def _send_orders_imported_notification(self, client_id: int, order_ids: List[int]):
+        """Отправляет клиенту одно уведомление о пачке созданных заказов"""
+        try:
+            from config import BOT_TOKEN
+            from utils.telegram_runtime import get_telegram_runtime
+
+            if not BOT_TOKEN:
+                return
+
+            shown = ', '.join(f"#{order_id}" for order_id in order_ids[:20])
+            if len(order_ids) > 20:
+                shown += f" и еще {len(order_ids) - 20}"
+
+            message = f"📦 <b>Создано заказов: {len(order_ids)}</b>\n\n"
+            message += f"Заказы {shown} успешно созданы и ожидают обработки."
+
+            get_telegram_runtime().send_message(client_id, message, parse_mode='HTML')
+
+        except Exception as e:
+            import logging
+            logging.error(f"Ошибка создания уведомления: {e}")
+
     def _send_order_created_notification(self, client_id: int, order_id: int):
         """Отправляет уведомление клиенту о создании заказа"""
         try:
-            from telegram import Bot
             from config import BOT_TOKEN
-            import asyncio
-            import threading
+            from utils.telegram_runtime import get_telegram_runtime
             
             if not BOT_TOKEN:
                 return
@@ -448,23 +1148,7 @@ class Database:
             message = f"📦 <b>Заказ создан</b>\n\n"
             message += f"Ваш заказ #{order_id} успешно создан и ожидает обработки."
             
-            def send_async():
-                async def send():
-                    bot = Bot(token=BOT_TOKEN)
-                    try:
-                        await bot.send_message(
-                            chat_id=client_id,
-                            text=message,
-                            parse_mode='HTML'
-                        )
-                    except Exception as e:
-                        import logging
-                        logging.error(f"Ошибка отправки уведомления: {e}")
-                
-                asyncio.run(send())
-            
-            thread = threading.Thread(target=send_async)
-            thread.start()
+            get_telegram_runtime().send_message(client_id, message, parse_mode='HTML')
             
         except Exception as e:
             import logging
@@ -472,39 +1156,22 @@ class Database:
     
     def get_order(self, order_id: int) -> Optional[dict]:
         """Получает информацию о заказе"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM orders WHERE id = ?', (order_id,))
-        row = cursor.fetchone()
-        
-        conn.close()
-        return dict(row) if row else None
+        with self._read_cursor(self.shard_for_id(order_id)) as cursor:
+            cursor.execute('SELECT * FROM orders WHERE id = ?', (order_id,))
+            row = cursor.fetchone()
+        if row:
+            return dict(row)
+        # Старые завершенные заказы могли быть перенесены в архив
+        rows = self._archive_fetch('SELECT * FROM orders WHERE id = ?', (order_id,))
+        return rows[0].to_dict() if rows else None
     
+    @staticmethod
+    def _order_exists(cursor, order_id: int) -> bool:
+        cursor.execute('SELECT 1 FROM orders WHERE id = ?', (order_id,))
+        return cursor.fetchone() is not None
+
     def update_order_status(self, order_id: int, status: str, manager_id: Optional[int] = None) -> bool:
         """Обновляет статус заказа"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Получаем информацию о заказе ДО обновления
-        cursor.execute('SELECT client_id, status as old_status FROM orders WHERE id = ?', (order_id,))
-        order_info = cursor.fetchone()
-        old_status = order_info['old_status'] if order_info else None
-        client_id = order_info['client_id'] if order_info else None
-        
-        if manager_id:
-            cursor.execute('''
-                UPDATE orders 
-                SET status = ?, manager_id = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (status, manager_id, order_id))
-        else:
-            cursor.execute('''
-                UPDATE orders 
-                SET status = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (status, order_id))
-        
         # Добавляем запись в отслеживание
         status_descriptions = {
             'pending': 'Ожидает обработки',
@@ -514,34 +1181,55 @@ class Database:
             'completed': 'Завершен',
             'cancelled': 'Отменен'
         }
-        
-        cursor.execute('''
-            INSERT INTO tracking (order_id, status, description)
-            VALUES (?, ?, ?)
-        ''', (order_id, status, status_descriptions.get(status, status)))
-        
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
+
+        def write(cursor):
+            # Получаем информацию о заказе ДО обновления
+            cursor.execute('SELECT client_id, status as old_status, manager_id FROM orders WHERE id = ?', (order_id,))
+            order_info = cursor.fetchone()
+
+            if manager_id:
+                cursor.execute('''
+                    UPDATE orders 
+                    SET status = ?, manager_id = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (status, manager_id, order_id))
+            else:
+                cursor.execute('''
+                    UPDATE orders 
+                    SET status = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (status, order_id))
+
+            cursor.execute('''
+                INSERT INTO tracking (order_id, status, description)
+                VALUES (?, ?, ?)
+            ''', (order_id, status, status_descriptions.get(status, status)))
+            success = cursor.rowcount > 0
+            if order_info:
+                self._log_order_changes(cursor, 'status', [order_id], {order_id: order_info['manager_id']})
+            return order_info, success
+
+        order_info, success = self._write(write, self.shard_for_id(order_id), orders=[order_id])
+        old_status = order_info['old_status'] if order_info else None
+        client_id = order_info['client_id'] if order_info else None
         
         # Отправляем уведомление клиенту, если уведомления включены
         if client_id:
             try:
                 if self.is_notifications_enabled(client_id):
-                    self._send_order_notification(client_id, order_id, old_status, status)
+                    self.notifier.status_changed(client_id, order_id, old_status, status)
             except Exception as e:
                 import logging
                 logging.error(f"Ошибка отправки уведомления клиенту: {e}")
         
         return success
     
-    def _send_order_notification(self, client_id: int, order_id: int, old_status: str, new_status: str):
-        """Отправляет уведомление клиенту об изменении статуса заказа"""
+    def _send_order_notification(self, client_id: int, order_id: int, old_status: str, new_status: str,
+                                 updates: int = 1):
+        """Отправляет уведомление клиенту об изменении статуса заказа (updates - сколько смен объединено)"""
         try:
-            from telegram import Bot
             from config import BOT_TOKEN
-            import asyncio
-            import threading
+            from utils.telegram_runtime import get_telegram_runtime
             
             if not BOT_TOKEN:
                 return
@@ -560,24 +1248,10 @@ class Database:
             
             message = f"📦 <b>Изменение статуса заказа #{order_id}</b>\n\n"
             message += f"Статус изменен: {old_name} → {new_name}"
+            if updates > 1:
+                message += f" ({format_updates(updates)})"
             
-            def send_async():
-                async def send():
-                    bot = Bot(token=BOT_TOKEN)
-                    try:
-                        await bot.send_message(
-                            chat_id=client_id,
-                            text=message,
-                            parse_mode='HTML'
-                        )
-                    except Exception as e:
-                        import logging
-                        logging.error(f"Ошибка отправки уведомления: {e}")
-                
-                asyncio.run(send())
-            
-            thread = threading.Thread(target=send_async)
-            thread.start()
+            get_telegram_runtime().send_message(client_id, message, parse_mode='HTML')
             
         except Exception as e:
             import logging
@@ -585,321 +1259,774 @@ class Database:
     
     def create_ticket(self, order_id: int, manager_id: int) -> int:
         """Создает тикет для менеджера"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO tickets (order_id, manager_id, status)
-            VALUES (?, ?, 'new')
-        ''', (order_id, manager_id))
-        
-        ticket_id = cursor.lastrowid
-        
-        # Обновляем заказ, назначая менеджера
-        cursor.execute('''
-            UPDATE orders SET manager_id = ? WHERE id = ?
-        ''', (manager_id, order_id))
-        
-        conn.commit()
-        conn.close()
-        return ticket_id
-    
-    def get_manager_tickets(self, manager_id: int, status: Optional[str] = None) -> List[dict]:
-        """Получает тикеты менеджера"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Явно указываем колонки с алиасами, чтобы избежать конфликта имен
-        if status:
+        def write(cursor):
+            previous = self._order_managers(cursor, [order_id])
             cursor.execute('''
-                SELECT 
-                    t.id AS ticket_id,
-                    t.order_id,
-                    t.manager_id,
-                    t.status AS ticket_status,
-                    t.assigned_at,
-                    t.accepted_at,
-                    o.id AS order_id_full,
-                    o.client_id,
-                    o.description,
-                    o.from_address,
-                    o.to_address,
-                    o.price,
-                    o.status AS order_status,
-                    o.tracking_number,
-                    o.created_at AS order_created_at
-                FROM tickets t
-                JOIN orders o ON t.order_id = o.id
-                WHERE t.manager_id = ? AND t.status = ?
-                ORDER BY t.assigned_at DESC
-            ''', (manager_id, status))
-        else:
+                INSERT INTO tickets (order_id, manager_id, status)
+                VALUES (?, ?, 'new')
+            ''', (order_id, manager_id))
+            ticket_id = cursor.lastrowid
+
+            # Обновляем заказ, назначая менеджера
             cursor.execute('''
-                SELECT 
-                    t.id AS ticket_id,
-                    t.order_id,
-                    t.manager_id,
-                    t.status AS ticket_status,
-                    t.assigned_at,
-                    t.accepted_at,
-                    o.id AS order_id_full,
-                    o.client_id,
-                    o.description,
-                    o.from_address,
-                    o.to_address,
-                    o.price,
-                    o.status AS order_status,
-                    o.tracking_number,
-                    o.created_at AS order_created_at
-                FROM tickets t
-                JOIN orders o ON t.order_id = o.id
-                WHERE t.manager_id = ?
-                ORDER BY t.assigned_at DESC
-            ''', (manager_id,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        # Преобразуем результат в правильный формат
-        result = []
-        for row in rows:
-            ticket_dict = dict(row)
-            # Используем ticket_id как id для совместимости
-            ticket_dict['id'] = ticket_dict['ticket_id']
-            # Сохраняем order_id правильно
-            ticket_dict['order_id'] = ticket_dict.get('order_id') or ticket_dict.get('order_id_full')
-            # Используем ticket_status как status
-            ticket_dict['status'] = ticket_dict['ticket_status']
-            result.append(ticket_dict)
-        
-        return result
+                UPDATE orders SET manager_id = ? WHERE id = ?
+            ''', (manager_id, order_id))
+            self._log_order_changes(cursor, 'assigned', [order_id], previous)
+            return ticket_id
+
+        return self._write(write, self.shard_for_id(order_id), orders=[order_id])
+    
+    def get_manager_tickets(self, manager_id: int, status: Optional[str] = None,
+                            fields: Optional[Sequence[str]] = None) -> List[Record]:
+        """Получает тикеты менеджера (fields - только перечисленные поля из TICKET_COLUMNS)"""
+        columns = select_fields(fields, TICKET_COLUMNS)
+        shards = range(self.shard_count)
+        query_columns = self._sort_columns(columns, 'assigned_at', shards)
+        parts = self._gather(shards, lambda cursor: self._fetch_manager_tickets(
+            cursor, manager_id, status, query_columns
+        ))
+        return self._project(self._merge_sorted(parts, itemgetter('assigned_at')), columns)
+
+    @staticmethod
+    def _fetch_manager_tickets(cursor, manager_id: int, status: Optional[str] = None,
+                               columns: Optional[List[str]] = None) -> List[Record]:
+        # Имена полей задаются алиасами прямо в запросе, без переписывания строк в Python
+        select_columns = dict(TICKET_COLUMNS, **TICKET_LEGACY_COLUMNS) if columns is None else {
+            name: TICKET_COLUMNS[name] for name in columns
+        }
+        # Заказ присоединяется, только если запрошены его поля
+        join = 'JOIN orders o ON t.order_id = o.id' if any(
+            expression.startswith('o.') for expression in select_columns.values()
+        ) else ''
+        where = 't.manager_id = ?' + (' AND t.status = ?' if status else '')
+        select = ', '.join(f'{expression} AS {name}' for name, expression in select_columns.items())
+        cursor.execute(
+            f'SELECT {select} FROM tickets t {join} WHERE {where} ORDER BY t.assigned_at DESC',
+            (manager_id, status) if status else (manager_id,)
+        )
+        return fetch_records(cursor)
     
     def accept_ticket(self, ticket_id: int) -> bool:
         """Принимает тикет менеджером"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Получаем информацию о заказе до обновления
-        cursor.execute('''
-            SELECT o.id as order_id, o.client_id, o.status as old_status
-            FROM tickets t
-            JOIN orders o ON t.order_id = o.id
-            WHERE t.id = ?
-        ''', (ticket_id,))
-        order_info = cursor.fetchone()
+        def write(cursor):
+            # Получаем информацию о заказе до обновления
+            cursor.execute('''
+                SELECT o.id as order_id, o.client_id, o.status as old_status
+                FROM tickets t
+                JOIN orders o ON t.order_id = o.id
+                WHERE t.id = ?
+            ''', (ticket_id,))
+            order_info = cursor.fetchone()
+
+            cursor.execute('''
+                UPDATE tickets 
+                SET status = 'accepted', accepted_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (ticket_id,))
+
+            # Обновляем статус заказа
+            cursor.execute('''
+                UPDATE orders SET status = 'accepted', updated_at = CURRENT_TIMESTAMP
+                WHERE id = (SELECT order_id FROM tickets WHERE id = ?)
+            ''', (ticket_id,))
+            success = cursor.rowcount > 0
+            if order_info:
+                self._log_order_changes(cursor, 'status', [order_info['order_id']])
+            return order_info, success
+
+        order_info, success = self._write(write, self.shard_for_id(ticket_id),
+                                          orders=lambda result: [result[0]['order_id']] if result[0] else [])
         order_id = order_info['order_id'] if order_info else None
         client_id = order_info['client_id'] if order_info else None
         old_status = order_info['old_status'] if order_info else None
         
-        cursor.execute('''
-            UPDATE tickets 
-            SET status = 'accepted', accepted_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (ticket_id,))
-        
-        # Обновляем статус заказа
-        cursor.execute('''
-            UPDATE orders SET status = 'accepted', updated_at = CURRENT_TIMESTAMP
-            WHERE id = (SELECT order_id FROM tickets WHERE id = ?)
-        ''', (ticket_id,))
-        
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
-        
         # Отправляем уведомление клиенту, если уведомления включены
         if client_id and order_id:
             try:
                 if self.is_notifications_enabled(client_id):
-                    self._send_order_notification(client_id, order_id, old_status, 'accepted')
+                    self.notifier.status_changed(client_id, order_id, old_status, 'accepted')
             except Exception as e:
                 import logging
                 logging.error(f"Ошибка отправки уведомления клиенту: {e}")
         
         return success
     
-    def get_order_tracking(self, order_id: int) -> List[dict]:
+    def get_order_tracking(self, order_id: int) -> List[Record]:
         """Получает историю отслеживания заказа"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM tracking 
-            WHERE order_id = ?
-            ORDER BY created_at ASC
-        ''', (order_id,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        with self._read_cursor(self.shard_for_id(order_id)) as cursor:
+            cursor.execute('''
+                SELECT * FROM tracking
+                WHERE order_id = ?
+                ORDER BY created_at ASC
+            ''', (order_id,))
+            rows = fetch_records(cursor)
+            # В архив идем, только если самого заказа в рабочей БД нет
+            if rows or self._order_exists(cursor, order_id):
+                return rows
+        return self._archive_fetch(
+            'SELECT * FROM tracking WHERE order_id = ? ORDER BY created_at ASC', (order_id,)
+        )
     
     def add_tracking_event(self, order_id: int, status: str, location: str = None, description: str = None) -> bool:
         """Добавляет событие отслеживания"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        self._write(lambda cursor: cursor.execute('''
             INSERT INTO tracking (order_id, status, location, description)
             VALUES (?, ?, ?, ?)
-        ''', (order_id, status, location, description))
-        
-        conn.commit()
-        conn.close()
+        ''', (order_id, status, location, description)), self.shard_for_id(order_id), keys=[f'order:{order_id}'])
         return True
     
+    def bulk_add_tracking_events(self, events: List[dict], advance_status: bool = False) -> List[dict]:
+        """
+        Добавляет пачку событий отслеживания одной транзакцией на шард.
+        Событие содержит tracking_number или order_id, status и необязательные
+        location, description, created_at и event_id. Событие с уже загруженным
+        event_id по тому же заказу считается повтором и пропускается.
+        При advance_status статус заказа продвигается вперед по ORDER_STATUS_FLOW
+        (назад и из cancelled не двигается); клиентам с включенными уведомлениями
+        смена статуса сообщается через объединитель уведомлений.
+        Возвращает результат по каждому событию в исходном порядке.
+        """
+        if not events:
+            return []
+        if self.shard_count == 1:
+            return self._add_tracking_events(0, events, advance_status)
+
+        # Шард события: по id заказа или по шарду, в котором найден tracking number
+        numbers = json.dumps([e['tracking_number'] for e in events if e.get('tracking_number')])
+        number_shards = {}
+        for shard, rows in enumerate(self._gather(range(self.shard_count), lambda cursor: cursor.execute(
+            'SELECT tracking_number FROM orders WHERE tracking_number IN (SELECT value FROM json_each(?))',
+            (numbers,)
+        ).fetchall())):
+            number_shards.update((row['tracking_number'], shard) for row in rows)
+
+        by_shard = {}
+        for index, event in enumerate(events):
+            if event.get('tracking_number'):
+                shard = number_shards.get(event['tracking_number'], 0)
+            else:
+                shard = self.shard_for_id(event.get('order_id'))
+            by_shard.setdefault(shard, []).append(index)
+
+        results = [None] * len(events)
+        for shard, indexes in by_shard.items():
+            shard_results = self._add_tracking_events(shard, [events[i] for i in indexes], advance_status)
+            for index, result in zip(indexes, shard_results):
+                results[index] = result
+        return results
+
+    def _add_tracking_events(self, shard: int, events: List[dict], advance_status: bool) -> List[dict]:
+        """Загружает события одного шарда одной транзакцией (см. bulk_add_tracking_events)"""
+        results = [None] * len(events)
+        advance = {}
+        advanced = {}
+
+        # Очередь записи открывает транзакцию BEGIN IMMEDIATE:
+        # проверка повторов и вставка видят одни и те же данные
+        def write(cursor):
+            # Заказы пачки находятся двумя запросами по уникальным индексам
+            cursor.execute('''
+                SELECT id, tracking_number, status, client_id FROM orders
+                WHERE tracking_number IN (SELECT value FROM json_each(?))
+                UNION
+                SELECT id, tracking_number, status, client_id FROM orders
+                WHERE id IN (SELECT value FROM json_each(?))
+            ''', (
+                json.dumps([e['tracking_number'] for e in events if e.get('tracking_number')]),
+                json.dumps([e['order_id'] for e in events if e.get('order_id')])
+            ))
+            by_id = {row['id']: dict(row) for row in cursor.fetchall()}
+            by_number = {order['tracking_number']: order for order in by_id.values()}
+
+            resolved = []
+            for index, event in enumerate(events):
+                if event.get('tracking_number'):
+                    order = by_number.get(event['tracking_number'])
+                else:
+                    order = by_id.get(event.get('order_id'))
+                if not order:
+                    results[index] = {'error': 'Order not found'}
+                else:
+                    resolved.append((index, order, event))
+
+            cursor.execute('''
+                SELECT t.order_id, t.external_id
+                FROM json_each(?) AS k
+                JOIN tracking t ON t.order_id = json_extract(k.value, '$[0]')
+                               AND t.external_id = json_extract(k.value, '$[1]')
+            ''', (json.dumps([[order['id'], event['event_id']] for _, order, event in resolved
+                               if event.get('event_id')]),))
+            seen = {(row['order_id'], row['external_id']) for row in cursor.fetchall()}
+
+            rows = []
+            advance.clear()
+            advanced.clear()
+            for index, order, event in resolved:
+                event_id = event.get('event_id')
+                if event_id and (order['id'], event_id) in seen:
+                    results[index] = {'order_id': order['id'], 'duplicate': True}
+                    continue
+                if event_id:
+                    seen.add((order['id'], event_id))
+                rows.append((order['id'], event['status'], event.get('location'),
+                             event.get('description'), event_id, event.get('created_at')))
+                results[index] = {'order_id': order['id'], 'duplicate': False}
+
+                if advance_status and event['status'] in ORDER_STATUS_FLOW and order['status'] in ORDER_STATUS_FLOW:
+                    current = advance.get(order['id'], order['status'])
+                    if ORDER_STATUS_FLOW.index(event['status']) > ORDER_STATUS_FLOW.index(current):
+                        advance[order['id']] = event['status']
+
+            cursor.executemany('''
+                INSERT INTO tracking (order_id, status, location, description, external_id, created_at)
+                VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            ''', rows)
+            # Статус меняется, только если его не успели изменить с момента чтения пачки
+            for order_id, status in advance.items():
+                cursor.execute('''
+                    UPDATE orders SET status = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status = ?
+                ''', (status, order_id, by_id[order_id]['status']))
+                if cursor.rowcount > 0:
+                    advanced[order_id] = by_id[order_id]
+            self._log_order_changes(cursor, 'status', list(advanced))
+
+        try:
+            self._write(write, shard, orders=lambda _: {result['order_id'] for result in results if 'order_id' in result})
+        except sqlite3.Error as e:
+            import logging
+            logging.error(f"Ошибка пакетной загрузки отслеживания: {e}")
+            return [{'error': 'Database error'} for _ in events]
+
+        for result in results:
+            if result and result.get('order_id') in advanced:
+                result['order_status'] = advance[result['order_id']]
+        self._notify_status_advanced({order_id: (order['client_id'], order['status'], advance[order_id])
+                                      for order_id, order in advanced.items()})
+        return results
+
+    def _notify_status_advanced(self, changes: dict) -> None:
+        """Уведомляет клиентов о смене статуса заказов ({order_id: (client_id, старый, новый)})"""
+        if not changes:
+            return
+        try:
+            with self._read_cursor() as cursor:
+                cursor.execute('''
+                    SELECT user_id FROM users
+                    WHERE notifications_enabled = 1 AND user_id IN (SELECT value FROM json_each(?))
+                ''', (json.dumps(list({client_id for client_id, _, _ in changes.values()})),))
+                enabled = {row['user_id'] for row in cursor.fetchall()}
+            for order_id, (client_id, old_status, new_status) in changes.items():
+                if client_id in enabled:
+                    self.notifier.status_changed(client_id, order_id, old_status, new_status)
+        except Exception as e:
+            import logging
+            logging.error(f"Ошибка отправки уведомления клиенту: {e}")
+    
     def create_payment(self, order_id: int, amount: float, payment_method: str) -> int:
         """Создает запись о платеже"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        import uuid
         transaction_id = str(uuid.uuid4())
-        
-        cursor.execute('''
-            INSERT INTO payments (order_id, amount, payment_method, status, transaction_id)
-            VALUES (?, ?, ?, 'pending', ?)
-        ''', (order_id, amount, payment_method, transaction_id))
-        
-        payment_id = cursor.lastrowid
-        
-        # Обновляем статус оплаты в заказе
-        cursor.execute('''
-            UPDATE orders SET payment_status = 'pending' WHERE id = ?
-        ''', (order_id,))
-        
-        conn.commit()
-        conn.close()
-        return payment_id
+
+        def write(cursor):
+            cursor.execute('''
+                INSERT INTO payments (order_id, amount, payment_method, status, transaction_id)
+                VALUES (?, ?, ?, 'pending', ?)
+            ''', (order_id, amount, payment_method, transaction_id))
+            payment_id = cursor.lastrowid
+
+            # Обновляем статус оплаты в заказе
+            cursor.execute('''
+                UPDATE orders SET payment_status = 'pending' WHERE id = ?
+            ''', (order_id,))
+            self._log_order_changes(cursor, 'payment', [order_id])
+            return payment_id
+
+        return self._write(write, self.shard_for_id(order_id), orders=[order_id])
     
     def complete_payment(self, payment_id: int) -> bool:
         """Завершает платеж"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE payments 
-            SET status = 'completed', completed_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (payment_id,))
-        
-        # Обновляем статус оплаты в заказе
-        cursor.execute('''
-            UPDATE orders SET payment_status = 'paid' 
-            WHERE id = (SELECT order_id FROM payments WHERE id = ?)
-        ''', (payment_id,))
-        
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
-        return success
+        def write(cursor):
+            cursor.execute('''
+                UPDATE payments 
+                SET status = 'completed', completed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (payment_id,))
+
+            # Обновляем статус оплаты в заказе
+            cursor.execute('SELECT order_id FROM payments WHERE id = ?', (payment_id,))
+            payment = cursor.fetchone()
+            cursor.execute('''
+                UPDATE orders SET payment_status = 'paid' 
+                WHERE id = (SELECT order_id FROM payments WHERE id = ?)
+            ''', (payment_id,))
+            success = cursor.rowcount > 0
+            if payment:
+                self._log_order_changes(cursor, 'payment', [payment['order_id']])
+            return (payment['order_id'] if payment else None), success
+
+        return self._write(write, self.shard_for_id(payment_id), orders=lambda result: result[:1])[1]
     
-    def get_order_payments(self, order_id: int) -> List[dict]:
+    def get_order_payments(self, order_id: int) -> List[Record]:
         """Получает платежи по заказу"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM payments 
-            WHERE order_id = ?
-            ORDER BY created_at DESC
-        ''', (order_id,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        with self._read_cursor(self.shard_for_id(order_id)) as cursor:
+            cursor.execute('''
+                SELECT * FROM payments
+                WHERE order_id = ?
+                ORDER BY created_at DESC
+            ''', (order_id,))
+            rows = fetch_records(cursor)
+            # В архив идем, только если самого заказа в рабочей БД нет
+            if rows or self._order_exists(cursor, order_id):
+                return rows
+        return self._archive_fetch(
+            'SELECT * FROM payments WHERE order_id = ? ORDER BY created_at DESC', (order_id,)
+        )
     
     def assign_order_to_manager(self, order_id: int, manager_id: int) -> bool:
         """Назначает заказ менеджеру (создает тикет)"""
-        # Проверяем, нет ли уже тикета
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT id FROM tickets WHERE order_id = ?', (order_id,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Обновляем существующий тикет
+        def write(cursor):
+            previous = self._order_managers(cursor, [order_id])
+            # Проверяем, нет ли уже тикета
+            cursor.execute('SELECT id FROM tickets WHERE order_id = ?', (order_id,))
+            existing = cursor.fetchone()
+
+            if existing:
+                # Обновляем существующий тикет
+                cursor.execute('''
+                    UPDATE tickets 
+                    SET manager_id = ?, status = 'new', assigned_at = CURRENT_TIMESTAMP
+                    WHERE order_id = ?
+                ''', (manager_id, order_id))
+            else:
+                # Создаем новый тикет
+                cursor.execute('''
+                    INSERT INTO tickets (order_id, manager_id, status)
+                    VALUES (?, ?, 'new')
+                ''', (order_id, manager_id))
+
+            # Обновляем заказ
             cursor.execute('''
-                UPDATE tickets 
-                SET manager_id = ?, status = 'new', assigned_at = CURRENT_TIMESTAMP
-                WHERE order_id = ?
+                UPDATE orders SET manager_id = ? WHERE id = ?
             ''', (manager_id, order_id))
-        else:
-            # Создаем новый тикет
-            cursor.execute('''
-                INSERT INTO tickets (order_id, manager_id, status)
-                VALUES (?, ?, 'new')
-            ''', (order_id, manager_id))
-        
-        # Обновляем заказ
-        cursor.execute('''
-            UPDATE orders SET manager_id = ? WHERE id = ?
-        ''', (manager_id, order_id))
-        
-        conn.commit()
-        conn.close()
+            self._log_order_changes(cursor, 'assigned', [order_id], previous)
+
+        self._write(write, self.shard_for_id(order_id), orders=[order_id])
         return True
     
-    def get_user_orders(self, user_id: int, role: str) -> List[dict]:
-        """Получает заказы пользователя в зависимости от роли"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+    def get_user_orders(self, user_id: int, role: str, fields: Optional[Sequence[str]] = None) -> List[Record]:
+        """Получает заказы пользователя в зависимости от роли (fields - только перечисленные колонки)"""
         if role == UserRole.CLIENT:
-            cursor.execute('SELECT * FROM orders WHERE client_id = ? ORDER BY created_at DESC', (user_id,))
+            where, params = 'client_id = ?', (user_id,)
         elif role == UserRole.MANAGER:
-            cursor.execute('SELECT * FROM orders WHERE manager_id = ? OR manager_id IS NULL ORDER BY created_at DESC', (user_id,))
+            where, params = 'manager_id = ? OR manager_id IS NULL', (user_id,)
         else:  # ADMIN
-            cursor.execute('SELECT * FROM orders ORDER BY created_at DESC')
-        
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+            where, params = '1 = 1', ()
+        return self._fetch_orders(self._scope_shards(user_id, role), where, params, fields)
 
-    def get_incoming_orders(self) -> List[dict]:
-        """Возвращает заказы без назначенного менеджера"""
-        conn = self.get_connection()
+    def _fetch_orders(self, shards: Sequence[int], where: str, params: tuple,
+                      fields: Optional[Sequence[str]]) -> List[Record]:
+        """Заказы по условию со всех перечисленных шардов, новые сверху"""
+        columns = select_fields(fields, ORDER_COLUMNS)
+        query_columns = self._sort_columns(columns, 'created_at', shards)
+        # Узкая проекция читается из покрывающего индекса
+        select = ', '.join(query_columns) if query_columns else '*'
+        parts = self._gather(shards, lambda cursor: fetch_records(cursor.execute(
+            f'SELECT {select} FROM orders WHERE {where} ORDER BY created_at DESC', params
+        )))
+        return self._project(self._merge_sorted(parts, itemgetter('created_at')), columns)
+
+    @staticmethod
+    def _order_scope(user_id: int, role: str) -> List[Tuple[str, tuple]]:
+        """Условия видимости заказов для роли (каждое условие обслуживается своим индексом)"""
+        if role == UserRole.CLIENT:
+            return [('client_id = ?', (user_id,))]
+        if role == UserRole.MANAGER:
+            return [('manager_id = ?', (user_id,)), ('manager_id IS NULL', ())]
+        return [('1 = 1', ())]
+
+    @staticmethod
+    def _order_filters(scope_sql: str, scope_params: tuple, status: Optional[str]) -> Tuple[str, list]:
+        where = [scope_sql]
+        params = list(scope_params)
+        if status:
+            where.append('status = ?')
+            params.append(status)
+        return ' AND '.join(where), params
+
+    def count_orders(self, user_id: int, role: str, status: Optional[str] = None) -> int:
+        """Считает заказы пользователя по индексу, не читая сами строки"""
+        return sum(self._gather(self._scope_shards(user_id, role), lambda cursor: self._count_orders(
+            cursor, user_id, role, status
+        )))
+
+    def _count_orders(self, cursor, user_id: int, role: str, status: Optional[str]) -> int:
+        total = 0
+        for scope_sql, scope_params in self._order_scope(user_id, role):
+            where, params = self._order_filters(scope_sql, scope_params, status)
+            cursor.execute(f'SELECT COUNT(*) FROM orders WHERE {where}', params)
+            total += cursor.fetchone()[0]
+        return total
+
+    def get_orders_page(self, user_id: int, role: str, status: Optional[str] = None,
+                        limit: int = 10, cursor: Optional[Tuple[str, int]] = None,
+                        direction: str = 'older') -> Tuple[List[Record], int]:
+        """
+        Возвращает страницу заказов (новые сверху) и их общее количество.
+        cursor - пара (created_at, id) крайнего заказа соседней страницы:
+        direction='older' читает заказы старше курсора, 'newer' - новее.
+        """
+        newer = direction == 'newer'
+        shards = self._scope_shards(user_id, role)
+        parts = self._gather(shards, lambda db_cursor: self._fetch_orders_page(
+            db_cursor, user_id, role, status, limit, cursor, newer
+        ))
+        rows = self._merge_sorted([rows for rows, _ in parts], itemgetter('created_at', 'id'), limit, not newer)
+        if newer:
+            rows.reverse()
+        return rows, sum(total for _, total in parts)
+
+    def _fetch_orders_page(self, db_cursor, user_id: int, role: str, status: Optional[str], limit: int,
+                           cursor: Optional[Tuple[str, int]], newer: bool) -> Tuple[List[Record], int]:
+        """Страница заказов одного шарда в порядке чтения и их количество"""
+        compare, sort = ('>', 'ASC') if newer else ('<', 'DESC')
+
+        branches = []
+        params = []
+        for scope_sql, scope_params in self._order_scope(user_id, role):
+            where, branch_params = self._order_filters(scope_sql, scope_params, status)
+            if cursor:
+                where += f' AND (created_at, id) {compare} (?, ?)'
+                branch_params.extend(cursor)
+            branches.append(f'''
+                SELECT * FROM (
+                    SELECT * FROM orders WHERE {where}
+                    ORDER BY created_at {sort}, id {sort} LIMIT ?
+                )
+            ''')
+            params.extend(branch_params)
+            params.append(limit)
+
+        # Каждая ветка читает не больше limit строк по своему индексу
+        db_cursor.execute(
+            ' UNION ALL '.join(branches) + f' ORDER BY created_at {sort}, id {sort} LIMIT ?',
+            params + [limit]
+        )
+        rows = fetch_records(db_cursor)
+        return rows, self._count_orders(db_cursor, user_id, role, status)
+
+    def iter_orders_for_export(self, status: Optional[str] = None, date_from: Optional[str] = None,
+                               date_to: Optional[str] = None, batch_size: int = 500):
+        """
+        Отдает заказы для выгрузки со сводкой отслеживания и платежей.
+        Читает пачками по batch_size (keyset по created_at, id), поэтому память
+        не зависит от размера таблицы. date_from включительно, date_to - исключая.
+        """
+        where = []
+        params = []
+        if status:
+            where.append('o.status = ?')
+            params.append(status)
+        if date_from:
+            where.append('o.created_at >= ?')
+            params.append(date_from)
+        if date_to:
+            where.append('o.created_at < ?')
+            params.append(date_to)
+
+        # Шарды читаются параллельными курсорами и сливаются по (created_at, id)
+        return heapq.merge(*(
+            self._iter_shard_export(shard, where, params, batch_size) for shard in range(self.shard_count)
+        ), key=itemgetter('created_at', 'id'))
+
+    def _iter_shard_export(self, shard: int, where: List[str], params: list, batch_size: int):
+        conn = self.get_read_connection(shard)
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM orders WHERE manager_id IS NULL ORDER BY created_at DESC')
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        last_key = None
+        try:
+            while True:
+                batch_where = list(where)
+                batch_params = list(params)
+                if last_key:
+                    batch_where.append('(o.created_at, o.id) > (?, ?)')
+                    batch_params.extend(last_key)
+                where_sql = ('WHERE ' + ' AND '.join(batch_where)) if batch_where else ''
+
+                cursor.execute(f'''
+                    SELECT o.*,
+                        (SELECT COUNT(*) FROM tracking t WHERE t.order_id = o.id) AS tracking_events,
+                        (SELECT t.status FROM tracking t WHERE t.order_id = o.id
+                         ORDER BY t.created_at DESC, t.id DESC LIMIT 1) AS last_tracking_status,
+                        (SELECT t.location FROM tracking t WHERE t.order_id = o.id
+                         ORDER BY t.created_at DESC, t.id DESC LIMIT 1) AS last_tracking_location,
+                        (SELECT MAX(t.created_at) FROM tracking t WHERE t.order_id = o.id) AS last_tracking_at,
+                        (SELECT COUNT(*) FROM payments p WHERE p.order_id = o.id) AS payments_count,
+                        (SELECT COALESCE(SUM(p.amount), 0) FROM payments p
+                         WHERE p.order_id = o.id AND p.status = 'completed') AS paid_amount
+                    FROM orders o
+                    {where_sql}
+                    ORDER BY o.created_at, o.id
+                    LIMIT ?
+                ''', batch_params + [batch_size])
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+                last_key = (rows[-1]['created_at'], rows[-1]['id'])
+        finally:
+            conn.close()
+
+    def get_incoming_orders(self, fields: Optional[Sequence[str]] = None) -> List[Record]:
+        """Возвращает заказы без назначенного менеджера"""
+        return self.flights.do(
+            ('incoming_orders', tuple(fields) if fields else None),
+            lambda: self._fetch_orders(range(self.shard_count), 'manager_id IS NULL', (), fields)
+        )
     
-    def get_manager_assigned_orders(self, manager_id: int) -> List[dict]:
+    def get_manager_assigned_orders(self, manager_id: int, fields: Optional[Sequence[str]] = None) -> List[Record]:
         """Возвращает заказы, назначенные конкретному менеджеру"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM orders WHERE manager_id = ? ORDER BY created_at DESC', (manager_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        return self._fetch_orders(range(self.shard_count), 'manager_id = ?', (manager_id,), fields)
     
+    def get_user_stats(self, user: dict) -> dict:
+        """Сводка для главного экрана WebApp в зависимости от роли"""
+        # Сводка админа одна на всех админов, у клиента и менеджера - своя
+        role = getattr(user['role'], 'value', user['role'])
+        scope = None if role == UserRole.ADMIN else user['user_id']
+        return self.flights.do(('user_stats', role, scope), lambda: self._read_user_stats(user))
+
+    def _read_user_stats(self, user: dict) -> dict:
+        with self._read_cursor() as cursor:
+            return self._fetch_user_stats(cursor, user)
+
+    def _fetch_user_stats(self, cursor, user: dict) -> dict:
+        # Считаем заказы по статусам агрегатом, не выбирая сами строки
+        by_status = {}
+
+        def count_by_status(shard_cursor):
+            for scope_sql, scope_params in self._order_scope(user['user_id'], user['role']):
+                shard_cursor.execute(
+                    f'SELECT status, COUNT(*) FROM orders WHERE {scope_sql} GROUP BY status', scope_params
+                )
+                for status, count in shard_cursor.fetchall():
+                    by_status[status] = by_status.get(status, 0) + count
+
+        self._gather(self._scope_shards(user['user_id'], user['role']), count_by_status, cursor)
+        total_orders = sum(by_status.values())
+
+        if user['role'] == UserRole.CLIENT:
+            return {
+                'total_orders': total_orders,
+                'pending': by_status.get('pending', 0),
+                'in_transit': by_status.get('in_transit', 0),
+                'delivered': by_status.get('delivered', 0)
+            }
+        if user['role'] == UserRole.MANAGER:
+            counts = self._gather(range(self.shard_count), lambda shard_cursor: shard_cursor.execute(
+                "SELECT COUNT(*), COALESCE(SUM(status = 'new'), 0) FROM tickets WHERE manager_id = ?",
+                (user['user_id'],)
+            ).fetchone(), cursor)
+            total_tickets = sum(row[0] for row in counts)
+            new_tickets = sum(row[1] for row in counts)
+            return {
+                'total_tickets': total_tickets,
+                'new_tickets': new_tickets,
+                'total_orders': total_orders,
+                'in_progress': by_status.get('in_transit', 0)
+            }
+        cursor.execute('SELECT COUNT(*) FROM users')
+        return {
+            'total_orders': total_orders,
+            'total_users': cursor.fetchone()[0],
+            'pending_orders': by_status.get('pending', 0)
+        }
+
+    def _orders_head(self, cursor, shards: Sequence[int], where: str, params: tuple,
+                     limit: int) -> Tuple[List[Record], int]:
+        """Первые limit заказов по условию со всех шардов и их общее количество"""
+        parts = self._gather(shards, lambda shard_cursor: self._fetch_orders_head(
+            shard_cursor, where, params, limit
+        ), cursor)
+        rows = self._merge_sorted([rows for rows, _ in parts], itemgetter('created_at', 'id'), limit)
+        return rows, sum(total for _, total in parts)
+
+    @staticmethod
+    def _fetch_orders_head(cursor, where: str, params: tuple, limit: int) -> Tuple[List[Record], int]:
+        """Первые limit заказов (новые сверху) и общее количество по условию"""
+        cursor.execute(
+            f'SELECT * FROM orders WHERE {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+            params + (limit,)
+        )
+        rows = fetch_records(cursor)
+        cursor.execute(f'SELECT COUNT(*) FROM orders WHERE {where}', params)
+        return rows, cursor.fetchone()[0]
+
+    def get_webapp_bootstrap(self, user_id: int, session_token: Optional[str], orders_limit: int = 20,
+                             profile_keys: Tuple[str, ...] = ('phone', 'email')) -> Optional[dict]:
+        """
+        Данные стартового экрана WebApp за одно соединение (и один снимок БД; с шардами -
+        по одному соединению на шард):
+        проверка сессии, пользователь, первая страница заказов, статистика и тикеты.
+        Возвращает None, если сессия недействительна или пользователь не найден.
+        """
+        conn = self.get_read_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT session_token FROM user_sessions WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            if not row or not session_token or row['session_token'] != session_token:
+                return None
+            user = self._fetch_user(cursor, user_id)
+            if not user:
+                return None
+
+            result = {
+                'user': user,
+                'profile': self._fetch_user_data(cursor, user_id, list(profile_keys)),
+                'stats': self._fetch_user_stats(cursor, user),
+                'tickets': []
+            }
+            # Списки заказов совпадают с GET /api/orders для роли
+            shards = self._scope_shards(user_id, user['role'])
+            if user['role'] == UserRole.CLIENT:
+                result['orders'], result['orders_total'] = self._orders_head(
+                    cursor, shards, 'client_id = ?', (user_id,), orders_limit
+                )
+            elif user['role'] == UserRole.MANAGER:
+                result['orders'], result['orders_total'] = self._orders_head(
+                    cursor, shards, 'manager_id = ?', (user_id,), orders_limit
+                )
+                result['incoming'], result['incoming_total'] = self._orders_head(
+                    cursor, shards, 'manager_id IS NULL', (), orders_limit
+                )
+                result['tickets'] = self._merge_sorted(self._gather(
+                    shards, lambda shard_cursor: self._fetch_manager_tickets(shard_cursor, user_id), cursor
+                ), itemgetter('assigned_at'))
+            else:
+                result['orders'], result['orders_total'] = self._orders_head(
+                    cursor, shards, '1 = 1', (), orders_limit
+                )
+            return result
+        finally:
+            conn.close()
+
+    def parse_sync_cursor(self, since: Optional[str]) -> List[int]:
+        """
+        Курсор синхронизации -> последний прочитанный seq по каждому шарду.
+        Курсор - seq через запятую (шард определяется диапазоном seq);
+        пустой или '0' - с начала журнала. Неверный курсор - ValueError.
+        """
+        positions = [0] * self.shard_count
+        for value in (since or '0').split(','):
+            try:
+                seq = int(value)
+            except ValueError:
+                seq = -1
+            if seq < 0:
+                raise ValueError('Invalid sync cursor')
+            shard = self.shard_for_id(seq)
+            positions[shard] = max(positions[shard], seq)
+        return positions
+
+    def get_order_changes(self, user_id: int, role: str, since: Optional[str] = None,
+                          limit: int = ORDER_SYNC_LIMIT, fields: Optional[Sequence[str]] = None) -> dict:
+        """
+        Изменения видимых пользователю заказов после курсора since (GET /api/sync).
+        Несколько изменений одного заказа сжимаются в одно: kinds - виды изменений по
+        порядку, order - текущее состояние заказа (fields - только эти колонки).
+        removed - заказ больше не виден пользователю (передан другому менеджеру или ушел
+        в архив). cursor - курсор следующего запроса, has_more - журнал прочитан не
+        до конца (limit записей на шард).
+        """
+        columns = select_fields(fields, ORDER_COLUMNS)
+        positions = self.parse_sync_cursor(since)
+        if role == UserRole.CLIENT:
+            scope, params = 'client_id = ?', (user_id,)
+        elif role == UserRole.MANAGER:
+            # Прежний менеджер видит, что заказ ушел из его списка
+            scope, params = '(manager_id = ? OR manager_id IS NULL OR previous_manager_id = ?)', (user_id, user_id)
+        else:  # ADMIN
+            scope, params = '1 = 1', ()
+
+        changes = []
+        has_more = False
+        shards = self._scope_shards(user_id, role)
+        with self._shard_cursors(shards) as cursors:
+            for shard, cursor in zip(shards, cursors):
+                cursor.execute(f'''
+                    SELECT seq, order_id, kind FROM order_changes
+                    WHERE seq > ? AND {scope}
+                    ORDER BY seq LIMIT ?
+                ''', (positions[shard], *params, limit + 1))
+                rows = cursor.fetchall()
+                if len(rows) > limit:
+                    has_more = True
+                    rows = rows[:limit]
+                if not rows:
+                    continue
+                positions[shard] = rows[-1]['seq']
+
+                compacted = {}
+                for seq, order_id, kind in rows:
+                    entry = compacted.setdefault(order_id, {'order_id': order_id, 'kinds': []})
+                    entry['seq'] = seq
+                    if kind not in entry['kinds']:
+                        entry['kinds'].append(kind)
+
+                cursor.execute(
+                    'SELECT * FROM orders WHERE id IN (SELECT value FROM json_each(?))',
+                    (json.dumps(list(compacted)),)
+                )
+                orders = {order['id']: order for order in fetch_records(cursor)}
+                projection = record_type(tuple(columns)) if columns is not None else None
+                for entry in compacted.values():
+                    order = orders.get(entry['order_id'])
+                    visible = order is not None and self._order_visible(order, user_id, role)
+                    entry['removed'] = not visible
+                    if not visible:
+                        entry['order'] = None
+                    elif projection is not None:
+                        entry['order'] = projection._make(order[name] for name in columns)
+                    else:
+                        entry['order'] = order
+                    changes.append(entry)
+
+        changes.sort(key=itemgetter('seq'))
+        return {'changes': changes, 'cursor': ','.join(map(str, positions)), 'has_more': has_more}
+
+    @staticmethod
+    def _order_visible(order, user_id: int, role: str) -> bool:
+        """Виден ли заказ пользователю в рабочих списках (как в _order_scope)"""
+        if role == UserRole.CLIENT:
+            return order['client_id'] == user_id
+        if role == UserRole.MANAGER:
+            return order['manager_id'] in (user_id, None)
+        return True
+
     def add_chat_message(self, order_id: int, sender_id: int, sender_role: str, message: str) -> int:
         """Добавляет сообщение в чат заказа"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        return self._write(lambda cursor: cursor.execute('''
             INSERT INTO chat_messages (order_id, sender_id, sender_role, message)
             VALUES (?, ?, ?, ?)
-        ''', (order_id, sender_id, sender_role, message))
-        message_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return message_id
+        ''', (order_id, sender_id, sender_role, message)).lastrowid, self.shard_for_id(order_id),
+            keys=[f'order:{order_id}'])
     
-    def get_chat_messages(self, order_id: int, limit: int = 100, offset: int = 0) -> List[dict]:
+    def get_chat_messages(self, order_id: int, limit: int = 100, offset: int = 0) -> List[Record]:
         """Возвращает сообщения чата заказа"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM chat_messages
-            WHERE order_id = ?
-            ORDER BY created_at ASC
-            LIMIT ? OFFSET ?
-        ''', (order_id, limit, offset))
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        with self._read_cursor(self.shard_for_id(order_id)) as cursor:
+            cursor.execute('''
+                SELECT * FROM chat_messages
+                WHERE order_id = ?
+                ORDER BY created_at ASC
+                LIMIT ? OFFSET ?
+            ''', (order_id, limit, offset))
+            rows = fetch_records(cursor)
+            # В архив идем, только если самого заказа в рабочей БД нет
+            if rows or self._order_exists(cursor, order_id):
+                return rows
+        return self._archive_fetch(
+            'SELECT * FROM chat_messages WHERE order_id = ? ORDER BY created_at ASC LIMIT ? OFFSET ?',
+            (order_id, limit, offset)
+        )
     
     def set_order_offer(self, order_id: int, manager_id: int, price: float,
                         currency: str, delivery_days: int, comment: str,
@@ -908,68 +2035,345 @@ class Database:
         Устанавливает оферту по заказу.
         Обновление проходит только если заказ еще не назначен или принадлежит текущему менеджеру.
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE orders
-            SET offer_price = ?, offer_currency = ?, offer_delivery_days = ?,
-                offer_comment = ?, offer_status = ?,
-                manager_id = CASE WHEN manager_id IS NULL THEN ? ELSE manager_id END,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = ? AND (manager_id IS NULL OR manager_id = ?)
-        ''', (
-            price,
-            currency,
-            delivery_days,
-            comment,
-            status,
-            manager_id,
-            order_id,
-            manager_id
-        ))
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
-        return success
+        def write(cursor):
+            previous = self._order_managers(cursor, [order_id])
+            cursor.execute('''
+                UPDATE orders
+                SET offer_price = ?, offer_currency = ?, offer_delivery_days = ?,
+                    offer_comment = ?, offer_status = ?,
+                    manager_id = CASE WHEN manager_id IS NULL THEN ? ELSE manager_id END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND (manager_id IS NULL OR manager_id = ?)
+            ''', (
+                price,
+                currency,
+                delivery_days,
+                comment,
+                status,
+                manager_id,
+                order_id,
+                manager_id
+            ))
+            if cursor.rowcount == 0:
+                return False
+            self._log_order_changes(cursor, 'offer', [order_id], previous)
+            return True
+
+        return self._write(write, self.shard_for_id(order_id), orders=[order_id])
 
     def set_active_session(self, user_id: int, token: str) -> None:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
+        self._write(lambda cursor: cursor.execute('''
             INSERT INTO user_sessions (user_id, session_token, updated_at)
             VALUES (?, ?, CURRENT_TIMESTAMP)
             ON CONFLICT(user_id) DO UPDATE SET
                 session_token=excluded.session_token,
                 updated_at=CURRENT_TIMESTAMP
-        ''', (user_id, token))
-        conn.commit()
-        conn.close()
+        ''', (user_id, token)), keys=[f'session:{user_id}'])
 
     def get_active_session_token(self, user_id: int) -> Optional[str]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT session_token FROM user_sessions WHERE user_id = ?', (user_id,))
-        row = cursor.fetchone()
-        conn.close()
-        return row['session_token'] if row else None
+        key = f'session:{user_id}'
+        found, token, version = self.cache.get(key)
+        if found:
+            return token
+        with self._read_cursor() as cursor:
+            cursor.execute('SELECT session_token FROM user_sessions WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+        token = row['session_token'] if row else None
+        self.cache.set(key, token, version)
+        return token
 
     def clear_active_session(self, user_id: int) -> None:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user_id,))
-        conn.commit()
-        conn.close()
+        self._write(lambda cursor: cursor.execute('DELETE FROM user_sessions WHERE user_id = ?', (user_id,)),
+                    keys=[f'session:{user_id}'])
     
     def update_offer_status(self, order_id: int, status: str) -> bool:
         """Обновляет статус оферты"""
-        conn = self.get_connection()
+        def write(cursor):
+            cursor.execute('''
+                UPDATE orders
+                SET offer_status = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (status, order_id))
+            if cursor.rowcount == 0:
+                return False
+            self._log_order_changes(cursor, 'offer', [order_id])
+            return True
+
+        return self._write(write, self.shard_for_id(order_id), orders=[order_id])
+
+    def _attach_archive(self, cursor) -> None:
+        """
+        Подключает файл архива как схему archive и создает в нем таблицы
+        по образцу основной БД (недостающие колонки добавляются).
+        """
+        cursor.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+        for table, column in ARCHIVE_TABLES:
+            cursor.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+            ddl = cursor.fetchone()[0]
+            cursor.execute(ddl.replace(f'CREATE TABLE {table}', f'CREATE TABLE IF NOT EXISTS archive.{table}', 1))
+
+            cursor.execute(f'PRAGMA archive.table_info({table})')
+            archived_columns = {row['name'] for row in cursor.fetchall()}
+            cursor.execute(f'PRAGMA main.table_info({table})')
+            for row in cursor.fetchall():
+                if row['name'] not in archived_columns:
+                    cursor.execute(f"ALTER TABLE archive.{table} ADD COLUMN {row['name']} {row['type']}")
+
+            if column != 'id':
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS archive.idx_{table}_order ON {table}({column})'
+                )
+
+    def create_broadcast(self, text: str, created_by: Optional[int] = None) -> int:
+        """Создает рассылку всем клиентам с включенными уведомлениями; отправляет utils.broadcast"""
+        def write(cursor):
+            cursor.execute(
+                'SELECT COUNT(*) FROM users WHERE role = ? AND notifications_enabled = 1', (UserRole.CLIENT,)
+            )
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                'INSERT INTO broadcasts (text, created_by, total) VALUES (?, ?, ?)', (text, created_by, total)
+            )
+            return cursor.lastrowid
+
+        return self._write(write)
+
+    def get_broadcast(self, broadcast_id: int) -> Optional[dict]:
+        """Рассылка с прогрессом и скоростью отправки (сообщений в секунду)"""
+        with self._read_cursor() as cursor:
+            row = cursor.execute('SELECT * FROM broadcasts WHERE id = ?', (broadcast_id,)).fetchone()
+        if row is None:
+            return None
+        broadcast = dict(row)
+        processed = broadcast['delivered'] + broadcast['failed'] + broadcast['blocked']
+        broadcast['processed'] = processed
+        broadcast['throughput'] = round(processed / broadcast['elapsed'], 2) if broadcast['elapsed'] else 0
+        return broadcast
+
+    def get_broadcast_recipients(self, after_user_id: int, limit: int) -> List[int]:
+        """Следующая страница получателей рассылки после after_user_id (по индексу idx_users_notifications)"""
+        with self._read_cursor() as cursor:
+            rows = cursor.execute('''
+                SELECT user_id FROM users
+                WHERE role = ? AND notifications_enabled = 1 AND user_id > ?
+                ORDER BY user_id
+                LIMIT ?
+            ''', (UserRole.CLIENT, after_user_id, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def claim_broadcast(self, broadcast_id: int, stale_after: float) -> bool:
+        """
+        Забирает незавершенную рассылку себе: удается, если ее никто не отправляет
+        (нет отчета о прогрессе дольше stale_after секунд)
+        """
+        def write(cursor):
+            cursor.execute('''
+                UPDATE broadcasts SET heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'running'
+                  AND (heartbeat_at IS NULL OR heartbeat_at < datetime('now', ?))
+            ''', (broadcast_id, f'-{int(stale_after)} seconds'))
+            return cursor.rowcount > 0
+
+        return self._write(write)
+
+    def get_stale_broadcasts(self, stale_after: float) -> List[int]:
+        """Незавершенные рассылки, которые никто не отправляет (процесс-отправитель упал)"""
+        with self._read_cursor() as cursor:
+            rows = cursor.execute('''
+                SELECT id FROM broadcasts
+                WHERE status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < datetime('now', ?))
+                ORDER BY id
+            ''', (f'-{int(stale_after)} seconds',)).fetchall()
+        return [row[0] for row in rows]
+
+    def save_broadcast_progress(self, broadcast_id: int, last_user_id: int, delivered: int = 0,
+                                failed: int = 0, blocked: int = 0, elapsed: float = 0.0,
+                                status: Optional[str] = None) -> None:
+        """
+        Контрольная точка рассылки: счетчики прибавляются, last_user_id сдвигается.
+        status - итоговый статус (done); отмененная рассылка статус не меняет.
+        """
+        def write(cursor):
+            cursor.execute('''
+                UPDATE broadcasts
+                SET last_user_id = MAX(last_user_id, ?), delivered = delivered + ?, failed = failed + ?,
+                    blocked = blocked + ?, elapsed = elapsed + ?, heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (last_user_id, delivered, failed, blocked, elapsed, broadcast_id))
+            if status:
+                cursor.execute('''
+                    UPDATE broadcasts SET status = ?, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status = 'running'
+                ''', (status, broadcast_id))
+
+        self._write(write)
+
+    def cancel_broadcast(self, broadcast_id: int) -> bool:
+        """Останавливает рассылку (отправитель заметит отмену на следующей странице получателей)"""
+        def write(cursor):
+            cursor.execute('''
+                UPDATE broadcasts SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'running'
+            ''', (broadcast_id,))
+            return cursor.rowcount > 0
+
+        return self._write(write)
+
+    def _archive_fetch(self, query: str, params: tuple) -> List[Record]:
+        """Выполняет чтение из архива (только чтение, без блокировки основной БД)"""
+        if self.in_memory:
+            conn = sqlite3.connect(self.archive_path, uri=True)
+        elif not os.path.exists(self.archive_path):
+            return []
+        else:
+            conn = sqlite3.connect(Path(self.archive_path).resolve().as_uri() + '?mode=ro', uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            return fetch_records(conn.execute(query, params))
+        except sqlite3.OperationalError:
+            # Архив создан, но нужной таблицы в нем еще нет
+            return []
+        finally:
+            conn.close()
+
+    def archive_orders(self, older_than_days: Optional[int] = None,
+                       batch_size: Optional[int] = None) -> dict:
+        """
+        Переносит заказы в конечных статусах, не менявшиеся older_than_days дней,
+        вместе с отслеживанием, чатом, платежами и тикетами в файл архива.
+        Каждая пачка из batch_size заказов переносится отдельной транзакцией,
+        чтобы не держать блокировку записи долго. Возвращает число строк по таблицам.
+        """
+        older_than_days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        batch_size = batch_size or ARCHIVE_BATCH_SIZE
+        moved = {table: 0 for table, _ in ARCHIVE_TABLES}
+        # У каждого шарда свой диапазон id, поэтому все шарды переносятся в один архив
+        for shard in range(self.shard_count):
+            self._archive_shard(shard, older_than_days, batch_size, moved)
+        return moved
+
+    def _archive_shard(self, shard: int, older_than_days: int, batch_size: int, moved: dict) -> None:
+        placeholders = ', '.join('?' for _ in ARCHIVE_STATUSES)
+        age = f'-{older_than_days} days'
+        # Заказы, изменившиеся между копированием и удалением: переносятся при следующем запуске
+        skipped = []
+        conn = self.get_connection(shard)
         cursor = conn.cursor()
+        try:
+            self._attach_archive(cursor)
+            conn.commit()
+            columns = {}
+            for table, _ in ARCHIVE_TABLES:
+                cursor.execute(f'PRAGMA main.table_info({table})')
+                columns[table] = ', '.join(row['name'] for row in cursor.fetchall())
+
+            while True:
+                cursor.execute(f'''
+                    SELECT id FROM main.orders
+                    WHERE status IN ({placeholders}) AND updated_at < datetime('now', ?)
+                      AND id NOT IN (SELECT value FROM json_each(?))
+                    LIMIT ?
+                ''', (*ARCHIVE_STATUSES, age, json.dumps(skipped), batch_size))
+                order_ids = [row['id'] for row in cursor.fetchall()]
+                if not order_ids:
+                    break
+
+                # Копирование берет блокировку записи только файла архива
+                ids_json = json.dumps(order_ids)
+                copied = {}
+                try:
+                    for table, column in ARCHIVE_TABLES:
+                        cursor.execute(
+                            f'SELECT id FROM main.{table} WHERE {column} IN (SELECT value FROM json_each(?))',
+                            (ids_json,)
+                        )
+                        copied[table] = {row['id'] for row in cursor.fetchall()}
+                        cursor.execute(f'''
+                            INSERT OR REPLACE INTO archive.{table} ({columns[table]})
+                            SELECT {columns[table]} FROM main.{table}
+                            WHERE id IN (SELECT value FROM json_each(?))
+                        ''', (json.dumps(list(copied[table])),))
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+
+                # Удаление - обычной записью шарда: очередь записи, журнал изменений и сброс кэшей
+                archived, counts = self._write(
+                    lambda write_cursor: self._remove_archived(write_cursor, order_ids, copied, age),
+                    shard, orders=order_ids
+                )
+                skipped.extend(set(order_ids) - archived)
+                for table, count in counts.items():
+                    moved[table] += count
+
+                if len(order_ids) < batch_size:
+                    break
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _remove_archived(cursor, order_ids: List[int], copied: dict, age: str) -> Tuple[set, dict]:
+        """
+        Удаляет из шарда скопированные в архив заказы. Заказ остается, если после
+        копирования он изменился или у него появились новые строки (копия в архиве
+        перезапишется при следующем переносе). Возвращает (перенесенные id, число строк по таблицам).
+        """
+        placeholders = ', '.join('?' for _ in ARCHIVE_STATUSES)
+        cursor.execute(f'''
+            SELECT id FROM orders
+            WHERE id IN (SELECT value FROM json_each(?))
+              AND status IN ({placeholders}) AND updated_at < datetime('now', ?)
+        ''', (json.dumps(order_ids), *ARCHIVE_STATUSES, age))
+        archived = {row['id'] for row in cursor.fetchall()}
+        for table, column in ARCHIVE_TABLES:
+            cursor.execute(
+                f'SELECT {column} AS order_id, id FROM {table} WHERE {column} IN (SELECT value FROM json_each(?))',
+                (json.dumps(order_ids),)
+            )
+            archived -= {row['order_id'] for row in cursor.fetchall() if row['id'] not in copied[table]}
+
+        ids_json = json.dumps(list(archived))
+        # Для синхронизации заказ уходит из рабочих списков
         cursor.execute('''
-            UPDATE orders
-            SET offer_status = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (status, order_id))
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
-        return success
\ No newline at end of file
+            INSERT INTO order_changes (order_id, kind, client_id, manager_id)
+            SELECT id, 'archived', client_id, manager_id FROM orders
+            WHERE id IN (SELECT value FROM json_each(?))
+        ''', (ids_json,))
+        counts = {}
+        for table, column in ARCHIVE_TABLES:
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN (SELECT value FROM json_each(?))', (ids_json,))
+            counts[table] = cursor.rowcount
+        return archived, counts
+
+_shared_db: Optional[Database] = None
+_shared_db_lock = threading.Lock()
+
+
+def get_database() -> Database:
+    """
+    Общий для процесса экземпляр Database. Создается при первом обращении,
+    поэтому схема проверяется один раз, а импорт модулей не открывает БД.
+    """
+    global _shared_db
+    if _shared_db is None:
+        with _shared_db_lock:
+            if _shared_db is None:
+                from utils.telegram_runtime import get_telegram_runtime
+
+                db = Database()
+                # atexit вызывает обработчики в обратном порядке: накопленные уведомления
+                # отправляются раньше, чем клиент Telegram дорабатывает очередь и закрывается
+                get_telegram_runtime()
+                atexit.register(db.notifier.close)
+                _shared_db = db
+    return _shared_db
+
+
+class SharedDatabase:
+    """Заместитель общего экземпляра: обращения к атрибутам уходят в get_database()"""
+    def __getattr__(self, item):
+        return getattr(get_database(), item)
+
+
+shared_db = SharedDatabase()
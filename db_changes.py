@@ -0,0 +1,223 @@
+"""
+Канал инвалидации кэшей между процессами.
+
+Бот и веб-приложение работают отдельными процессами с одним файлом БД.
+Каждая запись, меняющая пользователя, сессию или заказ, той же транзакцией
+добавляет ключи изменений ('user:42', 'session:42', 'order:7', ...) в таблицу
+changes. Фоновый поток каждого процесса проверяет PRAGMA data_version (значение
+меняется, когда файл изменило другое соединение) и, если файл менялся, читает
+новые строки changes и сбрасывает в своих кэшах ровно эти ключи. В своем
+процессе ключи сбрасываются сразу после фиксации, без ожидания опроса.
+"""
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ключ изменения "сбросить все" (массовое удаление данных в обход методов записи)
+FLUSH_KEY = '*'
+
+
+def record_changes(cursor, keys: Iterable[str], keep: int) -> None:
+    """Пишет ключи изменений в текущей транзакции; хранятся последние keep записей"""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return
+    cursor.executemany('INSERT INTO changes (key) VALUES (?)', [(key,) for key in keys])
+    # lastrowid после executemany не обновляется (остается от прошлой вставки, например id заказа)
+    cursor.execute('DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?', (keep,))
+
+
+class ChangeFeed:
+    def __init__(self, connect: Callable[[int], sqlite3.Connection], shards: int, interval: float = 0.02,
+                 poll: bool = True):
+        """
+        connect(shard) - соединение для опроса шарда (открывается в потоке опроса).
+        interval - пауза между опросами в секундах. poll=False - без опроса
+        (БД в памяти: других процессов у нее нет).
+        """
+        self._connect = connect
+        self.shards = shards
+        self.interval = interval
+        self.poll_enabled = poll
+        self._subscribers: List[Callable[[Optional[set]], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            'published': 0,
+            'received': 0,
+            'polls': 0,
+            'flushes': 0,
+            'errors': 0,
+        }
+
+    def subscribe(self, callback: Callable[[Optional[set]], None]) -> None:
+        """
+        callback(keys) вызывается с множеством измененных ключей;
+        None - сбросить все (изменения могли быть пропущены).
+        Первая подписка запускает опрос.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        if self.poll_enabled:
+            self._ensure_started()
+
+    def unsubscribe(self, callback: Callable[[Optional[set]], None]) -> None:
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, keys: Iterable[str]) -> None:
+        """Сбрасывает ключи в кэшах своего процесса (после фиксации записи)"""
+        keys = set(keys)
+        if keys:
+            with self._lock:
+                self._stats['published'] += len(keys)
+            self._dispatch(keys)
+
+    def _dispatch(self, keys: Optional[set]) -> None:
+        if keys is not None and FLUSH_KEY in keys:
+            with self._lock:
+                self._stats['flushes'] += 1
+            keys = None
+        for callback in list(self._subscribers):
+            try:
+                callback(keys)
+            except Exception as e:
+                logger.error(f"Ошибка сброса кэша: {e}")
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='db-changes', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        # Для каждого шарда: соединение, последний data_version и последний прочитанный seq
+        state = {}
+        try:
+            while not self._stop.is_set():
+                for shard in range(self.shards):
+                    try:
+                        if shard in state:
+                            self._poll(shard, state)
+                        else:
+                            conn = self._connect(shard)
+                            version = conn.execute('PRAGMA data_version').fetchone()[0]
+                            # Изменения до подписки не нужны: кэши еще пусты
+                            last = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+                            state[shard] = [conn, version, last]
+                    except sqlite3.Error as e:
+                        with self._lock:
+                            self._stats['errors'] += 1
+                        logger.warning(f"Ошибка опроса изменений шарда {shard}: {e}")
+                        if shard in state:
+                            state.pop(shard)[0].close()
+                            # Пока соединение переоткрывается, изменения могут быть пропущены
+                            self._flush()
+                self._stop.wait(self.interval)
+        finally:
+            for conn, _, _ in state.values():
+                conn.close()
+
+    def _poll(self, shard: int, state: dict) -> None:
+        conn, version, last = state[shard]
+        with self._lock:
+            self._stats['polls'] += 1
+        current = conn.execute('PRAGMA data_version').fetchone()[0]
+        if current == version:
+            return
+        oldest = conn.execute('SELECT MIN(seq) FROM changes').fetchone()[0]
+        rows = conn.execute('SELECT seq, key FROM changes WHERE seq > ? ORDER BY seq', (last,)).fetchall()
+        state[shard] = [conn, current, rows[-1][0] if rows else last]
+        if oldest is not None and oldest > last + 1:
+            # Часть изменений уже удалена из таблицы (процесс долго не опрашивал)
+            self._flush()
+            return
+        keys = {key for _, key in rows}
+        if keys:
+            with self._lock:
+                self._stats['received'] += len(keys)
+            self._dispatch(keys)
+
+    def _flush(self) -> None:
+        with self._lock:
+            self._stats['flushes'] += 1
+        self._dispatch(None)
+
+    def close(self) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._stop.set()
+            thread.join(5)
+        self._thread = None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'polling': self._thread is not None and self._thread.is_alive(),
+                'interval': self.interval,
+                'subscribers': len(self._subscribers),
+                **self._stats,
+            }
+
+
+class InvalidatingCache:
+    def __init__(self, feed: ChangeFeed, maxsize: int = 2048):
+        """LRU-кэш, записи которого сбрасываются по ключам изменений из feed"""
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[Hashable, object]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Растет при каждом сбросе: значение, прочитанное до сброса, в кэш не попадет
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        feed.subscribe(self.invalidate)
+
+    def get(self, key: Hashable) -> Tuple[bool, object, int]:
+        """(найдено, значение, версия); версию передать в set после чтения из БД"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key], self._version
+            self.misses += 1
+            return False, None, self._version
+
+    def set(self, key: Hashable, value, version: int) -> None:
+        with self._lock:
+            if version != self._version or self.maxsize <= 0:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, keys: Optional[Iterable[Hashable]]) -> None:
+        """Сбрасывает ключи; None - весь кэш"""
+        with self._lock:
+            self._version += 1
+            if keys is None:
+                self.evictions += len(self._data)
+                self._data.clear()
+                return
+            for key in keys:
+                if key in self._data:
+                    del self._data[key]
+                    self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
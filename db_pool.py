@@ -0,0 +1,185 @@
+"""
+Пул соединений только для чтения (mode=ro, query_only).
+
+Чтение из GET-маршрутов веб-приложения и экранов просмотра в боте идет через
+отдельные соединения, не пересекаясь с путем записи. Каждое выданное соединение
+открывает транзакцию чтения: в режиме WAL все запросы метода видят один снимок
+БД и не ждут пишущее соединение. close() возвращает соединение в пул.
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Включена ли "полоса чтения" в текущем запросе/обработчике
+_read_lane = contextvars.ContextVar('db_read_lane', default=False)
+
+
+def read_lane_active() -> bool:
+    return _read_lane.get()
+
+
+def enter_read_lane() -> contextvars.Token:
+    """Включает полосу чтения до exit_read_lane (для хуков запроса Flask)"""
+    return _read_lane.set(True)
+
+
+def exit_read_lane(token: contextvars.Token) -> None:
+    _read_lane.reset(token)
+
+
+@contextmanager
+def read_lane():
+    """Чтения внутри блока идут через пул только-чтения"""
+    token = enter_read_lane()
+    try:
+        yield
+    finally:
+        exit_read_lane(token)
+
+
+def use_read_lane(func):
+    """Декоратор для обработчиков просмотра: чтения идут через пул только-чтения"""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            # asyncio.to_thread копирует контекст, поэтому флаг виден и в потоках
+            with read_lane():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with read_lane():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class PooledConnection(sqlite3.Connection):
+    """Соединение из пула: close() возвращает его в пул вместо закрытия"""
+    pool = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            super().close()
+
+
+class ReadOnlyPool:
+    def __init__(self, db_path: str, size: int = 4, timeout: float = 5.0):
+        self.uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._created = 0
+        self._in_use = 0
+        self._lock = threading.Condition()
+        self._stats = {
+            'acquired': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'errors': 0,
+        }
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(self.uri, uri=True, timeout=self.timeout, check_same_thread=False,
+                               isolation_level=None, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA query_only = 1')
+        conn.pool = self
+        return conn
+
+    def acquire(self) -> Optional[PooledConnection]:
+        """
+        Выдает соединение, ожидая свободное не дольше timeout.
+        Возвращает None, если пул исчерпан или БД недоступна для чтения.
+        """
+        if self.size <= 0:
+            return None
+        started = time.monotonic()
+        conn = None
+        with self._lock:
+            waited = False
+            while not self._idle and self._created >= self.size:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    return None
+                waited = True
+                self._lock.wait(remaining)
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                self._created += 1
+            self._in_use += 1
+
+            wait_time = time.monotonic() - started
+            self._stats['acquired'] += 1
+            if waited:
+                self._stats['waits'] += 1
+                self._stats['wait_time_total'] += wait_time
+                self._stats['wait_time_max'] = max(self._stats['wait_time_max'], wait_time)
+
+        try:
+            if conn is None:
+                conn = self._connect()
+            # Снимок БД на все запросы, пока соединение не вернется в пул
+            conn.execute('BEGIN')
+        except sqlite3.Error as e:
+            logger.warning(f"Пул чтения недоступен: {e}")
+            self._discard(conn)
+            return None
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._lock:
+            self._idle.append(conn)
+            self._in_use -= 1
+            self._lock.notify()
+
+    def _discard(self, conn: Optional[PooledConnection]) -> None:
+        if conn is not None:
+            conn.pool = None
+            conn.close()
+        with self._lock:
+            self._stats['errors'] += 1
+            self._created -= 1
+            self._in_use -= 1
+            self._lock.notify()
+
+    def close(self) -> None:
+        """Закрывает свободные соединения пула"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            conn.pool = None
+            conn.close()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'size': self.size,
+                'timeout': self.timeout,
+                'open': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                **self._stats,
+            }
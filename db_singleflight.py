@@ -0,0 +1,97 @@
+"""
+Объединение одинаковых одновременных чтений (singleflight).
+
+Когда несколько менеджеров одновременно открывают WebApp, одни и те же тяжелые
+выборки (статистика админа, входящие заказы, список менеджеров) запускаются
+параллельно и повторяют одни и те же проходы по SQLite. Первый вызов с данным
+ключом выполняет запрос, остальные, пришедшие пока он выполняется, ждут и
+получают его результат (каждый - свою поверхностную копию).
+
+После записи в БД новые вызовы к уже идущим запросам не присоединяются:
+запрос, начатый до записи, мог ее не увидеть.
+"""
+import copy
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List
+
+
+class SingleFlight:
+    def __init__(self):
+        # Ключ -> [Future идущего запроса, сколько вызовов его ждут]
+        self._calls: Dict[Hashable, List] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _name_stats(self, name: str) -> Dict[str, float]:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = {'executed': 0, 'coalesced': 0, 'errors': 0, 'wait_total': 0.0, 'max_waiters': 0}
+        return stats
+
+    def do(self, key: Hashable, fetch: Callable):
+        """
+        Выполняет fetch() или ждет результат уже идущего вызова с тем же ключом.
+        Первый элемент ключа-кортежа - имя запроса в метриках.
+        """
+        name = key[0] if isinstance(key, tuple) else str(key)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [Future(), 0]
+            else:
+                call[1] += 1
+        future = call[0]
+
+        if not leader:
+            started = time.monotonic()
+            try:
+                result = future.result()
+            finally:
+                with self._lock:
+                    stats = self._name_stats(name)
+                    stats['coalesced'] += 1
+                    stats['wait_total'] += time.monotonic() - started
+            # Вызывающие могут менять список или словарь результата
+            return copy.copy(result)
+
+        try:
+            result = fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            with self._lock:
+                self._name_stats(name)['errors'] += 1
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                stats = self._name_stats(name)
+                stats['executed'] += 1
+                stats['max_waiters'] = max(stats['max_waiters'], call[1])
+
+    def forget(self, keys=None) -> None:
+        """Новые вызовы не присоединяются к уже идущим (подписка на канал изменений БД)"""
+        with self._lock:
+            self._calls.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                calls = stats['executed'] + stats['coalesced']
+                result[name] = dict(
+                    stats,
+                    wait_total=round(stats['wait_total'], 4),
+                    coalesced_ratio=round(stats['coalesced'] / calls, 3) if calls else 0,
+                )
+            return {
+                'in_flight': len(self._calls),
+                'waiting': sum(waiters for _, waiters in self._calls.values()),
+                'queries': result,
+            }
@@ -0,0 +1,209 @@
+"""
+Очередь записи с групповой фиксацией (group commit).
+
+Все записи процесса в файл шарда выполняет один поток-писатель этого шарда:
+вызывающие потоки (запросы Flask, обработчики бота, фоновые потоки уведомлений)
+ставят операцию в очередь шарда и получают Future. Писатели разных шардов
+фиксируют пачки одновременно. Писатель забирает из очереди все накопившиеся операции
+(не больше max_batch) и выполняет их одной транзакцией BEGIN IMMEDIATE, каждую
+в своей точке сохранения: ошибка одной операции откатывает только ее.
+Результаты выдаются после COMMIT. Если БД занята другим процессом (бот и
+веб-приложение пишут в один файл), транзакция повторяется с нарастающей паузой.
+
+Операция - функция от курсора; она не фиксирует транзакцию сама и не делает
+сетевых вызовов (уведомления отправляются вызывающим после получения результата).
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Метка остановки потока-писателя
+_STOP = object()
+
+
+def is_busy_error(error: Exception) -> bool:
+    """БД заблокирована другим соединением (SQLITE_BUSY / SQLITE_LOCKED)"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+class WriteQueue:
+    def __init__(self, connect: Callable[[int], sqlite3.Connection], max_batch: int = 64,
+                 batch_wait: float = 0.0, retries: int = 5):
+        """
+        connect(shard) - новое соединение с файлом шарда (открывается в потоке-писателе).
+        batch_wait - сколько секунд добирать операции в пачку после первой
+        (0 - только то, что накопилось, пока фиксировалась предыдущая пачка).
+        retries - сколько раз повторить пачку, если БД занята другим процессом.
+        """
+        self._connect = connect
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = batch_wait
+        self.retries = retries
+        self._queues: Dict[int, queue.Queue] = {}
+        self._threads: Dict[int, threading.Thread] = {}
+        self._start_lock = threading.Lock()
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'committed': 0,
+            'failed': 0,
+            'batches': 0,
+            'batch_size_max': 0,
+            'queue_depth_max': 0,
+            'queue_wait_total': 0.0,
+            'queue_wait_max': 0.0,
+            'lock_wait_total': 0.0,
+            'lock_wait_max': 0.0,
+            'busy_retries': 0,
+            'busy_failures': 0,
+        }
+
+    def submit(self, operation: Callable, shard: int = 0) -> Future:
+        """Ставит операцию operation(cursor) в очередь; Future получит ее результат после COMMIT"""
+        if threading.current_thread() in self._threads.values():
+            # Писатель ждал бы сам себя (или писателя другого шарда, который может ждать его)
+            raise RuntimeError('Запись из операции очереди записи не поддерживается')
+        future = Future()
+        tasks = self._ensure_started(shard)
+        tasks.put((operation, shard, future, time.monotonic()))
+        depth = tasks.qsize()
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['queue_depth_max'] = max(self._stats['queue_depth_max'], depth)
+        return future
+
+    def execute(self, operation: Callable, shard: int = 0, timeout: Optional[float] = None):
+        """Выполняет операцию через очередь и ждет результат (исключение операции пробрасывается)"""
+        return self.submit(operation, shard).result(timeout)
+
+    def _ensure_started(self, shard: int) -> queue.Queue:
+        """Очередь шарда; поток-писатель шарда запускается при первой записи"""
+        thread = self._threads.get(shard)
+        if thread is not None and thread.is_alive():
+            return self._queues[shard]
+        with self._start_lock:
+            thread = self._threads.get(shard)
+            if thread is None or not thread.is_alive():
+                tasks = self._queues.setdefault(shard, queue.Queue())
+                thread = threading.Thread(target=self._run, args=(shard, tasks), name=f'db-writer-{shard}',
+                                          daemon=True)
+                self._threads[shard] = thread
+                thread.start()
+            return self._queues[shard]
+
+    def _run(self, shard: int, tasks: queue.Queue) -> None:
+        stopping = False
+        while not stopping:
+            task = tasks.get()
+            if task is _STOP:
+                break
+            batch = [task]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    task = tasks.get(timeout=remaining) if remaining > 0 else tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is _STOP:
+                    stopping = True
+                    break
+                batch.append(task)
+
+            self._commit(shard, batch)
+
+        conn = self._connections.pop(shard, None)
+        if conn is not None:
+            conn.close()
+
+    def _connection(self, shard: int) -> sqlite3.Connection:
+        conn = self._connections.get(shard)
+        if conn is None:
+            conn = self._connect(shard)
+            # Транзакциями управляет писатель явно
+            conn.isolation_level = None
+            self._connections[shard] = conn
+        return conn
+
+    def _commit(self, shard: int, tasks: list) -> None:
+        started = time.monotonic()
+        queue_waits = [started - submitted for _, _, _, submitted in tasks]
+        conn = None
+        for attempt in range(self.retries + 1):
+            results = []
+            try:
+                conn = self._connection(shard)
+                conn.execute('BEGIN IMMEDIATE')
+                lock_wait = time.monotonic() - started
+                cursor = conn.cursor()
+                for operation, _, future, _ in tasks:
+                    cursor.execute('SAVEPOINT write_task')
+                    try:
+                        results.append((future, operation(cursor), None))
+                    except Exception as e:
+                        cursor.execute('ROLLBACK TO write_task')
+                        results.append((future, None, e))
+                    cursor.execute('RELEASE write_task')
+                conn.execute('COMMIT')
+                break
+            except sqlite3.Error as e:
+                if conn is not None and conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                if is_busy_error(e) and attempt < self.retries:
+                    with self._lock:
+                        self._stats['busy_retries'] += 1
+                    time.sleep(min(0.01 * 2 ** attempt, 0.5))
+                    continue
+                logger.error(f"Ошибка фиксации пачки записи ({len(tasks)} оп.): {e}")
+                with self._lock:
+                    self._stats['failed'] += len(tasks)
+                    if is_busy_error(e):
+                        self._stats['busy_failures'] += 1
+                for _, _, future, _ in tasks:
+                    future.set_exception(e)
+                return
+
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['batch_size_max'] = max(self._stats['batch_size_max'], len(tasks))
+            self._stats['queue_wait_total'] += sum(queue_waits)
+            self._stats['queue_wait_max'] = max(self._stats['queue_wait_max'], max(queue_waits))
+            self._stats['lock_wait_total'] += lock_wait
+            self._stats['lock_wait_max'] = max(self._stats['lock_wait_max'], lock_wait)
+            for _, _, error in results:
+                self._stats['committed' if error is None else 'failed'] += 1
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Дожидается уже поставленных операций и останавливает потоки-писатели"""
+        with self._start_lock:
+            threads = [(shard, thread) for shard, thread in self._threads.items() if thread.is_alive()]
+            for shard, _ in threads:
+                self._queues[shard].put(_STOP)
+            deadline = time.monotonic() + timeout
+            for _, thread in threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+            self._threads = {}
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        done = stats['committed'] + stats['failed']
+        return {
+            'max_batch': self.max_batch,
+            'queue_depth': sum(tasks.qsize() for tasks in list(self._queues.values())),
+            'batch_size_avg': round(done / stats['batches'], 2) if stats['batches'] else 0,
+            **stats,
+        }
@@ -1,12 +1,11 @@
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
-from database import Database
+from database import shared_db as db
 from models.user import UserRole
 from utils.role_helper import check_user_role
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 
 async def set_role_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1,14 +1,18 @@
+import asyncio
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
-from database import Database
+from database import shared_db as db
+from db_pool import use_read_lane
 from models.user import UserRole
 from keyboards.admin_keyboard import get_admin_menu, get_admin_panel_menu, get_user_management_keyboard
+from keyboards.pagination_keyboard import get_pagination_keyboard
+from utils.pagination import fetch_page, page_pattern
 from utils.role_helper import check_user_role
-from config import WEBAPP_URL
+from utils.update_processor import limit_concurrency
+from config import WEBAPP_URL, BOT_HEAVY_HANDLER_LIMIT
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 
 async def admin_users_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -30,60 +34,83 @@ async def admin_users_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def admin_list_clients_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик списка клиентов"""
     query = update.callback_query
     await query.answer()
     
-    clients = db.get_all_users(role=UserRole.CLIENT)
+    page = await fetch_page(
+        context, 'ac', query.data,
+        fetch=lambda cursor, direction, limit: db.get_users_page(UserRole.CLIENT, limit, cursor, direction),
+        load_row=db.get_user,
+        key='user_id'
+    )
     
-    if not clients:
+    if not page.rows:
         message = "👥 Клиентов не найдено"
     else:
-        message = f"👥 Список клиентов ({len(clients)}):\n\n"
-        for client in clients[:20]:  # Показываем первых 20
+        message = f"👥 Список клиентов ({page.total}), стр. {page.number}/{page.pages}:\n\n"
+        for client in page.rows:
             message += f"• {client['first_name']} (@{client['username'] or 'нет username'})\n"
             message += f"  ID: {client['user_id']}\n\n"
     
     await query.edit_message_text(
         text=message,
-        reply_markup=get_admin_panel_menu()
+        reply_markup=get_pagination_keyboard(page, "back_to_admin_menu")
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def admin_list_managers_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик списка менеджеров"""
     query = update.callback_query
     await query.answer()
     
-    managers = db.get_all_users(role=UserRole.MANAGER)
+    page = await fetch_page(
+        context, 'am', query.data,
+        fetch=lambda cursor, direction, limit: db.get_users_page(UserRole.MANAGER, limit, cursor, direction),
+        load_row=db.get_user,
+        key='user_id'
+    )
     
-    if not managers:
+    if not page.rows:
         message = "👨‍💼 Менеджеров не найдено"
     else:
-        message = f"👨‍💼 Список менеджеров ({len(managers)}):\n\n"
-        for manager in managers[:20]:
+        message = f"👨‍💼 Список менеджеров ({page.total}), стр. {page.number}/{page.pages}:\n\n"
+        for manager in page.rows:
             message += f"• {manager['first_name']} (@{manager['username'] or 'нет username'})\n"
             message += f"  ID: {manager['user_id']}\n\n"
     
     await query.edit_message_text(
         text=message,
-        reply_markup=get_admin_panel_menu()
+        reply_markup=get_pagination_keyboard(page, "back_to_admin_menu")
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def admin_orders_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик просмотра всех заказов"""
     query = update.callback_query
     await query.answer()
     
-    orders = db.get_user_orders(0, UserRole.ADMIN)  # Админ видит все заказы
+    # Админ видит все заказы
+    page = await fetch_page(
+        context, 'ao', query.data,
+        fetch=lambda cursor, direction, limit: db.get_orders_page(
+            0, UserRole.ADMIN, limit=limit, cursor=cursor, direction=direction
+        ),
+        load_row=db.get_order
+    )
     
-    if not orders:
+    if not page.rows:
         message = "📦 Заказов не найдено"
     else:
-        message = f"📦 Все заказы ({len(orders)}):\n\n"
-        for order in orders[:10]:
+        message = f"📦 Все заказы ({page.total}), стр. {page.number}/{page.pages}:\n\n"
+        for order in page.rows:
             status_emoji = {
                 'pending': '⏳',
                 'in_progress': '🚚',
@@ -97,29 +124,31 @@ async def admin_orders_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     
     await query.edit_message_text(
         text=message,
-        reply_markup=get_admin_panel_menu()
+        reply_markup=get_pagination_keyboard(page, "back_to_admin_menu")
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def admin_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик статистики"""
     query = update.callback_query
     await query.answer()
     
-    all_users = db.get_all_users()
-    clients = db.get_all_users(role=UserRole.CLIENT)
-    managers = db.get_all_users(role=UserRole.MANAGER)
-    orders = db.get_user_orders(0, UserRole.ADMIN)
+    users_count = await asyncio.to_thread(db.count_users)
+    clients_count = await asyncio.to_thread(db.count_users, UserRole.CLIENT)
+    managers_count = await asyncio.to_thread(db.count_users, UserRole.MANAGER)
+    orders_count = await asyncio.to_thread(db.count_orders, 0, UserRole.ADMIN)
     
     message = f"""
 📊 Статистика системы:
 
-👥 Всего пользователей: {len(all_users)}
-   • Клиентов: {len(clients)}
-   • Менеджеров: {len(managers)}
-   • Админов: {len(all_users) - len(clients) - len(managers)}
+👥 Всего пользователей: {users_count}
+   • Клиентов: {clients_count}
+   • Менеджеров: {managers_count}
+   • Админов: {users_count - clients_count - managers_count}
 
-📦 Всего заказов: {len(orders)}
+📦 Всего заказов: {orders_count}
     """
     
     await query.edit_message_text(
@@ -128,6 +157,7 @@ async def admin_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
 
 
+@use_read_lane
 async def admin_profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик профиля админа"""
     query = update.callback_query
@@ -233,6 +263,9 @@ def register_admin_handlers(application):
     application.add_handler(CallbackQueryHandler(admin_list_clients_handler, pattern="^admin_list_clients$"))
     application.add_handler(CallbackQueryHandler(admin_list_managers_handler, pattern="^admin_list_managers$"))
     application.add_handler(CallbackQueryHandler(admin_orders_handler, pattern="^admin_orders$"))
+    application.add_handler(CallbackQueryHandler(admin_list_clients_handler, pattern=page_pattern('ac')))
+    application.add_handler(CallbackQueryHandler(admin_list_managers_handler, pattern=page_pattern('am')))
+    application.add_handler(CallbackQueryHandler(admin_orders_handler, pattern=page_pattern('ao')))
     application.add_handler(CallbackQueryHandler(admin_stats_handler, pattern="^admin_stats$"))
     application.add_handler(CallbackQueryHandler(admin_profile_handler, pattern="^admin_profile$"))
     application.add_handler(CallbackQueryHandler(admin_system_settings_handler, pattern="^admin_system_settings$"))
@@ -1,15 +1,20 @@
+import asyncio
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
-from database import Database
+from database import shared_db as db
+from db_pool import use_read_lane
 from keyboards.client_keyboard import get_client_menu, get_back_to_client_menu_keyboard
+from keyboards.pagination_keyboard import get_pagination_keyboard
+from utils.pagination import fetch_page, page_pattern
 from utils.role_helper import get_user_role_menu
-from config import WEBAPP_URL
+from utils.update_processor import limit_concurrency
+from config import WEBAPP_URL, BOT_HEAVY_HANDLER_LIMIT
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 
+@use_read_lane
 async def client_profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик просмотра профиля клиента"""
     query = update.callback_query
@@ -17,7 +22,7 @@ async def client_profile_handler(update: Update, context: ContextTypes.DEFAULT_T
     
     user_id = query.from_user.id
     user = db.get_user(user_id)
-    orders = db.get_user_orders(user_id, 'client')
+    orders_count = await asyncio.to_thread(db.count_orders, user_id, 'client')
     
     message = f"""
 📊 Ваш профиль:
@@ -26,7 +31,7 @@ async def client_profile_handler(update: Update, context: ContextTypes.DEFAULT_T
 👤 Имя: {user['first_name'] or 'Не указано'}
 📝 Фамилия: {user['last_name'] or 'Не указано'}
 🔖 Username: @{user['username'] or 'Не указано'}
-📦 Заказов: {len(orders)}
+📦 Заказов: {orders_count}
 👤 Роль: Клиент
     """
     
@@ -36,19 +41,27 @@ async def client_profile_handler(update: Update, context: ContextTypes.DEFAULT_T
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def client_orders_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик просмотра заказов клиента"""
     query = update.callback_query
     await query.answer()
     
     user_id = query.from_user.id
-    orders = db.get_user_orders(user_id, 'client')
+    page = await fetch_page(
+        context, 'co', query.data,
+        fetch=lambda cursor, direction, limit: db.get_orders_page(
+            user_id, 'client', limit=limit, cursor=cursor, direction=direction
+        ),
+        load_row=db.get_order
+    )
     
-    if not orders:
+    if not page.rows:
         message = "📦 У вас пока нет заказов.\n\nСоздайте первый заказ через WebApp!"
     else:
-        message = f"📦 <b>Ваши заказы ({len(orders)}):</b>\n\n"
-        for order in orders[:10]:  # Показываем первые 10
+        message = f"📦 <b>Ваши заказы ({page.total}), стр. {page.number}/{page.pages}:</b>\n\n"
+        for order in page.rows:
             status_emoji = {
                 'pending': '⏳',
                 'in_progress': '🚚',
@@ -76,7 +89,7 @@ async def client_orders_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     await query.edit_message_text(
         text=message,
-        reply_markup=get_back_to_client_menu_keyboard(WEBAPP_URL),
+        reply_markup=get_pagination_keyboard(page, "back_to_client_menu"),
         parse_mode='HTML'
     )
 
@@ -190,6 +203,7 @@ def register_client_handlers(application):
     """Регистрирует обработчики для клиентов"""
     application.add_handler(CallbackQueryHandler(client_profile_handler, pattern="^client_profile$"))
     application.add_handler(CallbackQueryHandler(client_orders_handler, pattern="^client_orders$"))
+    application.add_handler(CallbackQueryHandler(client_orders_handler, pattern=page_pattern('co')))
     application.add_handler(CallbackQueryHandler(client_rules_handler, pattern="^client_rules$"))
     application.add_handler(CallbackQueryHandler(client_create_order_handler, pattern="^client_create_order$"))
     application.add_handler(CallbackQueryHandler(client_settings_handler, pattern="^client_settings$"))
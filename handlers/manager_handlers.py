@@ -1,28 +1,45 @@
+import asyncio
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes, CallbackQueryHandler
-from database import Database
+from database import shared_db as db
+from db_pool import use_read_lane
 from keyboards.manager_keyboard import get_manager_menu, get_back_to_manager_menu_keyboard
+from keyboards.pagination_keyboard import get_pagination_keyboard
+from utils.pagination import fetch_page, page_pattern
 from utils.role_helper import check_user_role
-from config import WEBAPP_URL
+from utils.update_processor import limit_concurrency
+from config import WEBAPP_URL, BOT_HEAVY_HANDLER_LIMIT
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 
+async def _fetch_orders_page(context, screen: str, query, status: str = None):
+    """Загружает страницу заказов менеджера для экрана списка"""
+    user_id = query.from_user.id
+    return await fetch_page(
+        context, screen, query.data,
+        fetch=lambda cursor, direction, limit: db.get_orders_page(
+            user_id, 'manager', status=status, limit=limit, cursor=cursor, direction=direction
+        ),
+        load_row=db.get_order
+    )
+
+
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def manager_orders_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик просмотра заказов менеджера"""
     query = update.callback_query
     await query.answer()
     
-    user_id = query.from_user.id
-    orders = db.get_user_orders(user_id, 'manager')
+    page = await _fetch_orders_page(context, 'mo', query)
     
-    if not orders:
+    if not page.rows:
         message = "📦 У вас пока нет заказов"
     else:
-        message = f"📦 Ваши заказы ({len(orders)}):\n\n"
-        for order in orders[:10]:
+        message = f"📦 Ваши заказы ({page.total}), стр. {page.number}/{page.pages}:\n\n"
+        for order in page.rows:
             status_emoji = {
                 'pending': '⏳',
                 'in_progress': '🚚',
@@ -36,93 +53,93 @@ async def manager_orders_handler(update: Update, context: ContextTypes.DEFAULT_T
     
     await query.edit_message_text(
         text=message,
-        reply_markup=get_back_to_manager_menu_keyboard(WEBAPP_URL)
+        reply_markup=get_pagination_keyboard(page, "back_to_manager_menu")
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def manager_new_orders_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик новых заказов"""
     query = update.callback_query
     await query.answer()
     
-    user_id = query.from_user.id
-    all_orders = db.get_user_orders(user_id, 'manager')
-    new_orders = [o for o in all_orders if o['status'] == 'pending']
+    page = await _fetch_orders_page(context, 'mn', query, status='pending')
     
-    if not new_orders:
+    if not page.rows:
         message = "📋 Новых заказов нет"
     else:
-        message = f"📋 Новые заказы ({len(new_orders)}):\n\n"
-        for order in new_orders[:10]:
+        message = f"📋 Новые заказы ({page.total}), стр. {page.number}/{page.pages}:\n\n"
+        for order in page.rows:
             message += f"⏳ Заказ #{order['id']}\n"
             message += f"   Клиент ID: {order['client_id']}\n"
             message += f"   Описание: {order['description'][:50]}...\n\n"
     
     await query.edit_message_text(
         text=message,
-        reply_markup=get_back_to_manager_menu_keyboard(WEBAPP_URL)
+        reply_markup=get_pagination_keyboard(page, "back_to_manager_menu")
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def manager_in_progress_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик заказов в работе"""
     query = update.callback_query
     await query.answer()
     
-    user_id = query.from_user.id
-    all_orders = db.get_user_orders(user_id, 'manager')
-    in_progress = [o for o in all_orders if o['status'] == 'in_progress']
+    page = await _fetch_orders_page(context, 'mp', query, status='in_progress')
     
-    if not in_progress:
+    if not page.rows:
         message = "🚚 Заказов в работе нет"
     else:
-        message = f"🚚 Заказы в работе ({len(in_progress)}):\n\n"
-        for order in in_progress[:10]:
+        message = f"🚚 Заказы в работе ({page.total}), стр. {page.number}/{page.pages}:\n\n"
+        for order in page.rows:
             message += f"🚚 Заказ #{order['id']}\n"
             message += f"   Клиент ID: {order['client_id']}\n\n"
     
     await query.edit_message_text(
         text=message,
-        reply_markup=get_back_to_manager_menu_keyboard(WEBAPP_URL)
+        reply_markup=get_pagination_keyboard(page, "back_to_manager_menu")
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def manager_completed_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик завершенных заказов"""
     query = update.callback_query
     await query.answer()
     
-    user_id = query.from_user.id
-    all_orders = db.get_user_orders(user_id, 'manager')
-    completed = [o for o in all_orders if o['status'] == 'completed']
+    page = await _fetch_orders_page(context, 'mc', query, status='completed')
     
-    if not completed:
+    if not page.rows:
         message = "✅ Завершенных заказов нет"
     else:
-        message = f"✅ Завершенные заказы ({len(completed)}):\n\n"
-        for order in completed[:10]:
+        message = f"✅ Завершенные заказы ({page.total}), стр. {page.number}/{page.pages}:\n\n"
+        for order in page.rows:
             message += f"✅ Заказ #{order['id']}\n"
             message += f"   Клиент ID: {order['client_id']}\n\n"
     
     await query.edit_message_text(
         text=message,
-        reply_markup=get_back_to_manager_menu_keyboard(WEBAPP_URL)
+        reply_markup=get_pagination_keyboard(page, "back_to_manager_menu")
     )
 
 
+@limit_concurrency(BOT_HEAVY_HANDLER_LIMIT)
+@use_read_lane
 async def manager_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик статистики менеджера"""
     query = update.callback_query
     await query.answer()
     
     user_id = query.from_user.id
-    all_orders = db.get_user_orders(user_id, 'manager')
-    
     stats = {
-        'total': len(all_orders),
-        'pending': len([o for o in all_orders if o['status'] == 'pending']),
-        'in_progress': len([o for o in all_orders if o['status'] == 'in_progress']),
-        'completed': len([o for o in all_orders if o['status'] == 'completed'])
+        'total': await asyncio.to_thread(db.count_orders, user_id, 'manager'),
+        'pending': await asyncio.to_thread(db.count_orders, user_id, 'manager', 'pending'),
+        'in_progress': await asyncio.to_thread(db.count_orders, user_id, 'manager', 'in_progress'),
+        'completed': await asyncio.to_thread(db.count_orders, user_id, 'manager', 'completed')
     }
     
     message = f"""
@@ -140,6 +157,7 @@ async def manager_stats_handler(update: Update, context: ContextTypes.DEFAULT_TY
     )
 
 
+@use_read_lane
 async def manager_profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик профиля менеджера"""
     query = update.callback_query
@@ -147,7 +165,7 @@ async def manager_profile_handler(update: Update, context: ContextTypes.DEFAULT_
     
     user_id = query.from_user.id
     user = db.get_user(user_id)
-    orders = db.get_user_orders(user_id, 'manager')
+    orders_count = await asyncio.to_thread(db.count_orders, user_id, 'manager')
     
     message = f"""
 📊 Ваш профиль (Менеджер):
@@ -156,7 +174,7 @@ async def manager_profile_handler(update: Update, context: ContextTypes.DEFAULT_
 👤 Имя: {user['first_name'] or 'Не указано'}
 📝 Фамилия: {user['last_name'] or 'Не указано'}
 🔖 Username: @{user['username'] or 'Не указано'}
-📦 Заказов: {len(orders)}
+📦 Заказов: {orders_count}
 👨‍💼 Роль: Менеджер
     """
     
@@ -196,6 +214,10 @@ def register_manager_handlers(application):
     application.add_handler(CallbackQueryHandler(manager_new_orders_handler, pattern="^manager_new_orders$"))
     application.add_handler(CallbackQueryHandler(manager_in_progress_handler, pattern="^manager_in_progress$"))
     application.add_handler(CallbackQueryHandler(manager_completed_handler, pattern="^manager_completed$"))
+    application.add_handler(CallbackQueryHandler(manager_orders_handler, pattern=page_pattern('mo')))
+    application.add_handler(CallbackQueryHandler(manager_new_orders_handler, pattern=page_pattern('mn')))
+    application.add_handler(CallbackQueryHandler(manager_in_progress_handler, pattern=page_pattern('mp')))
+    application.add_handler(CallbackQueryHandler(manager_completed_handler, pattern=page_pattern('mc')))
     application.add_handler(CallbackQueryHandler(manager_stats_handler, pattern="^manager_stats$"))
     application.add_handler(CallbackQueryHandler(manager_profile_handler, pattern="^manager_profile$"))
     application.add_handler(CallbackQueryHandler(manager_settings_handler, pattern="^manager_settings$"))
@@ -1,12 +1,11 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from database import Database
+from database import shared_db as db
 from utils.role_helper import check_user_role, get_user_role_menu
 from config import WEBAPP_URL
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 
 def get_privacy_policy_text() -> str:
@@ -2,12 +2,11 @@ import logging
 import json
 from telegram import Update
 from telegram.ext import ContextTypes, MessageHandler, filters
-from database import Database
+from database import shared_db as db
 from models.user import UserRole
 from config import WEBAPP_URL
 
 logger = logging.getLogger(__name__)
-db = Database()
 
 
 async def webapp_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -0,0 +1,25 @@
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from utils.pagination import Page, page_callback, OLDER, NEWER
+
+
+def get_pagination_keyboard(page: Page, back_callback: str) -> InlineKeyboardMarkup:
+    """Клавиатура с кнопками ⬅️/➡️ для списка и кнопкой назад"""
+    keyboard = []
+
+    navigation = []
+    if page.has_prev and page.rows:
+        navigation.append(InlineKeyboardButton(
+            "⬅️ Пред.",
+            callback_data=page_callback(page.screen, page.number - 1, NEWER, page.first_id)
+        ))
+    if page.has_next and page.rows:
+        navigation.append(InlineKeyboardButton(
+            "След. ➡️",
+            callback_data=page_callback(page.screen, page.number + 1, OLDER, page.last_id)
+        ))
+    if navigation:
+        keyboard.append(navigation)
+
+    keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data=back_callback)])
+    return InlineKeyboardMarkup(keyboard)
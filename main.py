@@ -14,7 +14,10 @@ from handlers.webapp_handler import register_webapp_handlers
 from handlers.admin_commands import register_admin_commands
 from utils.error_handler import register_error_handler
 from utils.telegram_logger import init_log_group
-from config import LOG_GROUP_ID
+from utils.rate_governor import init_rate_governor
+from utils.telegram_rate_limiter import TelegramRateLimiter
+from utils.update_processor import ChatOrderedUpdateProcessor
+from config import LOG_GROUP_ID, BOT_CONCURRENT_UPDATES, TELEGRAM_BOT_GLOBAL_RATE
 
 # Настройка логирования
 logging.basicConfig(
@@ -57,7 +60,15 @@ def main():
     
     # Создаем приложение
     try:
-        application = Application.builder().token(BOT_TOKEN).build()
+        # Апдейты обрабатываются параллельно, но в пределах одного чата - по порядку
+        application = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .concurrent_updates(ChatOrderedUpdateProcessor(BOT_CONCURRENT_UPDATES))
+            # Общие с уведомлениями и логами лимиты частоты Telegram (доля бота в лимите токена)
+            .rate_limiter(TelegramRateLimiter(init_rate_governor(TELEGRAM_BOT_GLOBAL_RATE)))
+            .build()
+        )
         logger.info("✅ Приложение создано успешно")
     except Exception as e:
         logger.error(f"❌ Ошибка при создании приложения: {e}")
@@ -1,4 +1,4 @@
+from .records import Record, fetch_records
 from .user import User, UserRole
 
-__all__ = ['User', 'UserRole']
-
+__all__ = ['Record', 'fetch_records', 'User', 'UserRole']
@@ -0,0 +1,171 @@
+"""
+Компактные записи строк БД.
+
+Строка списка хранится как кортеж значений без словаря на каждую строку;
+поля читаются по имени: record['status'], record.get('price'), record.status.
+Тип записи создается один раз на набор колонок запроса и кэшируется,
+там же заранее собирается JSON-шаблон объекта для быстрой сериализации.
+"""
+import json
+from collections.abc import Mapping
+from itertools import chain
+from typing import Dict, Iterable, List, Sequence, Tuple, Type
+
+_new_tuple = tuple.__new__
+_tuple_getitem = tuple.__getitem__
+_tuple_iter = tuple.__iter__
+
+
+class Record(tuple):
+    """Базовый тип записи: кортеж значений с доступом к полям по имени"""
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+    _index: Dict[str, int] = {}
+    _template: str = '{}'
+
+    @classmethod
+    def _make(cls, values: Iterable) -> 'Record':
+        return _new_tuple(cls, values)
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return _tuple_getitem(self, self._index[key])
+        return _tuple_getitem(self, key)
+
+    def __getattr__(self, name):
+        index = self._index.get(name)
+        if index is None:
+            raise AttributeError(name)
+        return _tuple_getitem(self, index)
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        return default if index is None else _tuple_getitem(self, index)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(_tuple_iter(self))
+
+    def items(self):
+        return zip(self._fields, _tuple_iter(self))
+
+    def __iter__(self):
+        # Как у словаря: перебор по именам полей
+        return iter(self._fields)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self._fields == other._fields and tuple.__eq__(self, other)
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = tuple.__hash__
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self.items())!r})'
+
+    def __reduce__(self):
+        return _restore_record, (type(self).__mro__[1], self._fields, tuple(_tuple_iter(self)))
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+
+Mapping.register(Record)
+
+_record_types: Dict[Tuple[type, Tuple[str, ...]], Type[Record]] = {}
+
+
+def record_type(fields: Tuple[str, ...], base: Type[Record] = Record) -> Type[Record]:
+    """Тип записи для набора колонок (создается один раз и кэшируется)"""
+    key = (base, fields)
+    cls = _record_types.get(key)
+    if cls is None:
+        cls = type(base.__name__, (base,), {
+            '__slots__': (),
+            '_fields': fields,
+            '_index': {name: i for i, name in enumerate(fields)},
+            '_template': '{' + ','.join(f"{json.dumps(name).replace('%', '%%')}:%s" for name in fields) + '}',
+        })
+        _record_types[key] = cls
+    return cls
+
+
+def _restore_record(base: Type[Record], fields: Tuple[str, ...], values: tuple) -> Record:
+    return _new_tuple(record_type(fields, base), values)
+
+
+def fetch_records(cursor, base: Type[Record] = Record) -> List[Record]:
+    """Читает результат запроса списком записей, минуя sqlite3.Row и dict"""
+    cls = record_type(tuple(column[0] for column in cursor.description), base)
+    row_factory = cursor.row_factory
+    cursor.row_factory = None
+    rows = cursor.fetchall()
+    cursor.row_factory = row_factory
+    return [_new_tuple(cls, row) for row in rows]
+
+
+# Разделитель значений при кодировании: управляющие символы json всегда экранирует,
+# поэтому в закодированных значениях он в сыром виде встретиться не может
+_VALUE_SEPARATOR = '\x1f'
+
+
+def dumps_records(records: Sequence[Record], ensure_ascii: bool = True, default=None) -> str:
+    """
+    JSON-массив объектов прямо из кортежей, без промежуточных словарей.
+    Все значения кодируются одним вызовом C-кодировщика json, затем
+    подставляются в заранее собранные шаблоны объектов.
+    """
+    if not records:
+        return '[]'
+    values = list(chain.from_iterable(map(_tuple_iter, records)))
+    if not values:
+        return '[' + ','.join(['{}'] * len(records)) + ']'
+    encoded = json.dumps(values, ensure_ascii=ensure_ascii, default=default,
+                         separators=(_VALUE_SEPARATOR, ':'))
+    template = '[' + ','.join([record._template for record in records]) + ']'
+    return template % tuple(encoded[1:-1].split(_VALUE_SEPARATOR))
+
+
+def _has_records(value) -> bool:
+    """Есть ли запись на любом уровне вложенности (в любом элементе списка, а не только в первом)"""
+    if isinstance(value, Record):
+        return True
+    if isinstance(value, dict):
+        return any(_has_records(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_records(item) for item in value)
+    return False
+
+
+def dumps(obj, **kwargs) -> str:
+    """
+    json.dumps, который сериализует записи объектами через готовые шаблоны.
+    Части ответа без записей целиком отдаются стандартному кодировщику.
+    """
+    ensure_ascii = kwargs.get('ensure_ascii', True)
+    if isinstance(obj, Record):
+        return dumps_records((obj,), ensure_ascii, kwargs.get('default'))[1:-1]
+    if isinstance(obj, dict):
+        if not any(_has_records(value) for value in obj.values()):
+            return json.dumps(obj, **kwargs)
+        items = sorted(obj.items()) if kwargs.get('sort_keys') else obj.items()
+        return '{' + ','.join(
+            f'{json.dumps(str(key), ensure_ascii=ensure_ascii)}:{dumps(value, **kwargs)}' for key, value in items
+        ) + '}'
+    if isinstance(obj, (list, tuple)) and obj:
+        if all(isinstance(item, Record) for item in obj):
+            return dumps_records(obj, ensure_ascii, kwargs.get('default'))
+        if any(_has_records(item) for item in obj):
+            return '[' + ','.join(dumps(item, **kwargs) for item in obj) + ']'
+    return json.dumps(obj, **kwargs)
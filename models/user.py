@@ -1,5 +1,7 @@
 from enum import Enum
 
+from .records import Record
+
 
 class UserRole(str, Enum):
     """Роли пользователей в системе"""
@@ -8,24 +10,27 @@ class UserRole(str, Enum):
     MANAGER = "manager"  # Менеджер логистической компании
 
 
-class User:
-    """Модель пользователя"""
-    def __init__(self, user_id, username=None, first_name=None, last_name=None, role=UserRole.CLIENT):
-        self.user_id = user_id
-        self.username = username
-        self.first_name = first_name
-        self.last_name = last_name
-        self.role = role
+class User(Record):
+    """
+    Модель пользователя: компактная запись строки users.
+    Database возвращает пользователей этим типом с полным набором колонок таблицы.
+    """
+    __slots__ = ()
+    _fields = ('user_id', 'username', 'first_name', 'last_name', 'role')
+    _index = {name: i for i, name in enumerate(_fields)}
+    _template = '{' + ','.join(f'"{name}":%s' for name in _fields) + '}'
+
+    def __new__(cls, user_id, username=None, first_name=None, last_name=None, role=UserRole.CLIENT):
+        return tuple.__new__(cls, (user_id, username, first_name, last_name, role))
     
     def is_admin(self):
         """Проверяет, является ли пользователь администратором"""
-        return self.role == UserRole.ADMIN
+        return self['role'] == UserRole.ADMIN
     
     def is_manager(self):
         """Проверяет, является ли пользователь менеджером"""
-        return self.role == UserRole.MANAGER
+        return self['role'] == UserRole.MANAGER
     
     def is_client(self):
         """Проверяет, является ли пользователь клиентом"""
-        return self.role == UserRole.CLIENT
-
+        return self['role'] == UserRole.CLIENT
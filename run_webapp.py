@@ -25,6 +25,15 @@ if __name__ == '__main__':
     print(f"📱 URL: http://localhost:{port}")
     print(f"🌐 Debug mode: {debug}")
     print(f"🌍 Host: {host}")
+
+    # Рассылки, брошенные упавшим процессом, продолжаются с контрольной точки
+    from config import BOT_TOKEN
+    if BOT_TOKEN:
+        from database import get_database
+        from utils.broadcast import BroadcastEngine
+        resumed = BroadcastEngine(get_database()).resume_stale()
+        if resumed:
+            print(f"📣 Продолжены рассылки: {', '.join(map(str, resumed))}")
     
     try:
         app.run(host=host, port=port, debug=debug)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Перенос старых завершенных заказов в архивную БД.
+
+Заказы в статусах delivered/completed/cancelled, не менявшиеся заданное число дней,
+переносятся вместе с отслеживанием, чатом, платежами и тикетами в ARCHIVE_DATABASE_PATH.
+Запускать по расписанию (cron), например раз в сутки.
+
+Примеры:
+    python scripts/archive_orders.py
+    python scripts/archive_orders.py --days 30 --batch-size 500 --vacuum
+"""
+import argparse
+import os
+import sys
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Архивация завершенных заказов')
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                        help='Переносить заказы, не менявшиеся столько дней')
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                        help='Заказов в одной транзакции')
+    parser.add_argument('--vacuum', action='store_true',
+                        help='Сжать основную БД после переноса (блокирует БД на время работы)')
+    args = parser.parse_args()
+
+    db = Database()
+    moved = db.archive_orders(older_than_days=args.days, batch_size=args.batch_size)
+    print(f"✅ Перенесено в архив {db.archive_path}: " +
+          ', '.join(f'{table}={count}' for table, count in moved.items()))
+
+    if args.vacuum and moved['orders']:
+        for shard in range(db.shard_count):
+            conn = db.get_connection(shard)
+            conn.execute('VACUUM')
+            conn.close()
+        print('✅ Основная БД сжата')
+
+
+if __name__ == '__main__':
+    main()
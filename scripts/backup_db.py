@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Резервное копирование БД без остановки бота и веб-приложения.
+
+Копируются основная БД, файлы шардов (DB_SHARDS) и архив заказов (если он есть). Старые копии
+удаляются, остаются последние BACKUP_KEEP.
+
+Примеры:
+    python scripts/backup_db.py create --compress
+    python scripts/backup_db.py schedule --interval-hours 6
+    python scripts/backup_db.py verify data/backups/bot_database_20240101_030000.db.gz
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from database import shard_file_path
+from utils.backup import create_backup, rotate_backups, verify_backup
+
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def backup_all(args) -> bool:
+    """Снимает и проверяет копии всех файлов БД. Возвращает True, если все копии исправны"""
+    success = True
+    shards = [shard_file_path(config.DATABASE_PATH, shard) for shard in range(config.DB_SHARDS)]
+    for db_path in (*shards, config.ARCHIVE_DATABASE_PATH):
+        if not os.path.exists(db_path):
+            continue
+        try:
+            path = create_backup(db_path, args.dir, pages=config.BACKUP_PAGES_PER_STEP,
+                                 step_sleep=config.BACKUP_STEP_SLEEP, compress=args.compress,
+                                 max_restarts=config.BACKUP_MAX_RESTARTS)
+            report = verify_backup(str(path))
+        except Exception as e:
+            logger.error(f"❌ Ошибка резервного копирования {db_path}: {e}")
+            success = False
+            continue
+        if report['integrity'] != 'ok':
+            logger.error(f"❌ Копия {path} повреждена: {report['integrity']}")
+            success = False
+            continue
+        for removed in rotate_backups(db_path, args.dir, args.keep):
+            logger.info(f"🗑️  Удалена старая копия {removed}")
+        logger.info(f"✅ Копия готова: {path}")
+    return success
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Резервное копирование БД')
+    parser.add_argument('--dir', default=config.BACKUP_DIR, help='Каталог для копий')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in (('create', 'Снять копию сейчас'), ('schedule', 'Снимать копии по расписанию')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--keep', type=int, default=config.BACKUP_KEEP, help='Сколько копий хранить')
+        sub.add_argument('--compress', action='store_true', default=config.BACKUP_COMPRESS,
+                         help='Сжимать копии gzip')
+        if name == 'schedule':
+            sub.add_argument('--interval-hours', type=float, default=config.BACKUP_INTERVAL_HOURS,
+                             help='Интервал между копиями')
+
+    verify = subparsers.add_parser('verify', help='Проверить, что из копии можно восстановиться')
+    verify.add_argument('backup', help='Путь к копии (.db или .db.gz)')
+    verify.add_argument('--against', default=config.DATABASE_PATH,
+                        help='Рабочая БД для сравнения количества строк')
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        sys.exit(0 if backup_all(args) else 1)
+
+    if args.command == 'schedule':
+        logger.info(f"⏰ Резервное копирование каждые {args.interval_hours} ч в {args.dir}")
+        while True:
+            started = time.monotonic()
+            backup_all(args)
+            time.sleep(max(0.0, args.interval_hours * 3600 - (time.monotonic() - started)))
+
+    report = verify_backup(args.backup, args.against if os.path.exists(args.against) else None)
+    print(f"Целостность: {report['integrity']}")
+    for table, counts in report['tables'].items():
+        marker = '⚠️ ' if table in report['mismatched'] else '  '
+        live = f" / рабочая БД {counts['live']}" if 'live' in counts else ''
+        print(f"{marker}{table}: {counts['backup']}{live}")
+    print('✅ Копия пригодна для восстановления' if report['ok'] else '❌ Проверка не пройдена')
+    sys.exit(0 if report['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
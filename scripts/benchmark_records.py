@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Сравнение компактных записей (models.records) со словарями на строку.
+
+Заполняет БД в памяти заказами и для одного и того же списка замеряет:
+время чтения, память на строку и время сериализации в JSON
+(словари - json.dumps как во Flask, записи - шаблоны dumps_records).
+
+Пример:
+    python scripts/benchmark_records.py --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+def best_time(func, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def traced_bytes(func) -> int:
+    tracemalloc.start()
+    result = func()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Записи против словарей: память и сериализация')
+    parser.add_argument('--rows', type=int, default=10000, help='Сколько заказов в списке')
+    parser.add_argument('--repeat', type=int, default=5, help='Повторов замера (берется лучший)')
+    args = parser.parse_args()
+
+    os.environ['SKIP_DOTENV'] = '1'
+    os.environ.pop('BOT_TOKEN', None)
+    os.environ.pop('LOG_GROUP_ID', None)
+
+    from database import Database, MEMORY_DATABASE
+    from models.records import dumps_records
+    from models.user import UserRole
+
+    db = Database(MEMORY_DATABASE)
+    db.add_user(1, username='bench', role=UserRole.CLIENT)
+    for start in range(0, args.rows, 1000):
+        db.bulk_create_orders([
+            {
+                'client_id': 1, 'description': f'Паллета {i}, хрупкое, не кантовать',
+                'from_address': 'Москва, ул. Складская, 1', 'to_address': f'Тверь, ул. Заводская, {i % 90}',
+                'from_contact': '+79000000000', 'to_contact': '+79000000001', 'weight': 120.5, 'price': 5000 + i
+            }
+            for i in range(start, min(start + 1000, args.rows))
+        ])
+
+    def fetch_dicts():
+        conn = db.get_connection()
+        rows = [dict(row) for row in conn.execute('SELECT * FROM orders ORDER BY created_at DESC')]
+        conn.close()
+        return rows
+
+    def fetch_records():
+        return db.get_user_orders(0, UserRole.ADMIN)
+
+    dicts = fetch_dicts()
+    records = fetch_records()
+    assert json.loads(json.dumps(dicts)) == json.loads(dumps_records(records)), 'JSON не совпадает'
+
+    # Словари сериализуются так же, как это делал стандартный JSON-провайдер Flask (sort_keys=True)
+    fetch = (best_time(fetch_dicts, args.repeat) * 1000, best_time(fetch_records, args.repeat) * 1000)
+    encode = (best_time(lambda: json.dumps(dicts, sort_keys=True), args.repeat) * 1000,
+              best_time(lambda: dumps_records(records), args.repeat) * 1000)
+    results = [
+        ('чтение, мс', *fetch),
+        ('память на строку, байт', traced_bytes(fetch_dicts) / len(dicts), traced_bytes(fetch_records) / len(records)),
+        ('JSON, мс', *encode),
+        ('чтение + JSON, мс', fetch[0] + encode[0], fetch[1] + encode[1]),
+    ]
+
+    print(f'Строк: {len(records)}, колонок: {len(records[0].keys())}, sqlite {sqlite3.sqlite_version}')
+    print(f'{"":26} {"dict":>10} {"записи":>10} {"выигрыш":>8}')
+    for label, baseline, compact in results:
+        print(f'{label:26} {baseline:10.1f} {compact:10.1f} {baseline / compact:7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Замер пропускной способности записи заказов в зависимости от числа шардов.
+
+Для каждого числа шардов создает временную БД в файлах, затем несколько
+процессов (как бот и веб-приложение) по несколько потоков параллельно создают
+заказы и двигают их статус (create_order + update_order_status - одна запись
+в шард клиента каждая). Печатает операций записи в секунду и ускорение
+относительно одного шарда.
+
+Шардирование ускоряет только запись, упирающуюся в фиксацию, и только между
+независимыми писателями: внутри процесса записи одного шарда и так
+объединяются в пачки (db_writer), а разные процессы ждут блокировку записи
+файла друг друга. С шардами процессы фиксируют пачки в разные файлы
+одновременно. --commit-latency-ms имитирует медленный fsync (диск без кэша
+записи, сетевой том): писатель держит блокировку файла на это время при
+каждом COMMIT. С --commit-latency-ms 0 на временном каталоге замер упирается
+в процессор внутри SQLite и от числа шардов не зависит.
+
+Пример:
+    python scripts/benchmark_sharding.py --processes 8 --threads 1 --commit-latency-ms 20 --shards 1,2,4
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+class SlowCommitConnection(sqlite3.Connection):
+    """Соединение писателя, у которого COMMIT длится не меньше latency секунд"""
+    latency = 0.0
+
+    def execute(self, sql, *args):
+        if self.latency and sql == 'COMMIT':
+            # Блокировка записи файла удерживается, как при ожидании fsync
+            time.sleep(self.latency)
+        return super().execute(sql, *args)
+
+
+def open_database(path: str, shards: int, latency: float):
+    from config import DB_BUSY_TIMEOUT
+    from database import Database
+
+    class BenchDatabase(Database):
+        def _connect_writer(self, shard: int) -> sqlite3.Connection:
+            conn = sqlite3.connect(self.shard_paths[shard], timeout=DB_BUSY_TIMEOUT,
+                                   check_same_thread=False, factory=SlowCommitConnection)
+            conn.latency = latency
+            conn.row_factory = sqlite3.Row
+            return conn
+
+    return BenchDatabase(path, shards=shards)
+
+
+def write_orders(path: str, shards: int, process_index: int, args, start, done) -> None:
+    """Процесс-писатель: ждет общего старта и пишет свою долю заказов в args.threads потоков"""
+    db = open_database(path, shards, args.commit_latency_ms / 1000)
+    per_thread = args.orders // (args.processes * args.threads)
+    errors = []
+
+    def worker(index: int):
+        try:
+            for i in range(per_thread):
+                client_id = (index + i * args.processes * args.threads) % args.clients + 1
+                order_id = db.create_order(client_id=client_id, description=f'Заказ {index}-{i}')
+                db.update_order_status(order_id, 'accepted')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(process_index * args.threads + index,))
+               for index in range(args.threads)]
+    start.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db.close()
+    done.put(repr(errors[0]) if errors else None)
+
+
+def run(shards: int, args) -> float:
+    from models.user import UserRole
+
+    workdir = tempfile.mkdtemp(prefix='sharding_bench_')
+    try:
+        path = os.path.join(workdir, 'bench.db')
+        db = open_database(path, shards, 0.0)
+        for client_id in range(1, args.clients + 1):
+            db.add_user(client_id, username=f'client{client_id}', role=UserRole.CLIENT)
+        db.close()
+
+        context = multiprocessing.get_context('fork')
+        start = context.Event()
+        done = context.Queue()
+        processes = [context.Process(target=write_orders, args=(path, shards, index, args, start, done))
+                     for index in range(args.processes)]
+        for process in processes:
+            process.start()
+        # Процессы открывают БД до старта, замеряется только запись
+        time.sleep(0.5)
+        started = time.perf_counter()
+        start.set()
+        errors = [done.get() for _ in processes]
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+        errors = [error for error in errors if error]
+        if errors:
+            raise RuntimeError(errors[0])
+
+        written = args.orders // (args.processes * args.threads) * args.processes * args.threads
+        db = open_database(path, shards, 0.0)
+        assert db.count_orders(0, UserRole.ADMIN) == written
+        db.close()
+        return written * 2 / elapsed
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пропускная способность записи по числу шардов')
+    parser.add_argument('--orders', type=int, default=800, help='Сколько заказов создать')
+    parser.add_argument('--processes', type=int, default=8, help='Пишущих процессов')
+    parser.add_argument('--threads', type=int, default=1, help='Пишущих потоков в процессе')
+    parser.add_argument('--clients', type=int, default=200, help='Сколько клиентов')
+    parser.add_argument('--commit-latency-ms', type=float, default=20.0,
+                        help='Имитируемая длительность fsync при COMMIT (0 - без имитации)')
+    parser.add_argument('--shards', default='1,2,4', help='Числа шардов через запятую')
+    args = parser.parse_args()
+
+    os.environ['SKIP_DOTENV'] = '1'
+    os.environ.pop('BOT_TOKEN', None)
+    os.environ.pop('LOG_GROUP_ID', None)
+
+    baseline = None
+    print(f'Заказов: {args.orders}, процессов: {args.processes}, потоков: {args.threads}, '
+          f'клиентов: {args.clients}, COMMIT: {args.commit_latency_ms} мс')
+    print(f'{"шардов":>7} {"записей/сек":>12} {"ускорение":>10}')
+    for shards in (int(value) for value in args.shards.split(',')):
+        throughput = run(shards, args)
+        baseline = baseline or throughput
+        print(f'{shards:7d} {throughput:12.0f} {throughput / baseline:9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
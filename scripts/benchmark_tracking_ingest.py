@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный замер POST /api/tracking/bulk на временной БД.
+
+Создает заказы, отправляет события пачками через тестовый клиент Flask
+и печатает устойчивую скорость приема (событий/сек), затем повторяет
+те же пачки, чтобы замерить отбрасывание повторов.
+
+Пример:
+    python scripts/benchmark_tracking_ingest.py --orders 2000 --events 50000 --batch 1000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер скорости пакетной загрузки отслеживания')
+    parser.add_argument('--orders', type=int, default=1000, help='Сколько заказов создать')
+    parser.add_argument('--events', type=int, default=20000, help='Сколько событий отправить')
+    parser.add_argument('--batch', type=int, default=1000, help='Событий в одном запросе')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='tracking_bench_')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ['SKIP_DOTENV'] = '1'
+    os.environ['CARRIER_API_TOKEN'] = 'bench'
+    os.environ.pop('BOT_TOKEN', None)
+    os.environ.pop('LOG_GROUP_ID', None)
+
+    from database import Database
+    from models.user import UserRole
+    from webapp.app import app
+
+    db = Database()
+    app.config['DB_INSTANCE'] = db
+    db.add_user(1, username='bench', role=UserRole.CLIENT)
+    created = []
+    for start in range(0, args.orders, 500):
+        created.extend(db.bulk_create_orders([
+            {'client_id': 1, 'description': f'Заказ {i}'}
+            for i in range(start, min(start + 500, args.orders))
+        ]))
+    numbers = [item['tracking_number'] for item in created]
+
+    statuses = ('accepted', 'in_transit', 'in_transit', 'delivered')
+    events = [
+        {
+            'tracking_number': numbers[i % len(numbers)],
+            'status': statuses[(i // len(numbers)) % len(statuses)],
+            'location': f'Хаб {i % 50}',
+            'event_id': f'scan-{i}',
+        }
+        for i in range(args.events)
+    ]
+    batches = [events[i:i + args.batch] for i in range(0, len(events), args.batch)]
+    headers = {'Authorization': 'Bearer bench'}
+
+    with app.test_client() as client:
+        for label, expected in (('новые', 'created'), ('повторы', 'duplicates')):
+            started = time.perf_counter()
+            accepted = 0
+            for batch in batches:
+                payload = client.post('/api/tracking/bulk', json={'events': batch, 'advance_status': True},
+                                      headers=headers).get_json()
+                accepted += payload[expected]
+            elapsed = time.perf_counter() - started
+            print(f'{label}: {accepted}/{len(events)} событий за {elapsed:.2f} с '
+                  f'({len(events) / elapsed:,.0f} событий/с, пачка {args.batch})')
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Рассылка сообщения всем клиентам с включенными уведомлениями.
+
+Сообщения отправляются с учетом лимитов Telegram, прогресс сохраняется в БД после
+каждой страницы получателей, поэтому прерванную рассылку можно продолжить.
+
+Примеры:
+    python scripts/broadcast.py --text "Плановые работы 12.05 с 02:00 до 04:00"
+    python scripts/broadcast.py --resume 3
+    python scripts/broadcast.py --status 3
+"""
+import argparse
+import os
+import sys
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import BOT_TOKEN
+from database import Database
+from utils.broadcast import BROADCAST_MAX_LENGTH, BroadcastEngine
+
+
+def print_report(broadcast: dict) -> None:
+    print(f"📣 Рассылка #{broadcast['id']} ({broadcast['status']}): "
+          f"{broadcast['processed']} из {broadcast['total']}, доставлено {broadcast['delivered']}, "
+          f"заблокировали бота {broadcast['blocked']}, ошибок {broadcast['failed']}, "
+          f"{broadcast['throughput']} сообщ./с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Рассылка клиентам с включенными уведомлениями')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--text', help='Текст новой рассылки (HTML)')
+    group.add_argument('--resume', type=int, metavar='ID', help='Продолжить прерванную рассылку')
+    group.add_argument('--status', type=int, metavar='ID', help='Показать прогресс рассылки')
+    args = parser.parse_args()
+
+    db = Database()
+    if args.status:
+        broadcast = db.get_broadcast(args.status)
+        if not broadcast:
+            sys.exit(f"❌ Рассылка #{args.status} не найдена")
+        print_report(broadcast)
+        return
+
+    if not BOT_TOKEN:
+        sys.exit("❌ BOT_TOKEN не установлен")
+    engine = BroadcastEngine(db)
+    if args.text:
+        if len(args.text) > BROADCAST_MAX_LENGTH:
+            sys.exit(f"❌ Текст длиннее {BROADCAST_MAX_LENGTH} символов")
+        broadcast_id = db.create_broadcast(args.text)
+    else:
+        broadcast_id = args.resume
+    if not db.claim_broadcast(broadcast_id, engine.stale_after):
+        sys.exit(f"❌ Рассылка #{broadcast_id} не найдена, завершена или ее уже отправляет другой процесс")
+    broadcast = engine.run(broadcast_id)
+    engine.runtime.close()
+    print_report(broadcast)
+
+
+if __name__ == '__main__':
+    main()
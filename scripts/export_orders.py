@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Потоковая выгрузка заказов со сводкой отслеживания и платежей.
+
+Примеры:
+    python scripts/export_orders.py --format csv --output orders.csv
+    python scripts/export_orders.py --format jsonl --status delivered --from 2024-01-01 --to 2024-01-31 --gzip -o jan.jsonl.gz
+"""
+import argparse
+import os
+import sys
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from utils.order_export import EXPORT_FORMATS, iter_export, parse_date_range
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Выгрузка заказов в CSV/JSONL')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', help='Формат файла')
+    parser.add_argument('--status', help='Только заказы с этим статусом')
+    parser.add_argument('--from', dest='date_from', help='Начало периода (YYYY-MM-DD), включительно')
+    parser.add_argument('--to', dest='date_to', help='Конец периода (YYYY-MM-DD), включительно')
+    parser.add_argument('--gzip', action='store_true', help='Сжать выгрузку gzip')
+    parser.add_argument('-o', '--output', help='Файл для записи (по умолчанию stdout)')
+    args = parser.parse_args()
+
+    try:
+        date_from, date_to = parse_date_range(args.date_from, args.date_to)
+    except ValueError:
+        parser.error('Дата должна быть в формате YYYY-MM-DD')
+
+    db = Database()
+    rows = db.iter_orders_for_export(status=args.status, date_from=date_from, date_to=date_to)
+
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in iter_export(rows, args.format, compress=args.gzip):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+    if args.output:
+        print(f'✅ Выгрузка сохранена: {args.output}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Замер времени холодного импорта main.py (бот) и run_webapp.py (веб-приложение).
+
+Каждая точка входа импортируется в отдельном процессе с `python -X importtime`,
+результат - медиана по нескольким запускам и самые дорогие модули.
+С --budget-ms скрипт завершается с кодом 1 при превышении бюджета (для CI),
+с --json печатает результат в машиночитаемом виде.
+
+Примеры:
+    python scripts/profile_startup.py
+    python scripts/profile_startup.py --repeat 5 --budget-ms 600 --json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = {'bot': 'main', 'webapp': 'run_webapp'}
+
+
+def profile_import(module: str, env: dict) -> dict:
+    """Импортирует модуль в новом процессе и разбирает вывод -X importtime"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module} failed:\n{result.stderr[-2000:]}')
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    total_us = modules[module][1]
+    return {'total_ms': total_us / 1000, 'modules': modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер времени запуска (импорта) точек входа')
+    parser.add_argument('--repeat', type=int, default=3, help='Сколько запусков на точку входа')
+    parser.add_argument('--top', type=int, default=10, help='Сколько самых дорогих модулей показать')
+    parser.add_argument('--budget-ms', type=float, help='Максимально допустимое время импорта')
+    parser.add_argument('--json', action='store_true', help='Вывод в JSON')
+    args = parser.parse_args()
+
+    # Отдельная пустая БД и без .env, чтобы замер не зависел от окружения
+    workdir = tempfile.mkdtemp(prefix='startup_profile_')
+    env = dict(os.environ, SKIP_DOTENV='1', DATABASE_PATH=os.path.join(workdir, 'profile.db'))
+    env.pop('BOT_TOKEN', None)
+    env.pop('LOG_GROUP_ID', None)
+
+    report = {}
+    for name, module in ENTRY_POINTS.items():
+        runs = [profile_import(module, env) for _ in range(args.repeat)]
+        last = runs[-1]['modules']
+        # Самые дорогие пакеты верхнего уровня (время вместе с вложенными импортами)
+        top = sorted(
+            ((mod, cumulative) for mod, (_, cumulative) in last.items() if mod not in (module, 'site') and '.' not in mod),
+            key=lambda item: item[1], reverse=True
+        )[:args.top]
+        report[name] = {
+            'module': module,
+            'median_ms': round(statistics.median(run['total_ms'] for run in runs), 1),
+            'runs_ms': [round(run['total_ms'], 1) for run in runs],
+            'top_modules_ms': {mod: round(us / 1000, 1) for mod, us in top},
+        }
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    over_budget = [name for name, item in report.items()
+                   if args.budget_ms is not None and item['median_ms'] > args.budget_ms]
+
+    if args.json:
+        print(json.dumps({'entry_points': report, 'budget_ms': args.budget_ms,
+                          'over_budget': over_budget}, ensure_ascii=False, indent=2))
+    else:
+        for name, item in report.items():
+            print(f"⏱️  {name} ({item['module']}): {item['median_ms']} мс (запуски: {item['runs_ms']})")
+            for mod, ms in item['top_modules_ms'].items():
+                print(f"    {mod:<30} {ms:>8} мс")
+        if over_budget:
+            print(f"❌ Превышен бюджет {args.budget_ms} мс: {', '.join(over_budget)}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
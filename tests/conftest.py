@@ -5,31 +5,71 @@ from importlib import reload
 import pytest
 
 
-@pytest.fixture
-def test_db(tmp_path, monkeypatch):
+def _reload_modules(monkeypatch, db_path):
     """
-    Создает временную БД для каждого теста.
-    Перезагружает модули config/database, чтобы они увидели новый путь.
+    Перенаправляет DATABASE_PATH и перезагружает модули config/database,
+    чтобы они увидели новые переменные окружения.
     """
-    db_path = tmp_path / 'test.db'
     monkeypatch.setenv('DATABASE_PATH', str(db_path))
     monkeypatch.setenv('SKIP_DOTENV', '1')
     monkeypatch.delenv('BOT_TOKEN', raising=False)
     monkeypatch.delenv('LOG_GROUP_ID', raising=False)
 
-    # Перезагружаем config/database, чтобы они прочитали новые переменные
     if 'config' in sys.modules:
         reload(sys.modules['config'])
     else:
         import config  # noqa
-    config = sys.modules['config']
 
     if 'database' in sys.modules:
         reload(sys.modules['database'])
     else:
         import database  # noqa
-    database = sys.modules['database']
+    return sys.modules['database']
 
-    db = database.Database()
+
+@pytest.fixture(scope='session')
+def db_template():
+    """Пустая БД в памяти со схемой: строится один раз и клонируется в каждый тест"""
+    import database
+    template = database.Database(':memory:')
+    yield template
+    template.close()
+
+
+@pytest.fixture(scope='session')
+def large_db_template(db_template):
+    """Заготовка с большим объемом данных для замеров (заполняется один раз за сессию)"""
+    from utils.test_data import seed_bulk_data
+    template = db_template.clone()
+    seed_bulk_data(template, clients=200, orders_per_client=25)
+    yield template
+    template.close()
+
+
+@pytest.fixture
+def test_db(tmp_path, monkeypatch, db_template):
+    """
+    Создает временную БД в памяти для каждого теста (копия заготовки через backup API).
+    """
+    database = _reload_modules(monkeypatch, tmp_path / 'test.db')
+    db = database.Database(database.MEMORY_DATABASE, template=db_template)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def large_db(tmp_path, monkeypatch, large_db_template):
+    """Копия заготовки с большим объемом данных (клонируется за миллисекунды)"""
+    database = _reload_modules(monkeypatch, tmp_path / 'test.db')
+    db = database.Database(database.MEMORY_DATABASE, template=large_db_template)
     yield db
+    db.close()
 
+
+@pytest.fixture
+def file_db(tmp_path, monkeypatch):
+    """БД в файле - для тестов пула чтения, резервных копий и WAL"""
+    database = _reload_modules(monkeypatch, tmp_path / 'test.db')
+    db = database.Database()
+    yield db
+    db.close()
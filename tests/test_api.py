@@ -1,10 +1,12 @@
+import gzip
 import json
 
 import pytest
 
-from webapp.app import app
-from utils.test_data import seed_demo_data, clear_demo_data, TEST_CLIENT_ID
+from webapp.app import app, get_response_cache
+from utils.test_data import seed_demo_data, clear_demo_data, TEST_ADMIN_ID, TEST_CLIENT_ID, TEST_MANAGER_ID
 import config
+from models.user import UserRole
 
 
 @pytest.fixture
@@ -31,3 +33,284 @@ def test_admin_set_role_with_token(client, monkeypatch):
     payload = response.get_json()
     assert payload['role'] == 'admin'
 
+
+def login(client, user_id):
+    app.config['DB_INSTANCE'].set_active_session(user_id, f'token-{user_id}')
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['session_token'] = f'token-{user_id}'
+
+
+def test_bulk_import_csv_reports_each_row(client, test_db):
+    login(client, TEST_MANAGER_ID)
+    csv_body = (
+        'client_id,description,from_address,to_address,weight,price\n'
+        f'{TEST_CLIENT_ID},Паллета 1,Москва,Тверь,120,5000\n'
+        f'{TEST_CLIENT_ID},,Москва,Тверь,1,1\n'
+        '999999,Неизвестный клиент,A,B,1,1\n'
+        f'{TEST_CLIENT_ID},"Паллета 2, хрупкое",Москва,Казань,abc,1\n'
+        f'{TEST_CLIENT_ID},Паллета 3,Москва,Казань,10,700\n'
+    )
+    response = client.post('/api/orders/import?format=csv', data=csv_body.encode(), content_type='text/csv')
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert (payload['created'], payload['failed']) == (2, 3)
+    statuses = {item['row']: item for item in payload['results']}
+    assert statuses[2]['error'] == 'description is required'
+    assert statuses[3]['error'] == 'Client not found'
+    assert statuses[4]['error'] == 'weight must be a number'
+
+    order = test_db.get_order(statuses[5]['order_id'])
+    assert order['manager_id'] == TEST_MANAGER_ID
+    assert order['tracking_number'] == statuses[5]['tracking_number']
+    assert test_db.get_order_tracking(order['id'])[0]['status'] == 'pending'
+    assert any(t['order_id'] == order['id'] for t in test_db.get_manager_tickets(TEST_MANAGER_ID))
+
+
+def test_bulk_import_jsonl_in_chunks(client, test_db, monkeypatch):
+    monkeypatch.setattr(config, 'ORDER_IMPORT_CHUNK_SIZE', 2)
+    login(client, TEST_ADMIN_ID)
+    lines = [json.dumps({'client_id': TEST_CLIENT_ID, 'description': f'Груз {i}'}) for i in range(5)]
+    lines.insert(2, '{broken')
+    response = client.post('/api/orders/import', data='\n'.join(lines).encode(),
+                           content_type='application/x-ndjson')
+    payload = response.get_json()
+    assert (payload['created'], payload['failed']) == (5, 1)
+    assert payload['results'][2] == {'row': 3, 'status': 'error', 'error': 'Invalid JSON'}
+
+
+def test_bulk_import_reports_created_rows_when_file_breaks_midway(client, test_db, monkeypatch):
+    monkeypatch.setattr(config, 'ORDER_IMPORT_CHUNK_SIZE', 100)
+    login(client, TEST_ADMIN_ID)
+    # Первый блок чтения (64 КБ) корректен, испорченный байт - во втором
+    rows = [f'{TEST_CLIENT_ID},Груз {i} {"x" * 200}\n' for i in range(400)]
+    body = ('client_id,description\n' + ''.join(rows)).encode() + b'\xff\n'
+    response = client.post('/api/orders/import?format=csv', data=body, content_type='text/csv')
+    assert response.status_code == 400
+    payload = response.get_json()
+    assert payload['error'].startswith('Invalid file')
+    assert payload['created'] > 0
+    created = [item for item in payload['results'] if item['status'] == 'created']
+    assert len(created) == payload['created']
+    assert all(test_db.get_order(item['order_id']) for item in created)
+
+
+def test_bulk_import_retries_tracking_number_collision(client, test_db, monkeypatch):
+    login(client, TEST_ADMIN_ID)
+    existing = test_db.get_order(test_db.create_order(client_id=TEST_CLIENT_ID, description='Первый'))
+    numbers = iter([existing['tracking_number'], 'RETRY00001'])
+    monkeypatch.setattr(type(test_db), '_generate_tracking_number', staticmethod(lambda: next(numbers)))
+    body = f'client_id,description\n{TEST_CLIENT_ID},Второй\n'.encode()
+    response = client.post('/api/orders/import?format=csv', data=body, content_type='text/csv')
+    payload = response.get_json()
+    assert payload['created'] == 1
+    assert payload['results'][0]['tracking_number'] == 'RETRY00001'
+
+
+def test_bulk_import_requires_staff(client):
+    login(client, TEST_CLIENT_ID)
+    response = client.post('/api/orders/import?format=csv', data=b'client_id,description\n', content_type='text/csv')
+    assert response.status_code == 403
+
+
+def test_export_streams_filtered_orders(client, test_db):
+    login(client, TEST_ADMIN_ID)
+    delivered = test_db.create_order(client_id=TEST_CLIENT_ID, description='Доставлен')
+    test_db.update_order_status(delivered, 'delivered')
+    payment_id = test_db.create_payment(delivered, 1500, 'card')
+    test_db.complete_payment(payment_id)
+
+    response = client.get('/api/admin/export/orders?format=jsonl&status=delivered')
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['id'] for row in rows] == [delivered]
+    assert rows[0]['tracking_events'] == 2
+    assert rows[0]['last_tracking_status'] == 'delivered'
+    assert rows[0]['paid_amount'] == 1500
+
+    response = client.get('/api/admin/export/orders?format=csv&gzip=1&from=2000-01-01&to=2000-12-31')
+    assert response.mimetype == 'application/gzip'
+    lines = gzip.decompress(response.get_data()).decode().splitlines()
+    assert lines[0].startswith('id,tracking_number,status')
+    assert len(lines) == 1  # за 2000 год заказов нет
+
+    assert client.get('/api/admin/export/orders?from=bad').status_code == 400
+
+
+def test_bulk_tracking_dedups_and_advances_status(client, test_db, monkeypatch):
+    monkeypatch.setattr(config, 'CARRIER_API_TOKEN', 'carrier')
+    monkeypatch.setattr(config, 'TRACKING_BULK_CHUNK_SIZE', 2)
+    order_id = test_db.create_order(client_id=TEST_CLIENT_ID, description='Скан')
+    tracking_number = test_db.get_order(order_id)['tracking_number']
+    events = [
+        {'tracking_number': tracking_number, 'status': 'in_transit', 'location': 'Тверь',
+         'event_id': 'scan-1', 'timestamp': '2024-05-01T10:00:00Z'},
+        {'order_id': order_id, 'status': 'delivered', 'location': 'Москва', 'event_id': 'scan-2'},
+        {'tracking_number': tracking_number, 'status': 'in_transit', 'event_id': 'scan-1'},
+        {'tracking_number': 'UNKNOWN', 'status': 'in_transit'},
+        {'order_id': order_id},
+    ]
+    headers = {'Authorization': 'Bearer carrier'}
+
+    assert client.post('/api/tracking/bulk', json={'events': events}).status_code == 403
+
+    response = client.post('/api/tracking/bulk', json={'events': events, 'advance_status': True}, headers=headers)
+    payload = response.get_json()
+    assert (payload['created'], payload['duplicates'], payload['failed']) == (2, 1, 2)
+    assert [item['status'] for item in payload['results']] == ['created', 'created', 'duplicate', 'error', 'error']
+    assert payload['results'][3]['error'] == 'Order not found'
+    assert test_db.get_order(order_id)['status'] == 'delivered'
+
+    # Повторная отправка той же пачки ничего не добавляет
+    replay = client.post('/api/tracking/bulk', json={'events': events[:2]}, headers=headers).get_json()
+    assert replay['duplicates'] == 2
+    tracking = test_db.get_order_tracking(order_id)
+    # История упорядочена по времени скана перевозчика
+    assert [event['status'] for event in tracking] == ['in_transit', 'pending', 'delivered']
+    assert tracking[0]['created_at'] == '2024-05-01 10:00:00'
+
+
+def test_get_routes_read_through_read_only_pool(client, file_db):
+    # Пул чтения работает только с БД в файле
+    seed_demo_data(file_db)
+    app.config['DB_INSTANCE'] = file_db
+    login(client, TEST_ADMIN_ID)
+    assert client.get('/api/orders').status_code == 200
+    assert file_db.read_pool.metrics()['acquired'] > 0
+
+    metrics = client.get('/api/admin/metrics').get_json()['read_pool']
+    assert metrics['in_use'] == 0 and metrics['size'] == config.DB_READ_POOL_SIZE
+
+
+def test_swagger_spec_is_built_on_first_request(client):
+    response = client.get('/apispec_1.json')
+    assert response.status_code == 200
+    assert '/api/tracking/bulk' in response.get_json()['paths']
+
+
+def test_bootstrap_returns_startup_data_with_one_connection(client, test_db, monkeypatch):
+    assert client.get('/api/bootstrap').status_code == 401
+    login(client, TEST_MANAGER_ID)
+    expected_stats = client.get('/api/stats').get_json()['stats']
+    expected_tickets = client.get('/api/tickets').get_json()['tickets']
+
+    connections = []
+    original = test_db.get_read_connection
+    monkeypatch.setattr(test_db, 'get_read_connection', lambda *args: connections.append(1) or original(*args))
+    monkeypatch.setattr(config, 'WEBAPP_BOOTSTRAP_ORDERS', 1)
+    payload = client.get('/api/bootstrap').get_json()
+    assert len(connections) == 1
+
+    assert payload['user']['user_id'] == TEST_MANAGER_ID and 'phone' in payload['user']
+    assert payload['stats'] == expected_stats
+    assert payload['tickets'] == expected_tickets
+    assert len(payload['orders']) <= 1 and len(payload['incoming']) <= 1
+    assert payload['orders_total'] == len(test_db.get_manager_assigned_orders(TEST_MANAGER_ID))
+    assert payload['incoming_total'] == len(test_db.get_incoming_orders())
+
+    # Сессию перехватили с другого устройства - старый токен больше не действует
+    test_db.set_active_session(TEST_MANAGER_ID, 'other-device')
+    assert client.get('/api/bootstrap').status_code == 401
+
+
+def test_list_endpoints_support_sparse_fieldsets(client, test_db):
+    login(client, TEST_MANAGER_ID)
+    orders = client.get('/api/orders?type=assigned&fields=status,tracking_number').get_json()['orders']
+    assert orders and all(set(order) == {'id', 'status', 'tracking_number'} for order in orders)
+
+    summary = client.get('/api/tickets?view=summary').get_json()['tickets']
+    full = client.get('/api/tickets').get_json()['tickets']
+    assert [ticket['id'] for ticket in summary] == [ticket['id'] for ticket in full]
+    assert 'description' not in summary[0] and summary[0]['order_status'] == full[0]['order_status']
+
+    response = client.get('/api/orders?fields=id,secret')
+    assert response.status_code == 400 and 'secret' in response.get_json()['error']
+
+
+def test_cached_responses_are_invalidated_by_tags(client, test_db):
+    order_id = test_db.create_order(client_id=TEST_CLIENT_ID, description='Кэш')
+    login(client, TEST_CLIENT_ID)
+    assert client.get(f'/api/orders/{order_id}').headers['X-Cache'] == 'MISS'
+    assert client.get(f'/api/orders/{order_id}').headers['X-Cache'] == 'HIT'
+
+    # Событие отслеживания сбрасывает ответ только этого заказа
+    other_id = test_db.create_order(client_id=TEST_CLIENT_ID, description='Другой')
+    client.get(f'/api/orders/{other_id}')
+    test_db.add_tracking_event(order_id, 'in_transit', 'Тверь')
+    response = client.get(f'/api/orders/{order_id}')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['order']['tracking'][-1]['location'] == 'Тверь'
+    assert client.get(f'/api/orders/{other_id}').headers['X-Cache'] == 'HIT'
+
+    # Статистика менеджера зависит и от свободных заказов
+    login(client, TEST_MANAGER_ID)
+    before = client.get('/api/stats').get_json()['stats']['total_orders']
+    assert client.get('/api/stats').headers['X-Cache'] == 'HIT'
+    test_db.create_order(client_id=TEST_CLIENT_ID, description='Новый свободный')
+    assert client.get('/api/stats').get_json()['stats']['total_orders'] == before + 1
+
+    routes = get_response_cache().metrics()['routes']
+    assert routes['get_order']['hits'] == 2 and routes['get_stats']['invalidations'] == 1
+
+
+def test_archiving_invalidates_cached_responses(client, test_db):
+    order_id = test_db.create_order(client_id=TEST_CLIENT_ID, description='В архив')
+    test_db.update_order_status(order_id, 'delivered')
+    test_db._write(lambda cursor: cursor.execute(
+        "UPDATE orders SET updated_at = datetime('now', '-200 days') WHERE id = ?", (order_id,)
+    ))
+    login(client, TEST_CLIENT_ID)
+    for url in (f'/api/orders/{order_id}', '/api/stats'):
+        assert client.get(url).headers['X-Cache'] == 'MISS'
+        assert client.get(url).headers['X-Cache'] == 'HIT'
+
+    assert test_db.archive_orders(older_than_days=90)['orders'] >= 1
+    # Ответы с перенесенным заказом сбрасываются сразу, а не по истечении TTL
+    assert client.get(f'/api/orders/{order_id}').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/stats').headers['X-Cache'] == 'MISS'
+
+
+def test_response_cache_keeps_memory_budget():
+    from webapp.response_cache import ENTRY_OVERHEAD, ResponseCache
+
+    cache = ResponseCache(max_bytes=3 * (ENTRY_OVERHEAD + 100))
+    for key in range(3):
+        cache.set('route', key, b'x' * 100, 'application/json', {f'order:{key}'}, 0)
+    cache.get('route', 0)
+    cache.set('route', 3, b'x' * 100, 'application/json', {'order:3'}, 0)
+
+    # Вытеснена давно не читанная запись, тег удаленной записи тоже забыт
+    assert [cache.get('route', key)[0] is not None for key in range(4)] == [True, False, True, True]
+    metrics = cache.metrics()
+    assert metrics['size_bytes'] <= metrics['max_bytes'] and metrics['tags'] == 3
+    assert metrics['routes']['route']['evictions'] == 1
+
+
+def test_sync_returns_changes_since_cursor(client, test_db):
+    login(client, TEST_CLIENT_ID)
+    first = client.get('/api/sync?view=summary').get_json()
+    order_id = first['changes'][0]['order_id']
+    assert set(first['changes'][0]['order']) == {'id', 'tracking_number', 'status', 'client_id', 'manager_id',
+                                                 'price', 'created_at'}
+
+    test_db.update_order_status(order_id, 'in_transit')
+    delta = client.get(f"/api/sync?since={first['cursor']}").get_json()
+    assert [(c['order_id'], c['kinds'], c['order']['status']) for c in delta['changes']] == \
+        [(order_id, ['status'], 'in_transit')]
+    assert client.get(f"/api/sync?since={delta['cursor']}").get_json()['changes'] == []
+    assert client.get('/api/sync?since=bad').status_code == 400
+
+
+def test_sync_serializes_orders_after_removed_change(client, test_db):
+    login(client, TEST_MANAGER_ID)
+    cursor = client.get('/api/sync').get_json()['cursor']
+    test_db.add_user(92002, username='other_manager', role=UserRole.MANAGER)
+    first = test_db.create_order(client_id=TEST_CLIENT_ID, description='Уходит другому', manager_id=TEST_MANAGER_ID)
+    second = test_db.create_order(client_id=TEST_CLIENT_ID, description='Остается', manager_id=TEST_MANAGER_ID)
+    test_db.assign_order_to_manager(first, 92002)
+    test_db.update_order_status(second, 'in_transit')
+
+    changes = client.get(f'/api/sync?since={cursor}').get_json()['changes']
+    assert [(c['order_id'], c['removed']) for c in changes] == [(first, True), (second, False)]
+    assert changes[0]['order'] is None
+    assert changes[1]['order']['id'] == second and changes[1]['order']['status'] == 'in_transit'
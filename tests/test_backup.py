@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import threading
+import time
+
+from models.user import UserRole
+from utils.backup import create_backup, list_backups, rotate_backups, verify_backup
+
+
+def test_backup_in_steps_verifies_and_rotates(file_db, tmp_path):
+    db = file_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    for i in range(50):
+        db.create_order(client_id=1, description='x' * 2000 + str(i))
+    backup_dir = tmp_path / 'backups'
+
+    path = create_backup(db.db_path, str(backup_dir), pages=5, step_sleep=0)
+    report = verify_backup(str(path), db.db_path)
+    assert report['ok'], report
+    assert report['tables']['orders'] == {'backup': 50, 'live': 50}
+
+    # Копия расходится с рабочей БД после новых записей
+    db.create_order(client_id=1, description='после копии')
+    report = verify_backup(str(path), db.db_path)
+    assert report['integrity'] == 'ok'
+    assert 'orders' in report['mismatched'] and not report['ok']
+
+    compressed = create_backup(db.db_path, str(backup_dir), compress=True)
+    assert compressed.name.endswith('.db.gz')
+    assert verify_backup(str(compressed), db.db_path)['ok']
+
+    # Ротация учитывает только копии этого файла
+    for stamp in ('20200101_000000', '20200102_000000'):
+        (backup_dir / f'test_{stamp}.db').write_bytes(b'')
+    (backup_dir / 'test_archive_20200101_000000.db').write_bytes(b'')
+    removed = rotate_backups(db.db_path, str(backup_dir), keep=2)
+    assert [p.name for p in removed] == ['test_20200101_000000.db', 'test_20200102_000000.db']
+    assert len(list_backups(db.db_path, str(backup_dir))) == 2
+    assert os.path.exists(backup_dir / 'test_archive_20200101_000000.db')
+
+
+def test_verify_reports_corruption(tmp_path):
+    broken = tmp_path / 'broken_20200101_000000.db'
+    conn = sqlite3.connect(broken)
+    conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, value TEXT)')
+    conn.executemany('INSERT INTO t (value) VALUES (?)', [('x' * 500,) for _ in range(200)])
+    conn.commit()
+    conn.close()
+    data = bytearray(broken.read_bytes())
+    data[4096:3 * 4096] = b'\xff' * (2 * 4096)
+    broken.write_bytes(bytes(data))
+
+    report = verify_backup(str(broken))
+    assert report['integrity'] != 'ok'
+    assert not report['ok']
+
+
+def test_backup_finishes_while_another_connection_keeps_writing(tmp_path, caplog):
+    db_path = tmp_path / 'live.db'
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE changes (seq INTEGER PRIMARY KEY, payload TEXT)')
+    conn.executemany('INSERT INTO changes (payload) VALUES (?)', [('x' * 2000,) for _ in range(200)])
+    conn.commit()
+
+    stop = threading.Event()
+
+    def write():
+        # Как бот: запись между шагами копирования перезапускает его с начала
+        writer = sqlite3.connect(db_path)
+        while not stop.is_set():
+            writer.execute("INSERT INTO changes (payload) VALUES ('y')")
+            writer.commit()
+            time.sleep(0.002)
+        writer.close()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        path = create_backup(str(db_path), str(tmp_path / 'backups'), pages=5, step_sleep=0.01, max_restarts=2)
+    finally:
+        stop.set()
+        thread.join()
+        conn.close()
+
+    assert 'одним шагом' in caplog.text
+    assert verify_backup(str(path))['integrity'] == 'ok'
@@ -0,0 +1,74 @@
+import asyncio
+
+from telegram.error import Forbidden
+
+from models.user import UserRole
+from utils.broadcast import BroadcastEngine
+from utils.telegram_runtime import TelegramRuntime
+
+
+class FakeBot:
+    def __init__(self, blocked=()):
+        self.sent = []
+        self.blocked = set(blocked)
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if chat_id in self.blocked:
+            raise Forbidden('Forbidden: bot was blocked by the user')
+        self.sent.append(chat_id)
+
+
+def test_broadcast_streams_recipients_and_resumes_from_checkpoint(test_db):
+    db = test_db
+    for user_id in range(101, 108):
+        db.add_user(user_id, role=UserRole.CLIENT)
+        db.set_notifications_enabled(user_id, user_id != 104)
+    db.add_user(200, role=UserRole.MANAGER)
+    db.set_notifications_enabled(200, True)
+
+    broadcast_id = db.create_broadcast('Плановые работы', created_by=1)
+    assert db.get_broadcast(broadcast_id)['total'] == 6
+    # Процесс упал после первой страницы: она уже в контрольной точке
+    db.save_broadcast_progress(broadcast_id, 102, delivered=2, elapsed=0.1)
+    assert not db.claim_broadcast(broadcast_id, stale_after=60)
+    db._write(lambda cursor: cursor.execute("UPDATE broadcasts SET heartbeat_at = datetime('now', '-1 hour')"))
+    assert db.get_stale_broadcasts(stale_after=60) == [broadcast_id]
+    assert db.claim_broadcast(broadcast_id, stale_after=60)
+    assert not db.claim_broadcast(broadcast_id, stale_after=60)
+
+    bot = FakeBot(blocked={105})
+    runtime = TelegramRuntime(lambda: bot, max_pending=10, concurrency=2)
+    result = BroadcastEngine(db, runtime, page_size=2, window=2).run(broadcast_id)
+    runtime.close()
+
+    assert sorted(bot.sent) == [103, 106, 107]
+    assert (result['status'], result['delivered'], result['blocked'], result['failed']) == ('done', 5, 1, 0)
+    assert result['processed'] == result['total'] and result['throughput'] > 0
+    assert db.get_stale_broadcasts(stale_after=60) == []
+    assert not db.cancel_broadcast(broadcast_id)
+
+
+def test_broadcast_heartbeat_is_refreshed_while_a_page_is_sent(test_db, monkeypatch):
+    db = test_db
+    for user_id in range(101, 104):
+        db.add_user(user_id, role=UserRole.CLIENT)
+        db.set_notifications_enabled(user_id, True)
+    broadcast_id = db.create_broadcast('Плановые работы')
+
+    class SlowBot(FakeBot):
+        async def send_message(self, chat_id, text, parse_mode=None):
+            await asyncio.sleep(0.2)
+            await super().send_message(chat_id, text, parse_mode)
+
+    checkpoints = []
+    save = db.save_broadcast_progress
+    monkeypatch.setattr(db, 'save_broadcast_progress',
+                        lambda *args, **kwargs: checkpoints.append(kwargs) or save(*args, **kwargs))
+    runtime = TelegramRuntime(SlowBot, max_pending=10, concurrency=1)
+    result = BroadcastEngine(db, runtime, page_size=3, window=3, stale_after=0.2).run(broadcast_id)
+    runtime.close()
+
+    assert result['delivered'] == 3
+    # Одна страница (0.6 с) дольше stale_after: heartbeat обновлялся, не сдвигая контрольную точку
+    beats = [kwargs for kwargs in checkpoints if not kwargs]
+    assert len(beats) >= 2 and len(checkpoints) == len(beats) + 2
@@ -1,3 +1,5 @@
+import pytest
+
 from models.user import UserRole
 
 
@@ -45,3 +47,267 @@ def test_chat_messages_roundtrip(test_db):
     assert messages[1]['sender_role'] == UserRole.MANAGER.value
     assert messages[0]['message'] == 'Привет!'
 
+
+def test_orders_page_filters_in_sql_and_paginates(test_db):
+    db = test_db
+    prepare_users(db)
+    assigned = [db.create_order(client_id=1, description=f'Заказ {i}') for i in range(5)]
+    for order_id in assigned:
+        db.assign_order_to_manager(order_id, 2)
+    db.update_order_status(assigned[0], 'completed')
+    other_manager = db.create_order(client_id=1, description='Чужой')
+    db.assign_order_to_manager(other_manager, 3)
+    unassigned = db.create_order(client_id=1, description='Без менеджера')
+
+    page, total = db.get_orders_page(2, UserRole.MANAGER, status='pending', limit=2)
+    assert total == 5  # 4 своих pending + 1 без менеджера
+    assert [o['id'] for o in page] == [unassigned, assigned[4]]
+
+    last = page[-1]
+    next_page, _ = db.get_orders_page(2, UserRole.MANAGER, status='pending', limit=2,
+                                      cursor=(last['created_at'], last['id']))
+    assert [o['id'] for o in next_page] == [assigned[3], assigned[2]]
+
+    assert db.count_orders(2, UserRole.MANAGER, 'completed') == 1
+    assert db.count_orders(1, UserRole.CLIENT) == 7
+    assert db.get_orders_page(0, UserRole.ADMIN, limit=3)[1] == 7
+
+
+def test_archive_moves_old_finished_orders_and_reads_fall_back(test_db, monkeypatch):
+    db = test_db
+    prepare_users(db)
+    old = db.create_order(client_id=1, description='Старый', from_address='A', to_address='B')
+    db.add_tracking_event(old, 'delivered', 'B')
+    db.add_chat_message(old, 1, UserRole.CLIENT.value, 'Спасибо!')
+    db.update_order_status(old, 'delivered')
+    recent = db.create_order(client_id=1, description='Свежий')
+    db.update_order_status(recent, 'delivered')
+    active = db.create_order(client_id=1, description='В работе')
+
+    conn = db.get_connection()
+    conn.execute("UPDATE orders SET updated_at = datetime('now', '-200 days') WHERE id IN (?, ?)", (old, active))
+    conn.commit()
+    conn.close()
+
+    moved = db.archive_orders(older_than_days=90, batch_size=1)
+    assert moved['orders'] == 1
+    assert moved['chat_messages'] == 1
+
+    assert db.count_orders(1, UserRole.CLIENT.value) == 2
+    assert db.get_order(old)['description'] == 'Старый'
+    assert [event['status'] for event in db.get_order_tracking(old)][-1] == 'delivered'
+    assert db.get_chat_messages(old)[0]['message'] == 'Спасибо!'
+    assert db.get_order(recent) and db.get_order(active)
+
+    # Заказ есть в рабочей БД - пустой результат не ведет в архив
+    monkeypatch.setattr(db, '_archive_fetch', lambda *args: pytest.fail('archive opened'))
+    assert db.get_chat_messages(active) == [] and db.get_order_payments(active) == []
+    assert db.get_order_tracking(recent)
+    monkeypatch.undo()
+
+    # Повторный запуск ничего не переносит
+    assert db.archive_orders(older_than_days=90)['orders'] == 0
+
+    # Строка, добавленная после копирования в архив, не теряется: заказ остается в шарде
+    conn = db.get_connection()
+    conn.execute("UPDATE orders SET updated_at = datetime('now', '-200 days') WHERE id = ?", (recent,))
+    conn.commit()
+    conn.close()
+    copied = {'orders': {recent}, 'tracking': set(), 'chat_messages': set(), 'payments': set(), 'tickets': set()}
+    archived, counts = db._write(lambda cursor: db._remove_archived(cursor, [recent], copied, '-90 days'))
+    assert archived == set() and counts['orders'] == 0
+    assert db.get_order_tracking(recent)
+
+
+def test_memory_clones_are_isolated(test_db, db_template):
+    prepare_users(test_db)
+    test_db.create_order(client_id=1, description='Только в этом клоне')
+    other = db_template.clone()
+    try:
+        assert other.get_user(1) is None
+        assert other.count_orders(0, UserRole.ADMIN.value) == 0
+    finally:
+        other.close()
+    assert test_db.count_orders(0, UserRole.ADMIN.value) == 1
+
+
+def test_large_dataset_template(large_db):
+    assert large_db.count_users(UserRole.CLIENT.value) == 200
+    assert large_db.count_orders(0, UserRole.ADMIN.value) == 5000
+    rows, total = large_db.get_orders_page(100001, UserRole.CLIENT.value, limit=10)
+    assert total == 25 and len(rows) == 10
+
+
+def test_shared_database_is_created_once_on_first_use(test_db, monkeypatch):
+    import atexit
+    import database
+    from utils import telegram_runtime
+
+    registered = []
+    monkeypatch.setattr(atexit, 'register', registered.append)
+    monkeypatch.setattr(telegram_runtime, '_runtime', None)
+    assert database._shared_db is None
+    assert database.shared_db.count_users() == 0
+    assert database.get_database() is database._shared_db
+    assert database.shared_db.db_path == database.get_database().db_path
+    # Уведомления отправляются при выходе раньше, чем закрывается клиент Telegram (atexit - LIFO)
+    assert registered == [telegram_runtime._runtime.close, database._shared_db.notifier.close]
+
+
+def test_user_data_upsert_and_multi_key_fetch(test_db):
+    db = test_db
+    prepare_users(db)
+    db.save_user_data(1, 'phone', '+7 900 000-00-00')
+    db.save_user_data(1, 'phone', '+7 900 111-11-11')
+    db.save_user_data_many(1, {'email': 'a@example.com', 'city': 'Москва'})
+
+    assert db.get_user_data(1, 'phone') == '+7 900 111-11-11'
+    assert db.get_user_data_many(1, ['phone', 'email', 'missing']) == {
+        'phone': '+7 900 111-11-11', 'email': 'a@example.com'
+    }
+    conn = db.get_connection()
+    assert conn.execute('SELECT COUNT(*) FROM user_data WHERE user_id = 1').fetchone()[0] == 3
+    conn.close()
+
+
+def test_legacy_user_data_is_compacted_once(file_db):
+    conn = file_db.get_connection()
+    conn.execute('DROP INDEX idx_user_data_key')
+    conn.executemany(
+        "INSERT INTO user_data (user_id, data_key, data_value, created_at) VALUES (?, ?, ?, ?)",
+        [(1, 'phone', 'old', '2024-01-01 10:00:00'),
+         (1, 'phone', 'new', '2024-02-01 10:00:00'),
+         (1, 'phone', 'older', '2023-01-01 10:00:00'),
+         (1, 'email', 'a@example.com', '2024-01-01 10:00:00'),
+         (2, 'phone', 'other', '2024-01-01 10:00:00')]
+    )
+    conn.commit()
+    conn.close()
+
+    db = type(file_db)(file_db.db_path)
+    assert db.get_user_data_many(1, ['phone', 'email']) == {'phone': 'new', 'email': 'a@example.com'}
+    assert db.get_user_data(2, 'phone') == 'other'
+    conn = db.get_connection()
+    assert conn.execute('SELECT COUNT(*) FROM user_data').fetchone()[0] == 3
+    conn.close()
+    db.close()
+
+
+def test_summary_projection_is_served_by_covering_index(test_db):
+    from database import ORDER_SUMMARY_FIELDS
+    db = test_db
+    prepare_users(db)
+    order_id = db.create_order(client_id=1, description='Длинное описание', from_address='A', to_address='B')
+
+    rows = db.get_user_orders(1, UserRole.CLIENT, ORDER_SUMMARY_FIELDS)
+    assert list(rows[0]) == list(ORDER_SUMMARY_FIELDS) and rows[0]['id'] == order_id
+    # id добавляется всегда, неизвестные поля отклоняются
+    assert db.get_incoming_orders(['status']) == [{'id': order_id, 'status': 'pending'}]
+    with pytest.raises(ValueError, match='password'):
+        db.get_user_orders(1, UserRole.CLIENT, ['status', 'password'])
+
+    conn = db.get_connection()
+    plan = ' '.join(row[3] for row in conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT {', '.join(ORDER_SUMMARY_FIELDS)} FROM orders "
+        "WHERE client_id = ? ORDER BY created_at DESC", (1,)
+    ))
+    conn.close()
+    assert 'COVERING INDEX idx_orders_client_summary' in plan
+
+
+def test_sharded_orders_are_routed_by_client_and_merged(test_db):
+    db = type(test_db)(':memory:', shards=3)
+    try:
+        clients = list(range(10, 20))
+        for client_id in clients:
+            db.add_user(client_id, username=f'client{client_id}', role=UserRole.CLIENT)
+        db.add_user(2, username='manager', role=UserRole.MANAGER)
+        order_ids = {client_id: db.create_order(client_id=client_id, description='Груз') for client_id in clients}
+
+        assert len({db.shard_for_client(client_id) for client_id in clients}) > 1
+        for client_id, order_id in order_ids.items():
+            assert db.shard_for_id(order_id) == db.shard_for_client(client_id)
+            assert db.get_order(order_id)['client_id'] == client_id
+            # Даты создания задаются явно, чтобы проверить порядок слияния шардов
+            conn = db.get_connection(db.shard_for_id(order_id))
+            conn.execute('UPDATE orders SET created_at = ? WHERE id = ?',
+                          (f'2024-01-{client_id:02d} 10:00:00', order_id))
+            conn.commit()
+            conn.close()
+
+        # Списки по всем шардам сливаются по дате создания
+        newest_first = [order_ids[client_id] for client_id in reversed(clients)]
+        assert [order['id'] for order in db.get_user_orders(2, UserRole.ADMIN)] == newest_first
+        page, total = db.get_orders_page(2, UserRole.ADMIN, limit=4)
+        assert [order['id'] for order in page] == newest_first[:4] and total == len(clients)
+        newer, _ = db.get_orders_page(2, UserRole.ADMIN, limit=2, direction='newer',
+                                      cursor=(page[-1]['created_at'], page[-1]['id']))
+        assert [order['id'] for order in newer] == newest_first[1:3]
+        # Поле сортировки, добавленное для слияния, в проекцию не попадает
+        assert [set(order) for order in db.get_incoming_orders(['status'])] == [{'id', 'status'}] * len(clients)
+        assert [order['id'] for order in db.get_user_orders(15, UserRole.CLIENT)] == [order_ids[15]]
+        assert db.count_orders(15, UserRole.CLIENT) == 1
+
+        db.assign_order_to_manager(order_ids[12], 2)
+        db.update_order_status(order_ids[12], 'in_transit')
+        assert [ticket['order_id'] for ticket in db.get_manager_tickets(2)] == [order_ids[12]]
+        stats = db.get_user_stats({'user_id': 2, 'role': UserRole.MANAGER})
+        assert (stats['total_tickets'], stats['total_orders'], stats['in_progress']) == (1, len(clients), 1)
+
+        results = db.bulk_add_tracking_events([
+            {'tracking_number': db.get_order(order_ids[17])['tracking_number'], 'status': 'delivered'},
+            {'order_id': order_ids[11], 'status': 'in_transit'},
+        ], advance_status=True)
+        assert [result['order_id'] for result in results] == [order_ids[17], order_ids[11]]
+        assert db.get_order(order_ids[17])['status'] == 'delivered'
+        assert [row['id'] for row in db.iter_orders_for_export()] == newest_first[::-1]
+
+        # Курсор синхронизации хранит позицию в журнале каждого шарда
+        sync = db.get_order_changes(2, UserRole.ADMIN)
+        assert {change['order_id'] for change in sync['changes']} == set(order_ids.values())
+        assert len(sync['cursor'].split(',')) == 3
+        db.update_order_status(order_ids[15], 'cancelled')
+        delta = db.get_order_changes(2, UserRole.ADMIN, sync['cursor'])['changes']
+        assert [(change['order_id'], change['kinds']) for change in delta] == [(order_ids[15], ['status'])]
+
+        # Пользователи и рассылки - только в основной БД, в шардах - заказы и журналы изменений
+        conn = db.get_connection(1)
+        tables = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+        assert {'orders', 'tracking', 'changes', 'order_changes'} <= tables
+        assert not tables & {'users', 'user_data', 'user_sessions', 'broadcasts'}
+    finally:
+        db.close()
+
+
+def test_order_changes_are_compacted_and_scoped(test_db):
+    db = test_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    db.add_user(2, username='other', role=UserRole.CLIENT)
+    db.add_user(3, username='manager', role=UserRole.MANAGER)
+    db.add_user(4, username='manager2', role=UserRole.MANAGER)
+    order_id = db.create_order(client_id=1, description='Груз')
+    db.create_order(client_id=2, description='Чужой')
+    db.assign_order_to_manager(order_id, 3)
+    db.update_order_status(order_id, 'in_transit')
+
+    sync = db.get_order_changes(1, UserRole.CLIENT)
+    assert [(c['order_id'], c['kinds']) for c in sync['changes']] == [(order_id, ['created', 'assigned', 'status'])]
+    assert sync['changes'][0]['order']['status'] == 'in_transit' and not sync['has_more']
+    assert db.get_order_changes(1, UserRole.CLIENT, sync['cursor'])['changes'] == []
+
+    # Заказ передан другому менеджеру: прежний получает removed
+    cursor = db.get_order_changes(3, UserRole.MANAGER)['cursor']
+    db.assign_order_to_manager(order_id, 4)
+    payment_id = db.create_payment(order_id, 100, 'card')
+    db.complete_payment(payment_id)
+    previous = db.get_order_changes(3, UserRole.MANAGER, cursor)['changes']
+    assert [(c['order_id'], c['removed'], c['order']) for c in previous] == [(order_id, True, None)]
+    current = db.get_order_changes(4, UserRole.MANAGER, cursor, fields=['status', 'payment_status'])['changes']
+    assert current[0]['kinds'] == ['assigned', 'payment']
+    assert dict(current[0]['order']) == {'id': order_id, 'status': 'in_transit', 'payment_status': 'paid'}
+
+    page = db.get_order_changes(0, UserRole.ADMIN, limit=2)
+    assert page['has_more'] and len(page['changes']) == 2
+    with pytest.raises(ValueError):
+        db.get_order_changes(1, UserRole.CLIENT, 'abc')
@@ -0,0 +1,75 @@
+import time
+
+from models.user import UserRole
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_other_process_write_evicts_only_touched_keys(file_db):
+    bot = file_db
+    bot.add_user(1, username='client', role=UserRole.CLIENT)
+    bot.add_user(2, username='other', role=UserRole.CLIENT)
+    # Второй объект Database с тем же файлом - как веб-приложение рядом с ботом
+    webapp = type(file_db)(file_db.db_path)
+    try:
+        assert wait_for(lambda: webapp.changes.metrics()['polls'] > 0)
+        assert webapp.get_user(1).role == UserRole.CLIENT
+        assert webapp.get_user(2).role == UserRole.CLIENT
+
+        bot.set_user_role(1, UserRole.MANAGER)
+
+        assert wait_for(lambda: webapp.get_user(1).role == UserRole.MANAGER)
+        hits = webapp.cache.stats()['hits']
+        webapp.get_user(2)
+        stats = webapp.cache.stats()
+        assert stats['hits'] == hits + 1
+        assert stats['evictions'] == 1
+        assert webapp.changes.metrics()['flushes'] == 0
+    finally:
+        webapp.close()
+
+
+def test_order_writes_record_order_client_and_manager_keys(test_db):
+    db = test_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    db.add_user(2, username='manager', role=UserRole.MANAGER)
+    db.add_user(3, username='manager2', role=UserRole.MANAGER)
+    order_id = db.create_order(client_id=1, description='Груз', manager_id=2)
+    published = []
+    db.changes.subscribe(published.append)
+
+    db.assign_order_to_manager(order_id, 3)
+
+    expected = {'orders', f'order:{order_id}', 'user:1', 'manager:2', 'manager:3'}
+    assert published == [expected]
+    conn = db.get_connection()
+    keys = [row['key'] for row in conn.execute('SELECT key FROM changes ORDER BY seq DESC LIMIT 5')]
+    conn.close()
+    assert set(keys) == expected
+
+
+def test_changes_are_pruned_to_keep_in_every_shard(test_db, monkeypatch):
+    import database
+    monkeypatch.setattr(database, 'DB_CHANGES_KEEP', 5)
+    db = database.Database(database.MEMORY_DATABASE, shards=2)
+    try:
+        client_id = next(cid for cid in range(1, 100) if db.shard_for_client(cid) == 1)
+        db.add_user(client_id, username='client', role=UserRole.CLIENT)
+        for _ in range(4):
+            order_id = db.create_order(client_id=client_id, description='Груз')
+            db.update_order_status(order_id, 'accepted')
+
+        conn = db.get_connection(1)
+        keys = [row['key'] for row in conn.execute('SELECT key FROM changes ORDER BY seq')]
+        conn.close()
+        # Только что записанные ключи не удаляются вместе со старыми
+        assert len(keys) == 5 and f'order:{order_id}' in keys
+    finally:
+        db.close()
@@ -0,0 +1,82 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from db_pool import ReadOnlyPool, read_lane, use_read_lane
+from models.user import UserRole
+
+
+def test_read_lane_uses_read_only_snapshots(file_db):
+    db = file_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    order_id = db.create_order(client_id=1, description='Первый')
+
+    with read_lane():
+        assert db.get_order(order_id)['description'] == 'Первый'
+        # Запись внутри полосы чтения идет обычным путем
+        second = db.create_order(client_id=1, description='Второй')
+        assert db.get_order(second)['description'] == 'Второй'
+        assert db.count_orders(1, UserRole.CLIENT) == 2
+    assert db.read_pool.metrics()['acquired'] >= 3
+
+    conn = db.read_pool.acquire()
+    assert conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0] == 2
+    db.create_order(client_id=1, description='Третий')
+    # Пока соединение не вернулось в пул, оно видит свой снимок
+    assert conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0] == 2
+    conn.close()
+    conn = db.read_pool.acquire()
+    assert conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0] == 3
+    conn.close()
+    assert db.read_pool.metrics()['in_use'] == 0
+
+
+def test_read_only_pool_timeout_and_fallback(file_db):
+    db = file_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    db.read_pool = ReadOnlyPool(db.db_path, size=1, timeout=0.05)
+
+    held = db.read_pool.acquire()
+    with pytest.raises(sqlite3.OperationalError):
+        held.execute('INSERT INTO users (user_id) VALUES (2)')
+
+    assert db.read_pool.acquire() is None
+    with read_lane():
+        # Пул исчерпан - чтение идет через обычное соединение
+        assert db.get_user(1)['username'] == 'client'
+    metrics = db.read_pool.metrics()
+    assert metrics['timeouts'] == 2 and metrics['in_use'] == 1
+
+    released = threading.Timer(0.02, held.close)
+    db.read_pool.timeout = 1
+    released.start()
+    conn = db.read_pool.acquire()
+    assert conn is not None and db.read_pool.metrics()['waits'] == 1
+    conn.close()
+
+
+def test_use_read_lane_reaches_worker_threads(file_db):
+    db = file_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+
+    @use_read_lane
+    async def handler():
+        return await asyncio.to_thread(db.get_user, 1)
+
+    assert asyncio.run(handler())['username'] == 'client'
+    assert db.read_pool.metrics()['acquired'] == 1
+
+
+def test_failed_read_returns_connection_to_pool(file_db, monkeypatch):
+    db = file_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+
+    def broken(cursor, user_id):
+        raise sqlite3.OperationalError('disk I/O error')
+
+    monkeypatch.setattr(db, '_fetch_user', broken)
+    with read_lane(), pytest.raises(sqlite3.OperationalError):
+        db.get_user(1)
+    assert db.read_pool.metrics()['in_use'] == 0
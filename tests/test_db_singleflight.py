@@ -0,0 +1,71 @@
+import threading
+import time
+
+from models.user import UserRole
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_concurrent_identical_reads_share_one_query(test_db, monkeypatch):
+    db = test_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    db.create_order(client_id=1, description='Свободный заказ')
+    release = threading.Event()
+    calls = []
+    original = db._fetch_orders
+
+    def slow_fetch(*args):
+        calls.append(1)
+        release.wait(5)
+        return original(*args)
+
+    monkeypatch.setattr(db, '_fetch_orders', slow_fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(db.get_incoming_orders())) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: db.flights.metrics()['waiting'] == len(threads) - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == len(threads) and all(len(orders) == 1 for orders in results)
+    # Каждый получает свой список
+    assert len({id(orders) for orders in results}) == len(threads)
+    stats = db.flights.metrics()['queries']['incoming_orders']
+    assert (stats['executed'], stats['coalesced'], stats['max_waiters']) == (1, 5, 5)
+
+
+def test_read_started_before_write_is_not_shared_after_it(test_db, monkeypatch):
+    db = test_db
+    db.add_user(1, username='manager', role=UserRole.MANAGER)
+    fetched = threading.Event()
+    release = threading.Event()
+    original = db._fetch_all_users
+
+    def slow_fetch(role):
+        users = original(role)
+        fetched.set()
+        release.wait(5)
+        return users
+
+    monkeypatch.setattr(db, '_fetch_all_users', slow_fetch)
+    stale = []
+    thread = threading.Thread(target=lambda: stale.append(db.get_all_users(UserRole.MANAGER)))
+    thread.start()
+    fetched.wait(5)
+
+    db.add_user(2, username='manager2', role=UserRole.MANAGER)
+    monkeypatch.setattr(db, '_fetch_all_users', original)
+    fresh = db.get_all_users(UserRole.MANAGER)
+    release.set()
+    thread.join()
+
+    assert len(stale[0]) == 1 and len(fresh) == 2
+    assert db.flights.metrics()['queries']['all_users']['coalesced'] == 0
@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_writer import WriteQueue
+from models.user import UserRole
+
+
+def test_concurrent_writes_are_group_committed(file_db):
+    db = file_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    started = db.writer.metrics()
+    busy = threading.Event()
+    release = threading.Event()
+
+    def blocking(cursor):
+        # Пока писатель занят, остальные операции накапливаются в очереди
+        busy.set()
+        release.wait(5)
+        return 'first'
+
+    first = db.writer.submit(blocking)
+    busy.wait(5)
+    threads = [
+        threading.Thread(target=db.add_chat_message, args=(1, 1, 'client', f'Сообщение {i}'))
+        for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    while db.writer.metrics()['queue_depth'] < len(threads):
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert first.result(5) == 'first'
+    assert len(db.get_chat_messages(1)) == len(threads)
+    metrics = db.writer.metrics()
+    assert metrics['batch_size_max'] == len(threads)
+    assert metrics['batches'] - started['batches'] == 2
+    assert metrics['committed'] - started['committed'] == len(threads) + 1
+
+
+def test_failed_operation_rolls_back_only_itself(test_db):
+    db = test_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    release = threading.Event()
+    db.writer.submit(lambda cursor: release.wait(5))
+
+    def broken(cursor):
+        cursor.execute("UPDATE users SET first_name = 'Сломано' WHERE user_id = 1")
+        raise ValueError('broken')
+
+    failed = db.writer.submit(broken)
+    ok = db.writer.submit(lambda cursor: cursor.execute(
+        "UPDATE users SET last_name = 'Записано' WHERE user_id = 1"
+    ).rowcount)
+    release.set()
+
+    assert ok.result(5) == 1
+    with pytest.raises(ValueError):
+        failed.result(5)
+    user = db.get_user(1)
+    assert (user['first_name'], user['last_name']) == (None, 'Записано')
+
+
+def test_busy_database_is_retried(tmp_path):
+    path = str(tmp_path / 'busy.db')
+    sqlite3.connect(path).execute('CREATE TABLE items (value INTEGER)').connection.close()
+    writer = WriteQueue(lambda shard: sqlite3.connect(path, timeout=0, check_same_thread=False), retries=10)
+
+    # Другой процесс держит блокировку записи
+    holder = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    holder.execute('BEGIN IMMEDIATE')
+    timer = threading.Timer(0.05, holder.execute, args=('COMMIT',))
+    timer.start()
+    try:
+        assert writer.execute(lambda cursor: cursor.execute('INSERT INTO items VALUES (1)').rowcount) == 1
+    finally:
+        timer.join()
+        writer.close()
+        holder.close()
+    assert writer.metrics()['busy_retries'] >= 1
+
+
+def test_shards_are_committed_by_separate_writers(tmp_path):
+    paths = [str(tmp_path / f'shard{shard}.db') for shard in range(2)]
+    for path in paths:
+        sqlite3.connect(path).execute('CREATE TABLE items (value INTEGER)').connection.close()
+    writer = WriteQueue(lambda shard: sqlite3.connect(paths[shard], check_same_thread=False))
+    release = threading.Event()
+    try:
+        blocked = writer.submit(lambda cursor: release.wait(5), shard=0)
+        # Пока писатель шарда 0 занят, шард 1 фиксируется своим потоком
+        assert writer.execute(lambda cursor: cursor.execute('INSERT INTO items VALUES (1)').rowcount,
+                              shard=1, timeout=2) == 1
+        assert not blocked.done()
+        release.set()
+        assert blocked.result(5) is True
+    finally:
+        release.set()
+        writer.close()
@@ -0,0 +1,66 @@
+import time
+
+from models.user import UserRole
+from utils.notification_coalescer import NotificationCoalescer, format_updates
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_status_burst_is_sent_as_one_message_per_order():
+    sent = []
+    coalescer = NotificationCoalescer(lambda *args: sent.append(args), window=0.05)
+    coalescer.status_changed(1, 10, 'pending', 'accepted')
+    coalescer.status_changed(1, 10, 'accepted', 'in_transit')
+    coalescer.status_changed(2, 20, 'pending', 'accepted')
+    coalescer.status_changed(1, 10, 'in_transit', 'delivered')
+    # Статус вернулся к исходному - сообщение не нужно
+    coalescer.status_changed(3, 30, 'pending', 'cancelled')
+    coalescer.status_changed(3, 30, 'cancelled', 'pending')
+
+    wait_for(lambda: coalescer.metrics()['pending'] == 0)
+    coalescer.close()
+    assert sorted(sent) == [(1, 10, 'pending', 'delivered', 3), (2, 20, 'pending', 'accepted', 1)]
+    metrics = coalescer.metrics()
+    assert (metrics['events'], metrics['merged'], metrics['sent'], metrics['skipped']) == (6, 3, 2, 1)
+    assert format_updates(3) == '3 обновления' and format_updates(11) == '11 обновлений'
+
+
+def test_close_flushes_pending_notifications(test_db):
+    db = test_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    db.set_notifications_enabled(1, True)
+    order_id = db.create_order(client_id=1, description='Груз')
+    sent = []
+    db.notifier = NotificationCoalescer(lambda *args: sent.append(args), window=60)
+
+    db.update_order_status(order_id, 'accepted')
+    db.update_order_status(order_id, 'in_transit')
+    assert sent == []
+    db.notifier.close()
+    assert sent == [(1, order_id, 'pending', 'in_transit', 2)]
+
+
+def test_tracking_ingest_notifies_advanced_orders(test_db):
+    db = test_db
+    db.add_user(1, username='client', role=UserRole.CLIENT)
+    db.add_user(2, username='muted', role=UserRole.CLIENT)
+    db.set_notifications_enabled(1, True)
+    order_id = db.create_order(client_id=1, description='Груз')
+    muted_id = db.create_order(client_id=2, description='Груз')
+    sent = []
+    db.notifier = NotificationCoalescer(lambda *args: sent.append(args), window=60)
+
+    db.bulk_add_tracking_events([
+        {'order_id': order_id, 'status': 'accepted'},
+        {'order_id': order_id, 'status': 'in_transit'},
+        {'order_id': muted_id, 'status': 'in_transit'},
+        # Назад статус не двигается - уведомлять не о чем
+        {'order_id': order_id, 'status': 'pending'},
+    ], advance_status=True)
+    db.notifier.close()
+    assert sent == [(1, order_id, 'pending', 'in_transit', 1)]
@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+from keyboards.pagination_keyboard import get_pagination_keyboard
+from models.user import UserRole
+from utils.pagination import fetch_page
+
+
+def test_keyset_pages_forward_and_back(test_db):
+    db = test_db
+    for user_id in range(1, 26):
+        db.add_user(user_id, first_name=f'Client{user_id}', role=UserRole.CLIENT)
+    context = SimpleNamespace(user_data={})
+
+    def load(data):
+        return asyncio.run(fetch_page(
+            context, 'ac', data,
+            fetch=lambda cursor, direction, limit: db.get_users_page(UserRole.CLIENT, limit, cursor, direction),
+            load_row=db.get_user,
+            key='user_id'
+        ))
+
+    def buttons(page):
+        markup = get_pagination_keyboard(page, 'back_to_admin_menu')
+        return {button.text: button.callback_data for row in markup.inline_keyboard for button in row}
+
+    first = load('admin_list_clients')
+    assert (first.number, first.pages, first.total) == (1, 3, 25)
+    assert not first.has_prev and first.has_next
+    assert [u['user_id'] for u in first.rows] == list(range(25, 15, -1))
+
+    next_data = buttons(first)['След. ➡️']
+    assert len(next_data.encode()) <= 64
+    second = load(next_data)
+    assert [u['user_id'] for u in second.rows] == list(range(15, 5, -1))
+
+    third = load(buttons(second)['След. ➡️'])
+    assert [u['user_id'] for u in third.rows] == list(range(5, 0, -1))
+    assert not third.has_next
+
+    back = load(buttons(third)['⬅️ Пред.'])
+    assert back.number == 2
+    assert [u['user_id'] for u in back.rows] == [u['user_id'] for u in second.rows]
+
+    back_to_first = load(buttons(back)['⬅️ Пред.'])
+    assert back_to_first.number == 1 and not back_to_first.has_prev
+    assert len(context.user_data['page_cache']) <= 8
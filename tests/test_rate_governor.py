@@ -0,0 +1,56 @@
+import asyncio
+
+from telegram.error import RetryAfter
+
+from utils import rate_governor
+from utils.rate_governor import PRIORITY_LOG, PRIORITY_NOTIFY, PRIORITY_REPLY, RateGovernor
+from utils.telegram_rate_limiter import TelegramRateLimiter
+
+
+def test_chat_buckets_and_priority_reserve():
+    governor = RateGovernor(global_rate=10, chat_rate=1, chat_burst=2)
+    assert governor.try_acquire(1) == 0
+    assert governor.try_acquire(1) == 0
+    # Личный чат исчерпал всплеск, другие чаты не ждут
+    assert governor.try_acquire(1) > 0
+    for chat_id in range(2, 5):
+        assert governor.try_acquire(chat_id) == 0
+
+    # В глобальном ведре ~5 токенов: логам нужна верхняя половина ведра, уведомлениям - нет
+    assert governor.try_acquire(-100, PRIORITY_LOG) > 0
+    assert governor.try_acquire(10, PRIORITY_NOTIFY) == 0
+    assert governor.try_acquire(11, PRIORITY_REPLY) == 0
+
+
+def test_rate_limiter_retries_after_retry_after():
+    governor = RateGovernor(global_rate=30, chat_rate=50)
+    limiter = TelegramRateLimiter(governor, max_retries=1)
+    calls = []
+
+    async def callback(endpoint, data):
+        calls.append(endpoint)
+        if len(calls) == 1:
+            raise RetryAfter(0)
+        return True
+
+    result = asyncio.run(limiter.process_request(
+        callback, ('sendMessage', {'chat_id': 5}), {}, 'sendMessage', {'chat_id': 5}, None))
+    assert result is True and calls == ['sendMessage', 'sendMessage']
+    metrics = governor.metrics()
+    assert metrics['retry_after'] == 1 and metrics['rate'] < 30
+    assert metrics['priorities']['reply']['granted'] == 2
+
+
+def test_bot_and_webapp_split_the_token_budget(monkeypatch):
+    from config import TELEGRAM_BOT_GLOBAL_RATE, TELEGRAM_WEBAPP_GLOBAL_RATE
+    assert TELEGRAM_BOT_GLOBAL_RATE + TELEGRAM_WEBAPP_GLOBAL_RATE <= 30
+
+    # Процесс без явной доли (веб-приложение, скрипты) получает долю веб-приложения
+    monkeypatch.setattr(rate_governor, '_governor', None)
+    assert rate_governor.get_rate_governor().base_rate == TELEGRAM_WEBAPP_GLOBAL_RATE
+
+    # Бот задает свою долю, даже если ограничитель уже создан
+    governor = rate_governor.init_rate_governor(TELEGRAM_BOT_GLOBAL_RATE)
+    assert governor is rate_governor.get_rate_governor()
+    assert governor.metrics()['base_rate'] == TELEGRAM_BOT_GLOBAL_RATE
+    assert governor.metrics()['rate'] == TELEGRAM_BOT_GLOBAL_RATE
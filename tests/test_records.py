@@ -0,0 +1,50 @@
+import json
+import pickle
+from datetime import date
+
+from models.records import dumps, dumps_records, fetch_records, record_type
+from models.user import User, UserRole
+
+
+def test_record_reads_like_a_dict(test_db):
+    test_db.add_user(1, username='client', first_name='Анна', role=UserRole.CLIENT)
+    order_id = test_db.create_order(client_id=1, description='Груз "50%"')
+    order = test_db.get_user_orders(1, UserRole.CLIENT)[0]
+
+    assert order['id'] == order.id == order.get('id') == order_id
+    assert order.get('missing', 'x') == 'x' and 'status' in order and 'missing' not in order
+    assert dict(order) == test_db.get_order(order_id) == order
+    assert list(order) == list(order.keys())
+    assert pickle.loads(pickle.dumps(order)) == order
+
+    user = test_db.get_user(1)
+    assert isinstance(user, User) and user.is_client() and user['notifications_enabled'] is False
+
+
+def test_records_serialize_to_the_same_json_as_dicts(test_db):
+    conn = test_db.get_connection()
+    cursor = conn.execute("SELECT 1 AS id, 'Тверь\x1f\"' AS city, NULL AS note, 2.5 AS weight")
+    records = fetch_records(cursor)
+    conn.close()
+
+    expected = [{'id': 1, 'city': 'Тверь\x1f"', 'note': None, 'weight': 2.5}]
+    assert json.loads(dumps_records(records)) == expected
+    assert dumps_records(records, ensure_ascii=False) == json.dumps(expected, ensure_ascii=False, separators=(',', ':'))
+    assert dumps_records([]) == '[]'
+
+    # Записи внутри обычной структуры ответа и значения через default
+    Row = record_type(('day',))
+    payload = {'orders': records, 'total': 1, 'extra': [Row._make((date(2024, 5, 1),))]}
+    assert json.loads(dumps(payload, default=str)) == {
+        'orders': expected, 'total': 1, 'extra': [{'day': '2024-05-01'}]
+    }
+
+
+def test_dumps_finds_records_after_first_list_element():
+    Row = record_type(('id', 'name'))
+    rec = Row._make((1, 'a'))
+    assert json.loads(dumps([{'x': 1}, {'y': rec}])) == [{'x': 1}, {'y': {'id': 1, 'name': 'a'}}]
+    assert json.loads(dumps({'changes': [{'order': None}, {'order': rec}], 'items': [None, rec]})) == {
+        'changes': [{'order': None}, {'order': {'id': 1, 'name': 'a'}}],
+        'items': [None, {'id': 1, 'name': 'a'}],
+    }
@@ -0,0 +1,75 @@
+import asyncio
+import threading
+import time
+
+from utils.telegram_runtime import TelegramRuntime
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.active = 0
+        self.max_active = 0
+        self.release = threading.Event()
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        self.active -= 1
+        self.sent.append((chat_id, text))
+        return chat_id
+
+
+def test_runtime_reuses_one_bot_and_bounds_concurrency():
+    bots = []
+    runtime = TelegramRuntime(lambda: bots.append(FakeBot()) or bots[-1], max_pending=10, concurrency=2)
+    futures = [runtime.send_message(chat_id, 'ping') for chat_id in range(5)]
+    deadline = time.monotonic() + 5
+    while not (bots and bots[0].active == 2):
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    bots[0].release.set()
+
+    assert sorted(future.result(5) for future in futures) == [0, 1, 2, 3, 4]
+    assert len(bots) == 1 and bots[0].max_active == 2
+    runtime.close()
+    assert runtime.metrics()['sent'] == 5
+
+
+def test_runtime_backpressure_and_drain_on_close():
+    bot = FakeBot()
+    runtime = TelegramRuntime(lambda: bot, max_pending=2, concurrency=1, submit_timeout=0.01)
+    assert runtime.send_message(1, 'a') is not None
+    assert runtime.send_message(2, 'b') is not None
+    # Очередь полна - сообщение отбрасывается, вызывающий не блокируется надолго
+    assert runtime.send_message(3, 'c') is None
+
+    threading.Timer(0.05, bot.release.set).start()
+    runtime.close()
+    assert bot.sent == [(1, 'a'), (2, 'b')]
+    assert runtime.send_message(4, 'd') is None
+    metrics = runtime.metrics()
+    assert (metrics['sent'], metrics['dropped'], metrics['pending'], metrics['running']) == (2, 2, 0, False)
+
+
+def test_throttled_log_lane_does_not_delay_notifications():
+    from utils.rate_governor import PRIORITY_LOG
+
+    bot = FakeBot()
+    runtime = TelegramRuntime(lambda: bot, max_pending=3, concurrency=2, submit_timeout=5)
+    # Логи в группу ждут лимита частоты и занимают все слоты своей полосы
+    logs = [runtime.submit(lambda b: b.send_message(-100, 'log'), priority=PRIORITY_LOG) for _ in range(3)]
+    # Переполненная полоса логов отбрасывает сообщение сразу, не блокируя вызывающего
+    started = time.monotonic()
+    assert runtime.submit(lambda b: b.send_message(-100, 'log'), timeout=0, priority=PRIORITY_LOG) is None
+    assert time.monotonic() - started < 1
+
+    notification = runtime.submit(lambda b: asyncio.sleep(0, 'sent'))
+    assert notification.result(2) == 'sent'
+    assert runtime.metrics()['lanes']['log'] == 3
+
+    bot.release.set()
+    assert [future.result(5) for future in logs] == [-100] * 3
+    runtime.close()
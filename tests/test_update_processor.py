@@ -0,0 +1,85 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from utils.update_processor import ChatOrderedUpdateProcessor, limit_concurrency
+
+
+def make_update(chat_id):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), effective_user=None)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+def test_updates_of_one_chat_keep_order():
+    processed = []
+
+    async def handle(chat_id, seq):
+        # Первые апдейты медленнее - без блокировки чата порядок бы перемешался
+        await asyncio.sleep(0.01 * (5 - seq))
+        processed.append((chat_id, seq))
+
+    async def run():
+        async with ChatOrderedUpdateProcessor(8) as processor:
+            tasks = [
+                asyncio.create_task(processor.process_update(make_update(chat_id), handle(chat_id, seq)))
+                for seq in range(5)
+                for chat_id in (1, 2)
+            ]
+            await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    for chat_id in (1, 2):
+        assert [seq for cid, seq in processed if cid == chat_id] == list(range(5))
+
+
+def test_light_handlers_tail_latency_under_heavy_load():
+    """Стресс: тяжелые обработчики в потоках не задерживают легкие нажатия кнопок"""
+    heavy_running = []
+    heavy_peak = []
+
+    @limit_concurrency(2)
+    async def heavy_handler(update, context):
+        heavy_running.append(1)
+        heavy_peak.append(len(heavy_running))
+        # Имитация тяжелого запроса к БД, вынесенного в поток
+        await asyncio.to_thread(time.sleep, 0.2)
+        heavy_running.pop()
+
+    async def light_handler(update, context, latencies, started):
+        latencies.append(time.perf_counter() - started)
+
+    async def run():
+        latencies = []
+        async with ChatOrderedUpdateProcessor(16) as processor:
+            tasks = []
+            for admin_chat in range(6):
+                update = make_update(1000 + admin_chat)
+                tasks.append(asyncio.create_task(
+                    processor.process_update(update, heavy_handler(update, None))
+                ))
+            await asyncio.sleep(0.01)
+            for user_chat in range(200):
+                update = make_update(user_chat)
+                tasks.append(asyncio.create_task(
+                    processor.process_update(update, light_handler(update, None, latencies, time.perf_counter()))
+                ))
+                if user_chat % 20 == 0:
+                    await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+        return latencies
+
+    latencies = asyncio.run(run())
+
+    assert len(latencies) == 200
+    p50 = percentile(latencies, 50)
+    p99 = percentile(latencies, 99)
+    # Последовательная обработка дала бы >= 1.2 с (6 тяжелых по 0.2 с впереди)
+    assert p50 < 0.05
+    assert p99 < 0.1
+    assert max(heavy_peak) <= 2
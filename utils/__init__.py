@@ -1,4 +1,10 @@
-from .role_helper import get_user_role_menu, check_user_role
-
 __all__ = ['get_user_role_menu', 'check_user_role']
 
+
+def __getattr__(name):
+    # role_helper тянет telegram и БД - импортируем только по требованию,
+    # чтобы `import utils.<модуль>` оставался дешевым
+    if name in __all__:
+        from . import role_helper
+        return getattr(role_helper, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,171 @@
+"""
+Онлайн-резервное копирование SQLite через sqlite3.Connection.backup.
+
+Копия снимается небольшими шагами по pages страниц с паузой между ними:
+между шагами бот и веб-приложение могут писать в БД, блокировка чтения
+держится только на время одного шага. Если источник меняется через другое
+соединение, SQLite перезапускает копирование, поэтому копия всегда согласована.
+На живой БД запись между шагами идет постоянно (каждая запись попадает и в
+журнал changes), поэтому после max_restarts перезапусков копия снимается
+одним шагом: в режиме WAL это одна короткая транзакция чтения, запись она
+не блокирует.
+"""
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _BackupRestarted(Exception):
+    """Пошаговое копирование перезапускалось слишком часто"""
+
+
+def _backup_prefix(db_path: str) -> str:
+    return Path(db_path).stem + '_'
+
+
+def _backup_pattern(db_path: str):
+    # Только копии этого файла: bot_database_YYYYmmdd_HHMMSS.db[.gz]
+    return re.compile(re.escape(_backup_prefix(db_path)) + r'\d{8}_\d{6}\.db(\.gz)?$')
+
+
+def list_backups(db_path: str, backup_dir: str) -> List[Path]:
+    """Копии файла БД в каталоге, от старых к новым"""
+    directory = Path(backup_dir)
+    if not directory.exists():
+        return []
+    pattern = _backup_pattern(db_path)
+    return sorted(path for path in directory.iterdir() if pattern.match(path.name))
+
+
+def create_backup(db_path: str, backup_dir: str, pages: int = 256, step_sleep: float = 0.05,
+                  compress: bool = False, max_restarts: int = 3) -> Path:
+    """
+    Снимает копию БД в backup_dir и возвращает путь к ней.
+    Файл сначала пишется во временный .partial и переименовывается по готовности.
+    max_restarts - сколько перезапусков из-за записи в источник допустить,
+    прежде чем скопировать оставшееся одним шагом.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    target = Path(backup_dir) / f'{_backup_prefix(db_path)}{timestamp}.db'
+    partial = target.with_name(target.name + '.partial')
+
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        # Осталось больше страниц, чем после прошлого шага - копирование началось заново
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _BackupRestarted()
+        last_remaining = remaining
+        # Пауза между шагами отдает БД пишущим соединениям
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    started = time.monotonic()
+    source = sqlite3.connect(db_path)
+    destination = sqlite3.connect(partial)
+    try:
+        try:
+            source.backup(destination, pages=pages, progress=progress)
+        except _BackupRestarted:
+            logger.warning("Копирование %s перезапускалось %s раз из-за записи, копирую одним шагом",
+                           db_path, restarts)
+            source.backup(destination, pages=-1)
+    finally:
+        destination.close()
+        source.close()
+
+    if compress:
+        compressed = target.with_name(target.name + '.gz')
+        with open(partial, 'rb') as src, gzip.open(compressed, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        partial.unlink()
+        target = compressed
+    else:
+        partial.rename(target)
+
+    logger.info("Резервная копия %s -> %s за %.1f с", db_path, target, time.monotonic() - started)
+    return target
+
+
+def rotate_backups(db_path: str, backup_dir: str, keep: int) -> List[Path]:
+    """Удаляет старые копии, оставляя keep последних. Возвращает удаленные пути"""
+    backups = list_backups(db_path, backup_dir)
+    removed = backups[:-keep] if keep > 0 else []
+    for path in removed:
+        path.unlink()
+    return removed
+
+
+def _table_counts(conn: sqlite3.Connection) -> dict:
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )]
+    return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+
+def verify_backup(backup_path: str, db_path: Optional[str] = None) -> dict:
+    """
+    Проверяет, что из копии можно восстановиться: открывает ее только на чтение,
+    выполняет PRAGMA integrity_check и считает строки по таблицам.
+    Если передан db_path, количества строк сравниваются с рабочей БД
+    (после снятия копии в рабочую БД могли добавиться строки).
+    """
+    path = Path(backup_path)
+    temp_dir = None
+    if path.name.endswith('.gz'):
+        temp_dir = tempfile.mkdtemp(prefix='backup_verify_')
+        unpacked = Path(temp_dir) / path.name[:-3]
+        with gzip.open(path, 'rb') as src, open(unpacked, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        path = unpacked
+
+    try:
+        conn = sqlite3.connect(path.resolve().as_uri() + '?mode=ro', uri=True)
+        try:
+            integrity = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+            counts = _table_counts(conn)
+        except sqlite3.DatabaseError as e:
+            # Файл настолько поврежден, что SQLite не может его прочитать
+            integrity = [str(e)]
+            counts = {}
+        finally:
+            conn.close()
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    report = {
+        'backup': str(backup_path),
+        'integrity': 'ok' if integrity == ['ok'] else '; '.join(integrity),
+        'tables': {table: {'backup': count} for table, count in counts.items()},
+    }
+    mismatched = []
+    if db_path:
+        live = sqlite3.connect(Path(db_path).resolve().as_uri() + '?mode=ro', uri=True)
+        try:
+            live_counts = _table_counts(live)
+        finally:
+            live.close()
+        for table in sorted(set(counts) | set(live_counts)):
+            entry = report['tables'].setdefault(table, {'backup': None})
+            entry['live'] = live_counts.get(table)
+            if entry['backup'] != entry['live']:
+                mismatched.append(table)
+    report['mismatched'] = mismatched
+    report['ok'] = report['integrity'] == 'ok' and not mismatched
+    return report
@@ -0,0 +1,147 @@
+"""
+Массовая рассылка клиентам с включенными уведомлениями.
+
+Получатели читаются страницами по индексу idx_users_notifications (по
+возрастанию user_id), сообщения отправляются через общий клиент Telegram
+(utils.telegram_runtime) с приоритетом массовой рассылки: ограничитель частоты
+отдает ей только свободную часть лимита, и ответы бота не задерживаются.
+Одновременно в очереди клиента не больше window сообщений рассылки, поэтому
+рассылка не вытесняет из нее обычные уведомления.
+
+После каждой страницы прогресс (last_user_id и счетчики) фиксируется в
+broadcasts. Если процесс упал, рассылка продолжается с последней контрольной
+точки (resume_stale) - повторно может уйти не больше одной страницы. Пока
+страница отправляется (при лимитах Telegram - дольше stale_after), процесс
+обновляет heartbeat_at, чтобы рассылку не забрал другой процесс.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import wait
+from typing import List, Optional
+
+from config import BROADCAST_PAGE_SIZE, BROADCAST_STALE_SECONDS, BROADCAST_WINDOW
+from utils.rate_governor import PRIORITY_BULK
+from utils.telegram_runtime import TelegramRuntime, get_telegram_runtime, rate_limit_kwargs
+
+logger = logging.getLogger(__name__)
+
+# Предельная длина текста сообщения Telegram
+BROADCAST_MAX_LENGTH = 4096
+
+# Сколько секунд ждать места в очереди клиента Telegram, прежде чем считать сообщение неотправленным
+SUBMIT_TIMEOUT = 60.0
+
+# Как часто обновлять heartbeat_at во время отправки страницы (не реже stale_after / 4)
+HEARTBEAT_SECONDS = 10.0
+
+
+def _send_job(chat_id: int, text: str):
+    async def job(bot):
+        # telegram импортируется в потоке клиента, а не на пути запроса
+        from telegram.error import Forbidden, TelegramError
+
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML',
+                                   **rate_limit_kwargs(bot, PRIORITY_BULK))
+        except Forbidden:
+            # Пользователь заблокировал бота или удалил аккаунт
+            return 'blocked'
+        except TelegramError as e:
+            logger.warning(f"Рассылка: не удалось отправить пользователю {chat_id}: {e}")
+            return 'failed'
+        return 'delivered'
+    return job
+
+
+class BroadcastEngine:
+    def __init__(self, db, runtime: Optional[TelegramRuntime] = None, page_size: int = BROADCAST_PAGE_SIZE,
+                 window: int = BROADCAST_WINDOW, stale_after: float = BROADCAST_STALE_SECONDS):
+        self.db = db
+        self.runtime = runtime or get_telegram_runtime()
+        self.page_size = page_size
+        self.window = window
+        self.stale_after = stale_after
+        self.heartbeat_every = min(HEARTBEAT_SECONDS, stale_after / 4)
+
+    def start(self, broadcast_id: int) -> bool:
+        """Забирает рассылку и отправляет ее в фоновом потоке; False - ее уже отправляет другой процесс"""
+        if not self.db.claim_broadcast(broadcast_id, self.stale_after):
+            return False
+        threading.Thread(target=self._run_safe, args=(broadcast_id,), name=f'broadcast-{broadcast_id}',
+                         daemon=True).start()
+        return True
+
+    def resume_stale(self) -> List[int]:
+        """Продолжает рассылки, брошенные упавшим процессом; возвращает их id"""
+        return [broadcast_id for broadcast_id in self.db.get_stale_broadcasts(self.stale_after)
+                if self.start(broadcast_id)]
+
+    def _run_safe(self, broadcast_id: int) -> None:
+        try:
+            self.run(broadcast_id)
+        except Exception as e:
+            # Рассылка остается в статусе running и будет продолжена после stale_after
+            logger.error(f"Рассылка #{broadcast_id} прервана: {e}", exc_info=True)
+
+    def run(self, broadcast_id: int) -> Optional[dict]:
+        """Отправляет рассылку с последней контрольной точки до конца (или до отмены); возвращает ее итог"""
+        broadcast = self.db.get_broadcast(broadcast_id)
+        if broadcast is None:
+            return None
+        text = broadcast['text']
+        after = broadcast['last_user_id']
+        slots = threading.Semaphore(self.window)
+        last_beat = time.monotonic()
+
+        def heartbeat():
+            nonlocal last_beat
+            if time.monotonic() - last_beat >= self.heartbeat_every:
+                # Без счетчиков контрольная точка не сдвигается - обновляется только heartbeat_at
+                self.db.save_broadcast_progress(broadcast_id, after)
+                last_beat = time.monotonic()
+
+        while broadcast['status'] == 'running':
+            recipients = self.db.get_broadcast_recipients(after, self.page_size)
+            if not recipients:
+                self.db.save_broadcast_progress(broadcast_id, after, status='done')
+                break
+
+            started = time.monotonic()
+            futures = []
+            for chat_id in recipients:
+                while not slots.acquire(timeout=self.heartbeat_every):
+                    heartbeat()
+                future = self.runtime.submit(_send_job(chat_id, text), timeout=SUBMIT_TIMEOUT,
+                                             priority=PRIORITY_BULK)
+                if future is None:
+                    slots.release()
+                    if self.runtime.closed:
+                        # Процесс завершается - страница будет отправлена заново после перезапуска
+                        wait([future for future in futures if future is not None])
+                        return self.db.get_broadcast(broadcast_id)
+                    futures.append(None)
+                    continue
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+
+            waiting = [future for future in futures if future is not None]
+            while wait(waiting, timeout=self.heartbeat_every).not_done:
+                heartbeat()
+            counts = {'delivered': 0, 'failed': 0, 'blocked': 0}
+            for future in futures:
+                outcome = 'failed' if future is None or future.exception() is not None else future.result()
+                counts[outcome] += 1
+            after = recipients[-1]
+            self.db.save_broadcast_progress(broadcast_id, after, elapsed=time.monotonic() - started, **counts)
+            last_beat = time.monotonic()
+            # Отмена видна по статусу в БД (в том числе из другого процесса)
+            broadcast = self.db.get_broadcast(broadcast_id)
+
+        result = self.db.get_broadcast(broadcast_id)
+        logger.info(
+            f"Рассылка #{broadcast_id} ({result['status']}): доставлено {result['delivered']}, "
+            f"заблокировали бота {result['blocked']}, ошибок {result['failed']}, "
+            f"{result['throughput']} сообщ./с"
+        )
+        return result
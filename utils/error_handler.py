@@ -83,6 +83,8 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
         logger.info(f"ChatMigrated: Чат перемещен в {new_chat_id}")
         
     elif isinstance(context.error, RetryAfter):
+        # Ограничитель частоты (utils.telegram_rate_limiter) уже сделал паузу и повторы;
+        # сюда ошибка доходит, только если повторы не помогли
         logger.warning(f"RetryAfter: Слишком много запросов. Подождите {context.error.retry_after} секунд")
         
     elif isinstance(context.error, TelegramError):
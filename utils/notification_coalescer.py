@@ -0,0 +1,131 @@
+"""
+Объединение уведомлений клиента о смене статуса заказа.
+
+Менеджер, прокликивающий заказ accepted → in_transit → delivered, раньше
+порождал по сообщению (и по потоку) на каждый шаг. Теперь изменения статуса
+одного заказа копятся в коротком окне: каждое новое изменение продлевает окно
+(но не дольше max_delay от первого), после чего клиент получает одно сообщение
+"pending → delivered, 3 обновления". Если статус вернулся к исходному,
+сообщение не отправляется. Отправкой занимается один фоновый поток.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def format_updates(count: int) -> str:
+    """'3 обновления', '5 обновлений' - число изменений в сводном уведомлении"""
+    if count % 10 == 1 and count % 100 != 11:
+        word = 'обновление'
+    elif count % 10 in (2, 3, 4) and count % 100 not in (12, 13, 14):
+        word = 'обновления'
+    else:
+        word = 'обновлений'
+    return f'{count} {word}'
+
+
+class NotificationCoalescer:
+    def __init__(self, send: Callable[[int, int, str, str, int], None], window: float = 1.5,
+                 max_delay: float = 10.0):
+        """
+        send(client_id, order_id, old_status, new_status, updates) - отправка одного
+        сводного уведомления. window - пауза без изменений, после которой уведомление
+        уходит (0 - отправлять сразу, без объединения); max_delay - предельная задержка.
+        """
+        self._send = send
+        self.window = window
+        self.max_delay = max(max_delay, window)
+        self._pending: Dict[int, dict] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._stats = {
+            'events': 0,
+            'merged': 0,
+            'sent': 0,
+            'skipped': 0,
+            'errors': 0,
+        }
+
+    def status_changed(self, client_id: int, order_id: int, old_status: Optional[str], new_status: str) -> None:
+        """Учитывает смену статуса заказа; уведомление уйдет после окна объединения"""
+        with self._cond:
+            self._stats['events'] += 1
+            immediate = self.window <= 0 or self._closed
+            if not immediate:
+                now = time.monotonic()
+                entry = self._pending.get(order_id)
+                if entry is None:
+                    self._pending[order_id] = {
+                        'client_id': client_id,
+                        'old_status': old_status,
+                        'new_status': new_status,
+                        'updates': 1,
+                        'first': now,
+                        'due': now + self.window,
+                    }
+                else:
+                    self._stats['merged'] += 1
+                    entry['new_status'] = new_status
+                    entry['updates'] += 1
+                    entry['due'] = min(now + self.window, entry['first'] + self.max_delay)
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='notify-coalescer', daemon=True)
+                    self._thread.start()
+                self._cond.notify()
+        if immediate:
+            self._deliver(order_id, {'client_id': client_id, 'old_status': old_status,
+                                     'new_status': new_status, 'updates': 1})
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    due = [order_id for order_id, entry in self._pending.items()
+                           if entry['due'] <= now or self._closed]
+                    if due:
+                        batch = [(order_id, self._pending.pop(order_id)) for order_id in due]
+                        break
+                    if self._closed:
+                        return
+                    timeout = min(entry['due'] for entry in self._pending.values()) - now if self._pending else None
+                    self._cond.wait(timeout)
+            for order_id, entry in batch:
+                self._deliver(order_id, entry)
+
+    def _deliver(self, order_id: int, entry: dict) -> None:
+        if entry['updates'] > 1 and entry['old_status'] == entry['new_status']:
+            # Статус вернулся к исходному - для клиента ничего не изменилось
+            with self._cond:
+                self._stats['skipped'] += 1
+            return
+        try:
+            self._send(entry['client_id'], order_id, entry['old_status'], entry['new_status'], entry['updates'])
+        except Exception as e:
+            logger.error(f"Ошибка отправки уведомления по заказу #{order_id}: {e}")
+            with self._cond:
+                self._stats['errors'] += 1
+            return
+        with self._cond:
+            self._stats['sent'] += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Сразу отправляет накопленные уведомления и останавливает поток"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                'window': self.window,
+                'pending': len(self._pending),
+                **self._stats,
+            }
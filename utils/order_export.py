@@ -0,0 +1,87 @@
+"""
+Потоковая выгрузка заказов в CSV или JSONL.
+
+Строки берутся из Database.iter_orders_for_export и сразу сериализуются,
+поэтому выгрузка любого объема занимает постоянную память.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional, Tuple
+
+EXPORT_FIELDS = [
+    'id', 'tracking_number', 'status', 'client_id', 'manager_id',
+    'description', 'from_address', 'to_address', 'from_contact', 'to_contact',
+    'weight', 'price', 'payment_status', 'payment_method',
+    'offer_price', 'offer_currency', 'offer_delivery_days', 'offer_status',
+    'created_at', 'updated_at',
+    'tracking_events', 'last_tracking_status', 'last_tracking_location', 'last_tracking_at',
+    'payments_count', 'paid_amount'
+]
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def parse_date_range(date_from: Optional[str], date_to: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Приводит границы периода к формату created_at (YYYY-MM-DD HH:MM:SS).
+    Дата без времени в date_to означает весь день включительно.
+    """
+    def parse(value: str, end: bool) -> str:
+        parsed = datetime.fromisoformat(value.strip().replace('T', ' '))
+        if end and len(value.strip()) == 10:
+            parsed += timedelta(days=1)
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+    return (
+        parse(date_from, end=False) if date_from else None,
+        parse(date_to, end=True) if date_to else None
+    )
+
+
+def iter_csv(rows: Iterable[dict]) -> Iterator[str]:
+    """Сериализует строки в CSV по одной"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        # Отдаем накопленное, когда набралось достаточно, чтобы не дробить ответ
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_jsonl(rows: Iterable[dict]) -> Iterator[str]:
+    """Сериализует строки в JSONL по одной"""
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps({field: row.get(field) for field in EXPORT_FIELDS}, ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= 64 * 1024:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    yield ''.join(lines)
+
+
+def iter_export(rows: Iterable[dict], export_format: str, compress: bool = False) -> Iterator[bytes]:
+    """Возвращает поток байтов выгрузки (опционально сжатый gzip)"""
+    chunks = iter_csv(rows) if export_format == 'csv' else iter_jsonl(rows)
+    if not compress:
+        for chunk in chunks:
+            if chunk:
+                yield chunk.encode('utf-8')
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 - формат gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
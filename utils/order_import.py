@@ -0,0 +1,164 @@
+"""
+Пакетный импорт заказов из CSV или JSONL.
+
+Файл читается построчно (без загрузки целиком в память), строки проверяются
+и пачками по chunk_size создаются через Database.bulk_create_orders.
+Уведомления объединяются: одно сообщение на клиента и одна сводка в группу логов.
+"""
+import codecs
+import csv
+import json
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+class OrderImportError(ValueError):
+    """Ошибка формата файла импорта (весь файл не может быть обработан)"""
+
+
+def _iter_text_lines(stream) -> Iterator[str]:
+    """Построчно декодирует бинарный поток в UTF-8 (BOM из Excel игнорируется)"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split('\n')
+        for line in lines:
+            yield line + '\n'
+    buffer += decoder.decode(b'', final=True)
+    if buffer:
+        yield buffer
+
+
+def iter_csv_rows(stream) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Возвращает (номер строки, данные, ошибка) для каждой строки CSV"""
+    reader = csv.DictReader(_iter_text_lines(stream))
+    if not reader.fieldnames or not {'client_id', 'description'} <= set(reader.fieldnames):
+        raise OrderImportError('CSV header must contain client_id and description columns')
+    for row_number, row in enumerate(reader, start=1):
+        yield row_number, row, None
+
+
+def iter_jsonl_rows(stream) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Возвращает (номер строки, данные, ошибка) для каждой строки JSONL"""
+    for row_number, line in enumerate(_iter_text_lines(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            yield row_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, 'Row must be a JSON object'
+            continue
+        yield row_number, row, None
+
+
+def validate_order_row(row: dict, default_manager_id: Optional[int] = None) -> Tuple[Optional[dict], Optional[str]]:
+    """Проверяет строку импорта и приводит типы. Возвращает (заказ, ошибка)"""
+    order = {}
+    try:
+        order['client_id'] = int(row.get('client_id'))
+    except (TypeError, ValueError):
+        return None, 'client_id must be numeric'
+
+    description = str(row.get('description') or '').strip()
+    if not description:
+        return None, 'description is required'
+    order['description'] = description
+
+    for field in ('from_address', 'to_address', 'from_contact', 'to_contact'):
+        value = row.get(field)
+        order[field] = str(value).strip() if value not in (None, '') else None
+
+    for field in ('weight', 'price'):
+        value = row.get(field)
+        if value in (None, ''):
+            order[field] = 0.0
+            continue
+        try:
+            order[field] = float(value)
+        except (TypeError, ValueError):
+            return None, f'{field} must be a number'
+        if order[field] < 0:
+            return None, f'{field} must not be negative'
+
+    manager_id = row.get('manager_id')
+    if manager_id in (None, ''):
+        order['manager_id'] = default_manager_id
+    else:
+        try:
+            order['manager_id'] = int(manager_id)
+        except (TypeError, ValueError):
+            return None, 'manager_id must be numeric'
+
+    return order, None
+
+
+def import_orders(db, rows: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+                  chunk_size: int = 500, max_rows: int = 10000,
+                  default_manager_id: Optional[int] = None) -> dict:
+    """
+    Импортирует заказы из итератора строк (iter_csv_rows/iter_jsonl_rows).
+    Каждая пачка создается отдельной транзакцией. Возвращает отчет по строкам;
+    если файл оказался испорчен после уже созданных пачек, в отчете есть error,
+    а созданные заказы перечислены как обычно.
+    """
+    results = []
+    created = {}
+    chunk = []
+
+    def flush():
+        for (row_number, _), result in zip(chunk, db.bulk_create_orders([order for _, order in chunk])):
+            if 'error' in result:
+                results.append({'row': row_number, 'status': 'error', 'error': result['error']})
+            else:
+                results.append({
+                    'row': row_number,
+                    'status': 'created',
+                    'order_id': result['order_id'],
+                    'tracking_number': result['tracking_number']
+                })
+                created.setdefault(result['client_id'], []).append(result['order_id'])
+        chunk.clear()
+
+    file_error = None
+    try:
+        for row_number, row, error in rows:
+            if row_number > max_rows:
+                results.append({'row': row_number, 'status': 'error', 'error': f'Row limit {max_rows} exceeded'})
+                break
+            if error is None:
+                order, error = validate_order_row(row, default_manager_id)
+            if error:
+                results.append({'row': row_number, 'status': 'error', 'error': error})
+                continue
+            chunk.append((row_number, order))
+            if len(chunk) >= chunk_size:
+                flush()
+    except (OrderImportError, UnicodeDecodeError, csv.Error) as e:
+        if not results and not chunk:
+            # Файл не прочитан вовсе (заголовок, первый блок) - ничего не создано
+            raise
+        # Пачки до ошибки уже зафиксированы: отчет о них нужен, чтобы повтор не создал дубликаты
+        file_error = f'Invalid file: {e}'
+    if chunk:
+        flush()
+
+    db.send_import_notifications(created)
+
+    results.sort(key=lambda item: item['row'])
+    created_count = sum(1 for item in results if item['status'] == 'created')
+    report = {
+        'total': len(results),
+        'created': created_count,
+        'failed': len(results) - created_count,
+        'results': results
+    }
+    if file_error:
+        # Файл прочитан не до конца: строки после ошибки не обработаны
+        report['error'] = file_error
+    return report
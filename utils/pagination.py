@@ -0,0 +1,113 @@
+"""
+Постраничный просмотр длинных списков в боте (keyset-пагинация)
+
+Callback data кнопок компактна: pg:<экран>:<страница>:<направление>:<id>,
+где id - крайняя запись текущей страницы, от которой читается следующая.
+Просмотренные страницы кэшируются в context.user_data на BOT_PAGE_CACHE_TTL секунд.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from config import BOT_PAGE_SIZE, BOT_PAGE_CACHE_TTL
+
+PAGE_PREFIX = 'pg'
+OLDER = 'o'
+NEWER = 'n'
+# Сколько страниц хранится в кэше одного пользователя
+PAGE_CACHE_SIZE = 8
+
+
+class Page:
+    """Страница списка с признаками наличия соседних страниц"""
+
+    def __init__(self, screen: str, number: int, rows: List[dict], total: int,
+                 has_prev: bool, has_next: bool, key: str):
+        self.screen = screen
+        self.number = number
+        self.rows = rows
+        self.total = total
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.key = key
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // BOT_PAGE_SIZE))
+
+    @property
+    def first_id(self) -> Optional[int]:
+        return self.rows[0][self.key] if self.rows else None
+
+    @property
+    def last_id(self) -> Optional[int]:
+        return self.rows[-1][self.key] if self.rows else None
+
+
+def page_callback(screen: str, number: int, direction: str, anchor: int) -> str:
+    """Формирует callback data кнопки перехода на страницу"""
+    return f'{PAGE_PREFIX}:{screen}:{number}:{direction}:{anchor}'
+
+
+def page_pattern(screen: str) -> str:
+    """Шаблон CallbackQueryHandler для кнопок перехода экрана"""
+    return f'^{PAGE_PREFIX}:{screen}:'
+
+
+def parse_page_callback(data: Optional[str]) -> Optional[Tuple[int, str, int]]:
+    """Разбирает callback data кнопки перехода: (страница, направление, id)"""
+    if not data or not data.startswith(PAGE_PREFIX + ':'):
+        return None
+    try:
+        _, _, number, direction, anchor = data.split(':')
+        return max(1, int(number)), direction, int(anchor)
+    except ValueError:
+        return None
+
+
+async def fetch_page(context, screen: str, data: Optional[str],
+                     fetch: Callable[[Optional[Tuple[str, int]], str, int], Tuple[List[dict], int]],
+                     load_row: Callable[[int], Optional[dict]], key: str = 'id') -> Page:
+    """
+    Загружает страницу списка для callback data (или первую страницу).
+    fetch(cursor, direction, limit) возвращает (строки, всего) - например,
+    Database.get_orders_page; load_row(id) читает крайнюю запись для курсора.
+    """
+    number, direction, anchor = parse_page_callback(data) or (1, OLDER, 0)
+
+    cache = None
+    if context.user_data is not None:
+        cache = context.user_data.setdefault('page_cache', OrderedDict())
+    cache_key = page_callback(screen, number, direction, anchor)
+    now = time.monotonic()
+
+    cached = cache.get(cache_key) if cache is not None else None
+    if cached and cached[0] > now:
+        rows, total, more = cached[1:]
+    else:
+        cursor = None
+        if anchor:
+            row = await asyncio.to_thread(load_row, anchor)
+            if row:
+                cursor = (row['created_at'], row[key])
+            else:
+                # Запись удалена - начинаем с первой страницы
+                number, direction = 1, OLDER
+
+        db_direction = 'newer' if direction == NEWER else 'older'
+        rows, total = await asyncio.to_thread(fetch, cursor, db_direction, BOT_PAGE_SIZE + 1)
+        more = len(rows) > BOT_PAGE_SIZE
+        # Лишняя строка нужна только чтобы узнать, есть ли продолжение
+        rows = rows[-BOT_PAGE_SIZE:] if direction == NEWER else rows[:BOT_PAGE_SIZE]
+
+        if cache is not None:
+            cache[cache_key] = (now + BOT_PAGE_CACHE_TTL, rows, total, more)
+            while len(cache) > PAGE_CACHE_SIZE:
+                cache.popitem(last=False)
+
+    if direction == NEWER:
+        if not more:
+            number = 1
+        return Page(screen, number, rows, total, has_prev=more, has_next=True, key=key)
+    return Page(screen, number, rows, total, has_prev=number > 1, has_next=more, key=key)
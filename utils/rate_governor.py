@@ -0,0 +1,216 @@
+"""
+Общий ограничитель частоты запросов к Telegram.
+
+Ответы бота, уведомления клиентам, логи и алерты в группу отправляются разными
+путями, а лимиты у Telegram общие: около 30 сообщений в секунду на бота,
+около одного в секунду в личный чат и около 20 в минуту в группу. Все отправки
+процесса проходят через один RateGovernor: глобальное ведро токенов и ведро на
+каждый чат. Классы приоритета делят глобальное ведро неравно: ответам
+пользователю доступно все ведро, уведомлениям - все, кроме небольшого резерва,
+трафику в группу логов и массовым рассылкам - только верхняя половина, так что
+всплеск логов или рассылка не задерживает ответы. После RetryAfter чат
+блокируется на указанное время, а глобальная частота снижается вдвое и плавно
+восстанавливается.
+
+Ограничитель общий внутри процесса. Бот и веб-приложение - разные процессы,
+поэтому лимит токена делится между ними явно: бот вызывает
+init_rate_governor(TELEGRAM_BOT_GLOBAL_RATE), остальные процессы получают
+TELEGRAM_WEBAPP_GLOBAL_RATE.
+
+Модуль не зависит от telegram; адаптер для ExtBot - utils.telegram_rate_limiter.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+# Классы приоритета (меньше - важнее)
+PRIORITY_REPLY = 0
+PRIORITY_NOTIFY = 1
+PRIORITY_LOG = 2
+PRIORITY_BULK = 3
+PRIORITY_NAMES = {PRIORITY_REPLY: 'reply', PRIORITY_NOTIFY: 'notify', PRIORITY_LOG: 'log', PRIORITY_BULK: 'bulk'}
+
+# Какая доля глобального ведра остается нетронутой для более важных классов
+PRIORITY_RESERVE = {PRIORITY_REPLY: 0.0, PRIORITY_NOTIFY: 0.2, PRIORITY_LOG: 0.5, PRIORITY_BULK: 0.5}
+
+# За сколько секунд после RetryAfter глобальная частота возвращается к норме
+RECOVERY_SECONDS = 30.0
+
+# Сколько ведер чатов хранить до чистки простаивающих
+MAX_CHAT_BUCKETS = 10000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float, level: float = 1.0) -> float:
+        """Через сколько секунд в ведре будет level токенов (после refill)"""
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < level:
+            wait = max(wait, (level - self.tokens) / self.rate)
+        return wait
+
+
+class RateGovernor:
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, group_rate: float = 20 / 60,
+                 chat_burst: float = 3.0, group_burst: float = 5.0):
+        """
+        global_rate - сообщений в секунду на весь процесс; chat_rate и group_rate -
+        в секунду на личный чат и на группу; *_burst - сколько сообщений можно
+        отправить подряд без ожидания.
+        """
+        self.base_rate = global_rate
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.group_burst = group_burst
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._penalized_at: Optional[float] = None
+        self._penalized_rate = global_rate
+        self._lock = threading.Lock()
+        self._stats = {name: {'granted': 0, 'delayed': 0, 'wait_total': 0.0} for name in PRIORITY_NAMES.values()}
+        self._retry_after = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                now = time.monotonic()
+                for key, idle in list(self._chats.items()):
+                    idle.refill(now)
+                    if idle.tokens >= idle.capacity and idle.blocked_until <= now:
+                        del self._chats[key]
+            # Отрицательный id - группа или канал
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _update_global_rate(self, now: float) -> None:
+        if self._penalized_at is None:
+            return
+        progress = (now - self._penalized_at) / RECOVERY_SECONDS
+        if progress >= 1:
+            self._penalized_at = None
+            self._global.rate = self.base_rate
+        else:
+            self._global.rate = self._penalized_rate + (self.base_rate - self._penalized_rate) * progress
+
+    def try_acquire(self, chat_id: Optional[int], priority: int = PRIORITY_REPLY) -> float:
+        """Берет токены для одного сообщения; 0 - можно отправлять, иначе - сколько подождать"""
+        with self._lock:
+            now = time.monotonic()
+            self._update_global_rate(now)
+            self._global.refill(now)
+            level = 1.0 + self._global.capacity * PRIORITY_RESERVE.get(priority, 0.0)
+            wait = self._global.wait_time(now, level)
+            bucket = None
+            if chat_id is not None:
+                bucket = self._chat_bucket(chat_id)
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_time(now))
+            if wait > 0:
+                return wait
+            self._global.tokens -= 1
+            if bucket is not None:
+                bucket.tokens -= 1
+            return 0.0
+
+    async def acquire(self, chat_id: Optional[int], priority: int = PRIORITY_REPLY) -> float:
+        """Ждет разрешения на отправку; возвращает время ожидания в секундах"""
+        started = time.monotonic()
+        delayed = False
+        while True:
+            wait = self.try_acquire(chat_id, priority)
+            if wait <= 0:
+                break
+            delayed = True
+            await asyncio.sleep(wait)
+        waited = time.monotonic() - started
+        with self._lock:
+            stats = self._stats[PRIORITY_NAMES.get(priority, 'reply')]
+            stats['granted'] += 1
+            stats['delayed'] += delayed
+            stats['wait_total'] += waited
+        return waited
+
+    def retry_after(self, chat_id: Optional[int], seconds: float) -> None:
+        """Учитывает RetryAfter от Telegram: пауза для чата и снижение общей частоты"""
+        with self._lock:
+            now = time.monotonic()
+            self._retry_after += 1
+            self._update_global_rate(now)
+            self._penalized_rate = max(1.0, self._global.rate / 2)
+            self._penalized_at = now
+            self._global.rate = self._penalized_rate
+            if chat_id is not None:
+                bucket = self._chat_bucket(chat_id)
+                bucket.blocked_until = max(bucket.blocked_until, now + seconds)
+                bucket.tokens = 0.0
+            else:
+                self._global.blocked_until = max(self._global.blocked_until, now + seconds)
+
+    def set_global_rate(self, rate: float) -> None:
+        """Меняет долю лимита токена, доступную процессу"""
+        with self._lock:
+            self.base_rate = rate
+            self._penalized_rate = min(self._penalized_rate, rate)
+            self._global.rate = min(self._global.rate, rate) if self._penalized_at is not None else rate
+            self._global.capacity = rate
+            self._global.tokens = min(self._global.tokens, rate)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'rate': round(self._global.rate, 2),
+                'base_rate': self.base_rate,
+                'tokens': round(self._global.tokens, 2),
+                'chats': len(self._chats),
+                'retry_after': self._retry_after,
+                'priorities': {
+                    name: dict(stats, wait_total=round(stats['wait_total'], 4))
+                    for name, stats in self._stats.items()
+                },
+            }
+
+
+_governor: Optional[RateGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def init_rate_governor(global_rate: float) -> RateGovernor:
+    """Задает долю лимита токена для этого процесса (бот вызывает до создания Application)"""
+    governor = get_rate_governor(global_rate)
+    if governor.base_rate != global_rate:
+        governor.set_global_rate(global_rate)
+    return governor
+
+
+def get_rate_governor(global_rate: Optional[float] = None) -> RateGovernor:
+    """
+    Общий ограничитель процесса: один на бота, клиент уведомлений и логи.
+    Если процесс не задал долю через init_rate_governor, ему достается доля веб-приложения.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            from config import TELEGRAM_WEBAPP_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_GROUP_RATE_PER_MIN
+            _governor = RateGovernor(
+                global_rate=TELEGRAM_WEBAPP_GLOBAL_RATE if global_rate is None else global_rate,
+                chat_rate=TELEGRAM_CHAT_RATE,
+                group_rate=TELEGRAM_GROUP_RATE_PER_MIN / 60,
+            )
+        return _governor
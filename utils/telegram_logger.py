@@ -4,9 +4,6 @@
 import logging
 import traceback
 from datetime import datetime
-from telegram import Bot
-from telegram.error import TelegramError
-import asyncio
 from config import BOT_TOKEN
 
 logger = logging.getLogger(__name__)
@@ -30,17 +27,20 @@ async def _get_bot():
     """Получает экземпляр бота для отправки сообщений"""
     global _bot_instance
     if _bot_instance is None and BOT_TOKEN:
+        # telegram импортируется только при реальной отправке (ускоряет запуск)
+        from telegram import Bot
         _bot_instance = Bot(token=BOT_TOKEN)
     return _bot_instance
 
 
-async def send_to_group(message: str, parse_mode: str = None):
-    """Отправляет сообщение в группу логов"""
+async def send_to_group(message: str, parse_mode: str = None, bot=None):
+    """Отправляет сообщение в группу логов (bot - уже созданный экземпляр, например общего клиента)"""
     if not LOG_GROUP_ID:
         return False
+    from telegram.error import TelegramError
     
     try:
-        bot = await _get_bot()
+        bot = bot or await _get_bot()
         if bot:
             await bot.send_message(
                 chat_id=LOG_GROUP_ID,
@@ -70,43 +70,23 @@ async def send_to_group(message: str, parse_mode: str = None):
 
 
 def send_log_sync(message: str, parse_mode: str = None):
-    """Синхронная обертка для отправки в группу"""
-    import threading
-    
-    def send_in_thread():
-        """Отправка в отдельном потоке с новым event loop"""
-        try:
-            asyncio.run(send_to_group(message, parse_mode))
-        except Exception as e:
-            logger.error(f"Ошибка отправки в потоке: {e}")
-    
+    """
+    Синхронная обертка для отправки в группу: сообщение ставится в очередь
+    общего клиента Telegram (utils.telegram_runtime) и уходит в фоне
+    """
+    if not LOG_GROUP_ID or not BOT_TOKEN:
+        return False
     try:
-        # Пытаемся использовать существующий event loop
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Если цикл запущен, отправляем в отдельном потоке
-                thread = threading.Thread(target=send_in_thread, daemon=True)
-                thread.start()
-                return True
-            else:
-                # Цикл существует, но не запущен
-                loop.run_until_complete(send_to_group(message, parse_mode))
-                return True
-        except RuntimeError:
-            # Нет event loop, создаем новый
-            asyncio.run(send_to_group(message, parse_mode))
-            return True
+        from utils.rate_governor import PRIORITY_LOG
+        from utils.telegram_runtime import get_telegram_runtime
+        # Логи не ждут места в очереди: при переполнении сообщение сразу отбрасывается,
+        # и запрос, который его пишет (after_request веб-приложения), не блокируется
+        future = get_telegram_runtime().submit(lambda bot: send_to_group(message, parse_mode, bot=bot),
+                                               timeout=0, priority=PRIORITY_LOG)
+        return future is not None
     except Exception as e:
         logger.error(f"Ошибка в send_log_sync: {e}", exc_info=True)
-        # Пробуем в отдельном потоке как fallback
-        try:
-            thread = threading.Thread(target=send_in_thread, daemon=True)
-            thread.start()
-            return True
-        except Exception as e2:
-            logger.error(f"Критическая ошибка отправки: {e2}")
-            return False
+        return False
 
 
 def format_error_log(error: Exception, context: str = None):
@@ -187,3 +167,20 @@ def format_order_notification(order_data: dict):
     
     return message
 
+
+def format_import_notification(created: dict):
+    """Форматирует сводку пакетного импорта заказов ({client_id: [order_id, ...]})"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    total = sum(len(order_ids) for order_ids in created.values())
+    
+    message = f"📥 <b>ИМПОРТ ЗАКАЗОВ</b>\n"
+    message += f"⏰ {timestamp}\n\n"
+    message += f"📦 <b>Создано заказов:</b> {total}\n"
+    message += f"👥 <b>Клиентов:</b> {len(created)}\n"
+    
+    for client_id, order_ids in list(created.items())[:10]:
+        message += f"👤 {client_id}: {len(order_ids)} шт.\n"
+    if len(created) > 10:
+        message += f"... и еще {len(created) - 10} клиентов\n"
+    
+    return message
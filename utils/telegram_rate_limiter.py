@@ -0,0 +1,60 @@
+"""
+Адаптер общего RateGovernor к ExtBot (python-telegram-bot).
+
+Подключается к Application бота (ApplicationBuilder.rate_limiter) и к Bot
+общего клиента utils.telegram_runtime, поэтому ответы, уведомления и логи
+одного процесса делят одни и те же лимиты. Приоритет запроса берется из
+rate_limit_args={'priority': ...}; без него сообщения в группы считаются
+трафиком логов, остальные - ответами пользователю. Запросы без chat_id
+(answerCallbackQuery, getMe и т.п.) не ограничиваются.
+"""
+import logging
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from utils.rate_governor import PRIORITY_LOG, PRIORITY_REPLY, RateGovernor, get_rate_governor
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    def __init__(self, governor: Optional[RateGovernor] = None, max_retries: int = 2):
+        self.governor = governor or get_rate_governor()
+        self.max_retries = max_retries
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        chat_id = data.get('chat_id')
+        if not isinstance(chat_id, int):
+            # Без чата (или @username канала) ограничивать нечего
+            return await callback(*args, **kwargs)
+
+        priority = (rate_limit_args or {}).get('priority')
+        if priority is None:
+            priority = PRIORITY_LOG if chat_id < 0 else PRIORITY_REPLY
+
+        for attempt in range(self.max_retries + 1):
+            await self.governor.acquire(chat_id, priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = float(e.retry_after)
+                self.governor.retry_after(chat_id, retry_after)
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"RetryAfter {retry_after} с для чата {chat_id}, повтор {attempt + 1}")
@@ -0,0 +1,212 @@
+"""
+Общий долгоживущий клиент Telegram для синхронного кода.
+
+Уведомления из БД и логи в группу раньше отправлялись так: на каждое сообщение
+новый поток, новый event loop (asyncio.run) и новый Bot со своим HTTP-клиентом.
+Теперь в процессе один фоновый поток с event loop и один Bot с пулом HTTP-
+соединений; синхронный код ставит отправку в очередь через submit() и сразу
+возвращается. Число ожидающих отправок ограничено: при переполнении submit
+ждет освобождения места не дольше submit_timeout, затем сообщение
+отбрасывается. При завершении процесса очередь дорабатывается (close()).
+
+У каждого класса приоритета (utils.rate_governor) своя полоса: свой предел
+очереди и свои слоты одновременных запросов. Сообщения, которые ждут лимита
+частоты (логи в группу - 20 в минуту), занимают только слоты своей полосы и не
+задерживают уведомления клиентам.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional
+
+from utils.rate_governor import PRIORITY_NAMES, PRIORITY_NOTIFY
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramRuntime:
+    def __init__(self, make_bot: Callable[[], object], max_pending: int = 1000, concurrency: int = 8,
+                 submit_timeout: float = 1.0):
+        """
+        make_bot() - создание Bot (вызывается один раз в потоке event loop).
+        max_pending - сколько отправок может ждать в очереди; concurrency - сколько
+        запросов к Telegram выполняется одновременно (оба - на полосу приоритета).
+        """
+        self._make_bot = make_bot
+        self.max_pending = max_pending
+        self.concurrency = concurrency
+        self.submit_timeout = submit_timeout
+        self._slots = {priority: threading.BoundedSemaphore(max_pending) for priority in PRIORITY_NAMES}
+        self._lock = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._bot = None
+        self._limits: Dict[int, asyncio.Semaphore] = {}
+        self._closed = False
+        self._pending = 0
+        self._lane_pending = {priority: 0 for priority in PRIORITY_NAMES}
+        self._stats = {
+            'submitted': 0,
+            'sent': 0,
+            'failed': 0,
+            'dropped': 0,
+            'wait_total': 0.0,
+        }
+
+    def _ensure_started(self) -> None:
+        # Вызывается под self._lock
+        if self._thread is not None:
+            return
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(started,), name='telegram-runtime', daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def _run(self, started: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._limits = {priority: asyncio.Semaphore(self.concurrency) for priority in PRIORITY_NAMES}
+        started.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    @property
+    def bot(self):
+        """Bot общего клиента; использовать только внутри задач submit()"""
+        if self._bot is None:
+            self._bot = self._make_bot()
+        return self._bot
+
+    def submit(self, job: Callable[[object], Awaitable], timeout: Optional[float] = None,
+               priority: int = PRIORITY_NOTIFY) -> Optional[Future]:
+        """
+        Ставит job(bot) в очередь полосы priority; возвращает Future результата или None,
+        если сообщение отброшено (очередь полосы полна дольше timeout или клиент закрыт).
+        """
+        timeout = self.submit_timeout if timeout is None else timeout
+        slots = self._slots[priority]
+        started = time.monotonic()
+        if not slots.acquire(timeout=timeout):
+            with self._lock:
+                self._stats['dropped'] += 1
+            logger.warning("Очередь отправки в Telegram переполнена, сообщение отброшено")
+            return None
+        with self._lock:
+            self._stats['wait_total'] += time.monotonic() - started
+            if self._closed:
+                self._stats['dropped'] += 1
+                slots.release()
+                return None
+            self._ensure_started()
+            self._pending += 1
+            self._lane_pending[priority] += 1
+            self._stats['submitted'] += 1
+        return asyncio.run_coroutine_threadsafe(self._execute(job, priority), self._loop)
+
+    async def _execute(self, job: Callable[[object], Awaitable], priority: int):
+        outcome = 'failed'
+        try:
+            async with self._limits[priority]:
+                result = await job(self.bot)
+        except Exception as e:
+            logger.error(f"Ошибка отправки в Telegram: {e}")
+            raise
+        else:
+            outcome = 'sent'
+            return result
+        finally:
+            self._slots[priority].release()
+            with self._lock:
+                self._stats[outcome] += 1
+                self._pending -= 1
+                self._lane_pending[priority] -= 1
+                self._lock.notify_all()
+
+    def send_message(self, chat_id: int, text: str, parse_mode: Optional[str] = None,
+                     priority: int = PRIORITY_NOTIFY) -> Optional[Future]:
+        """Отправляет сообщение в фоне (fire-and-forget); priority - класс в общем ограничителе частоты"""
+        return self.submit(lambda bot: bot.send_message(
+            chat_id=chat_id, text=text, parse_mode=parse_mode, **rate_limit_kwargs(bot, priority)),
+            priority=priority)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Перестает принимать сообщения, дожидается отправки очереди и закрывает HTTP-клиент"""
+        with self._lock:
+            self._closed = True
+            deadline = time.monotonic() + timeout
+            while self._pending and time.monotonic() < deadline:
+                self._lock.wait(deadline - time.monotonic())
+            if self._pending:
+                logger.warning(f"Не отправлено сообщений в Telegram при остановке: {self._pending}")
+            thread, loop = self._thread, self._loop
+        if thread is None:
+            return
+        if self._bot is not None and getattr(self._bot, 'request', None) is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._bot.request.shutdown(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Ошибка закрытия HTTP-клиента Telegram: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'pending': self._pending,
+                'lanes': {PRIORITY_NAMES[priority]: count for priority, count in self._lane_pending.items()},
+                'max_pending': self.max_pending,
+                'concurrency': self.concurrency,
+                **self._stats,
+                'wait_total': round(self._stats['wait_total'], 4),
+            }
+
+
+def rate_limit_kwargs(bot, priority: int) -> dict:
+    """Аргументы метода Bot с классом приоритета (если у бота есть ограничитель частоты)"""
+    return {'rate_limit_args': {'priority': priority}} if getattr(bot, 'rate_limiter', None) else {}
+
+
+_runtime: Optional[TelegramRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def _make_bot():
+    # telegram импортируется только при первой отправке (ускоряет запуск)
+    from telegram.ext import ExtBot
+    from telegram.request import HTTPXRequest
+    from config import BOT_TOKEN, TELEGRAM_SEND_CONCURRENCY
+    from utils.telegram_rate_limiter import TelegramRateLimiter
+
+    # Лимиты частоты общие с Application бота (если он работает в этом же процессе)
+    return ExtBot(
+        token=BOT_TOKEN,
+        request=HTTPXRequest(connection_pool_size=TELEGRAM_SEND_CONCURRENCY * len(PRIORITY_NAMES)),
+        rate_limiter=TelegramRateLimiter(),
+    )
+
+
+def get_telegram_runtime() -> TelegramRuntime:
+    """Общий клиент Telegram процесса (создается при первом обращении)"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            from config import TELEGRAM_MAX_PENDING, TELEGRAM_SEND_CONCURRENCY, TELEGRAM_SUBMIT_TIMEOUT_MS
+            _runtime = TelegramRuntime(
+                _make_bot,
+                max_pending=TELEGRAM_MAX_PENDING,
+                concurrency=TELEGRAM_SEND_CONCURRENCY,
+                submit_timeout=TELEGRAM_SUBMIT_TIMEOUT_MS / 1000,
+            )
+            atexit.register(_runtime.close)
+        return _runtime
@@ -1,6 +1,8 @@
 """
 Вспомогательные функции для подготовки/очистки тестовых данных.
 """
+from config import DB_CHANGES_KEEP
+from db_changes import FLUSH_KEY, record_changes
 from models.user import UserRole
 
 TEST_ADMIN_ID = 91001
@@ -10,8 +12,6 @@ TEST_CLIENT_ID = 93001
 
 def clear_demo_data(db):
     """Удаляет заказы, тикеты, чаты и связанные сущности (без затрагивания существующих пользователей)."""
-    conn = db.get_connection()
-    cursor = conn.cursor()
     tables = [
         'chat_messages',
         'tracking',
@@ -20,10 +20,16 @@ def clear_demo_data(db):
         'orders',
         'user_data'
     ]
-    for table in tables:
-        cursor.execute(f'DELETE FROM {table}')
-    conn.commit()
-    conn.close()
+    for shard in range(db.shard_count):
+        conn = db.get_connection(shard)
+        cursor = conn.cursor()
+        for table in tables:
+            cursor.execute(f'DELETE FROM {table}')
+        # Удаление идет в обход методов записи - кэши всех процессов сбрасываются целиком
+        record_changes(cursor, [FLUSH_KEY], DB_CHANGES_KEEP)
+        conn.commit()
+        conn.close()
+    db.changes.publish([FLUSH_KEY])
 
 
 def seed_demo_data(db):
@@ -56,3 +62,35 @@ def seed_demo_data(db):
         'order_id': order_id
     }
 
+
+def seed_bulk_data(db, clients: int = 100, orders_per_client: int = 20, managers: int = 5):
+    """
+    Заполняет БД большим объемом данных для замеров производительности:
+    клиенты, менеджеры и заказы (пакетной вставкой). Клиенты получают id с 100001,
+    менеджеры - с 200001. Возвращает количество созданных записей.
+    """
+    manager_ids = [200001 + i for i in range(managers)]
+    client_ids = [100001 + i for i in range(clients)]
+    for manager_id in manager_ids:
+        db.add_user(manager_id, username=f'manager{manager_id}', role=UserRole.MANAGER)
+    for client_id in client_ids:
+        db.add_user(client_id, username=f'client{client_id}', role=UserRole.CLIENT)
+
+    orders = [
+        {
+            'client_id': client_id,
+            'manager_id': manager_ids[(client_id + i) % managers] if managers and i % 3 else None,
+            'description': f'Заказ {i} клиента {client_id}',
+            'from_address': 'Москва',
+            'to_address': 'Санкт-Петербург',
+            'weight': 1.0 + i % 10,
+            'price': 1000.0 + i * 10,
+        }
+        for client_id in client_ids
+        for i in range(orders_per_client)
+    ]
+    created = 0
+    for start in range(0, len(orders), 1000):
+        created += sum(1 for result in db.bulk_create_orders(orders[start:start + 1000]) if 'order_id' in result)
+
+    return {'managers': len(manager_ids), 'clients': len(client_ids), 'orders': created}
@@ -0,0 +1,97 @@
+"""
+Пакетный прием событий отслеживания от перевозчиков.
+
+События проверяются и пачками по chunk_size записываются через
+Database.bulk_add_tracking_events (каждая пачка - отдельная транзакция).
+"""
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+
+
+def validate_tracking_event(event) -> Tuple[Optional[dict], Optional[str]]:
+    """Проверяет событие перевозчика и приводит типы. Возвращает (событие, ошибка)"""
+    if not isinstance(event, dict):
+        return None, 'Event must be a JSON object'
+
+    normalized = {}
+    tracking_number = event.get('tracking_number')
+    if tracking_number not in (None, ''):
+        normalized['tracking_number'] = str(tracking_number).strip().upper()
+    else:
+        try:
+            normalized['order_id'] = int(event.get('order_id'))
+        except (TypeError, ValueError):
+            return None, 'tracking_number or numeric order_id is required'
+
+    status = str(event.get('status') or '').strip()
+    if not status:
+        return None, 'status is required'
+    normalized['status'] = status
+
+    for field in ('location', 'description', 'event_id'):
+        value = event.get(field)
+        normalized[field] = str(value).strip() if value not in (None, '') else None
+
+    # Время скана у перевозчика; без него используется время приема
+    timestamp = event.get('timestamp') or event.get('created_at')
+    if timestamp:
+        try:
+            parsed = datetime.fromisoformat(str(timestamp).strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None, 'timestamp must be in ISO 8601 format'
+        if parsed.tzinfo:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        normalized['created_at'] = parsed.strftime('%Y-%m-%d %H:%M:%S')
+    else:
+        normalized['created_at'] = None
+
+    return normalized, None
+
+
+def ingest_tracking_events(db, events: Iterable, chunk_size: int = 1000,
+                           advance_status: bool = False) -> dict:
+    """
+    Записывает события пачками по chunk_size. Возвращает отчет по каждому событию
+    (index - позиция события в запросе) и итоговые счетчики.
+    """
+    results = []
+    chunk = []
+
+    def flush():
+        for (index, _), result in zip(chunk, db.bulk_add_tracking_events(
+                [event for _, event in chunk], advance_status=advance_status)):
+            if 'error' in result:
+                results.append({'index': index, 'status': 'error', 'error': result['error']})
+                continue
+            item = {
+                'index': index,
+                'status': 'duplicate' if result['duplicate'] else 'created',
+                'order_id': result['order_id']
+            }
+            if result.get('order_status'):
+                item['order_status'] = result['order_status']
+            results.append(item)
+        chunk.clear()
+
+    for index, raw_event in enumerate(events):
+        event, error = validate_tracking_event(raw_event)
+        if error:
+            results.append({'index': index, 'status': 'error', 'error': error})
+            continue
+        chunk.append((index, event))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    results.sort(key=lambda item: item['index'])
+    counts = {'created': 0, 'duplicate': 0, 'error': 0}
+    for item in results:
+        counts[item['status']] += 1
+    return {
+        'total': len(results),
+        'created': counts['created'],
+        'duplicates': counts['duplicate'],
+        'failed': counts['error'],
+        'results': results
+    }
@@ -0,0 +1,102 @@
+"""
+Конкурентная обработка апдейтов бота с сохранением порядка внутри чата
+"""
+import asyncio
+import functools
+import logging
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def _update_key(update: object) -> Optional[int]:
+    """Возвращает ключ упорядочивания: ID чата, а если его нет - ID пользователя"""
+    chat = getattr(update, 'effective_chat', None)
+    if chat is not None:
+        return chat.id
+    user = getattr(update, 'effective_user', None)
+    if user is not None:
+        return user.id
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает апдейты параллельно, но апдейты одного чата (или пользователя)
+    выполняются строго по очереди в порядке поступления.
+
+    Семафор базового класса ограничивает число принятых в обработку апдейтов
+    (очередь с обратным давлением), а рабочие слоты захватываются только после
+    блокировки чата - апдейты, ожидающие свой чат, не занимают слоты других.
+    """
+
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: Optional[int] = None):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        super().__init__(max_pending_updates or max_concurrent_updates * 4)
+        self.worker_limit = max_concurrent_updates
+        self._workers: Optional[asyncio.Semaphore] = None
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_waiters: Dict[int, int] = {}
+
+    async def initialize(self) -> None:
+        self._workers = asyncio.Semaphore(self.worker_limit)
+
+    async def shutdown(self) -> None:
+        self._chat_locks.clear()
+        self._chat_waiters.clear()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        if self._workers is None:
+            await self.initialize()
+
+        key = _update_key(update)
+        if key is None:
+            async with self._workers:
+                await coroutine
+            return
+
+        lock = self._chat_locks.get(key)
+        if lock is None:
+            lock = self._chat_locks[key] = asyncio.Lock()
+        self._chat_waiters[key] = self._chat_waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._workers:
+                    await coroutine
+        finally:
+            self._chat_waiters[key] -= 1
+            if not self._chat_waiters[key]:
+                # Больше никто не ждет этот чат - освобождаем блокировку
+                del self._chat_waiters[key]
+                del self._chat_locks[key]
+
+
+def limit_concurrency(limit: int):
+    """
+    Декоратор для обработчиков: не более `limit` одновременных выполнений.
+    Используется для тяжелых экранов, чтобы они не занимали все рабочие слоты.
+    """
+    if limit < 1:
+        raise ValueError("`limit` must be a positive integer!")
+
+    def decorator(func):
+        # Семафор привязан к event loop, поэтому создаем его лениво для каждого цикла
+        semaphores: Dict[int, asyncio.Semaphore] = {}
+
+        @functools.wraps(func)
+        async def wrapper(update, context, *args, **kwargs):
+            loop_id = id(asyncio.get_running_loop())
+            semaphore = semaphores.get(loop_id)
+            if semaphore is None:
+                semaphores.clear()
+                semaphore = semaphores[loop_id] = asyncio.Semaphore(limit)
+            async with semaphore:
+                return await func(update, context, *args, **kwargs)
+
+        wrapper.concurrency_limit = limit
+        return wrapper
+
+    return decorator
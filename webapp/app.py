@@ -4,42 +4,134 @@ Flask веб-приложение для логистической платфо
 """
 import os
 import sys
+import csv
 import hmac
 import hashlib
 import json
 import logging
+import threading
 from datetime import datetime
+from functools import wraps
 from uuid import uuid4
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import (
+    Flask, Response, g, render_template, request, jsonify, session, redirect, url_for, stream_with_context,
+    make_response
+)
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from flasgger import Swagger
 from pathlib import Path
 
 # Добавляем корневую директорию в путь
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from database import Database
+from database import ORDER_SUMMARY_FIELDS, ORDER_SYNC_LIMIT, TICKET_SUMMARY_FIELDS, get_database
+from db_pool import enter_read_lane, exit_read_lane
+from models.records import dumps as dumps_records_json
 from models.user import UserRole
 import config
 from utils.test_data import seed_demo_data, clear_demo_data
+from utils.order_export import EXPORT_FORMATS, iter_export, parse_date_range
+from utils.order_import import (
+    OrderImportError, iter_csv_rows, iter_jsonl_rows, import_orders as import_orders_from_rows
+)
+from utils.tracking_ingest import ingest_tracking_events
+from utils.broadcast import BROADCAST_MAX_LENGTH, BroadcastEngine
+from utils.rate_governor import get_rate_governor
+from utils.telegram_runtime import get_telegram_runtime
+from webapp.lazy_swagger import init_lazy_swagger
+from webapp.response_cache import ResponseCache
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """Сериализует записи БД (models.records) объектами по готовым шаблонам"""
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return dumps_records_json(obj, **kwargs)
+
 
 app = Flask(__name__, 
             template_folder='templates',
             static_folder='static')
+app.json = RecordJSONProvider(app)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-change-in-production')
 CORS(app)
-swagger = Swagger(app)
-
-_db = Database()
-
+init_lazy_swagger(app)
 
 class DatabaseProxy:
     def __getattr__(self, item):
-        target = app.config.get('DB_INSTANCE') or _db
+        # Общий экземпляр создается при первом запросе, а не при импорте приложения
+        target = app.config.get('DB_INSTANCE') or get_database()
         return getattr(target, item)
 
 
 db = DatabaseProxy()
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Кэш ответов текущей БД, подписанный на ее канал изменений"""
+    target = app.config.get('DB_INSTANCE') or get_database()
+    feed, cache = app.extensions.get('response_cache', (None, None))
+    if feed is target.changes:
+        return cache
+    with _response_cache_lock:
+        feed, cache = app.extensions.get('response_cache', (None, None))
+        if feed is not target.changes:
+            # БД сменилась (тесты подменяют DB_INSTANCE) - ответы старой БД не нужны
+            if feed is not None:
+                feed.unsubscribe(cache.invalidate)
+            cache = ResponseCache(config.RESPONSE_CACHE_BYTES)
+            target.changes.subscribe(cache.invalidate)
+            app.extensions['response_cache'] = (target.changes, cache)
+        return cache
+
+
+def cached_response(tags):
+    """
+    Кэширует успешный ответ GET-маршрута для пользователя сессии.
+    tags(user, **view_args) - теги сущностей, от которых зависит ответ;
+    user:<id> добавляется всегда (от пользователя зависят роль и доступ).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            user_id = session.get('user_id')
+            user = db.get_user(user_id) if user_id and config.RESPONSE_CACHE_BYTES > 0 else None
+            if not user:
+                return view(**view_args)
+
+            cache = get_response_cache()
+            route = request.endpoint
+            key = (route, tuple(sorted(view_args.items())), tuple(sorted(request.args.items(multi=True))),
+                   user_id, user['role'])
+            entry, version = cache.get(route, key)
+            if entry is not None:
+                response = app.response_class(entry.body, mimetype=entry.mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(view(**view_args))
+            if response.status_code == 200:
+                cache.set(route, key, response.get_data(), response.mimetype,
+                          {f'user:{user_id}', *tags(user, **view_args)}, version)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def order_tags(user, order_id):
+    return {f'order:{order_id}'}
+
+
+def stats_tags(user):
+    """Клиенту хватает user:<id>; менеджер видит и свободные заказы, админ - все заказы и пользователей"""
+    if user['role'] == UserRole.MANAGER:
+        return {'orders', f'manager:{user["user_id"]}'}
+    if user['role'] == UserRole.ADMIN:
+        return {'orders', 'users'}
+    return set()
 
 # Настройка логирования для Flask
 logging.basicConfig(
@@ -63,6 +155,31 @@ def get_current_user():
     return db.get_user(user_id)
 
 
+def serialize_user(user: dict, profile: dict) -> dict:
+    """Профиль пользователя в формате GET /api/user"""
+    return {
+        'id': user['user_id'],
+        'user_id': user['user_id'],
+        'username': user['username'],
+        'first_name': user['first_name'],
+        'last_name': user['last_name'],
+        'role': user['role'],
+        'phone': profile.get('phone') or '',
+        'email': profile.get('email') or '',
+        'notifications_enabled': user.get('notifications_enabled', False)
+    }
+
+
+def requested_fields(summary_fields: tuple):
+    """Поля списка из ?view=summary или ?fields=a,b,c (None - все поля)"""
+    if request.args.get('view') == 'summary':
+        return summary_fields
+    fields = request.args.get('fields')
+    if fields:
+        return [name.strip() for name in fields.split(',') if name.strip()]
+    return None
+
+
 def user_can_access_order(user: dict, order: dict) -> bool:
     """Проверяет, может ли пользователь получить доступ к заказу"""
     if not user or not order:
@@ -96,6 +213,15 @@ def has_test_token():
     return token == token_value
 
 
+def has_carrier_token():
+    auth_header = request.headers.get('Authorization', '')
+    token_value = getattr(config, 'CARRIER_API_TOKEN', '')
+    if not token_value or not auth_header.startswith('Bearer '):
+        return False
+    token = auth_header.split(' ', 1)[1].strip()
+    return hmac.compare_digest(token, token_value)
+
+
 def ensure_admin_or_token():
     if has_test_token():
         return True
@@ -254,21 +380,9 @@ def user():
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Получаем дополнительные данные из user_data
-        phone = db.get_user_data(user_id, 'phone') or ''
-        email = db.get_user_data(user_id, 'email') or ''
-        
-        return jsonify({
-            'id': user['user_id'],
-            'user_id': user['user_id'],
-            'username': user['username'],
-            'first_name': user['first_name'],
-            'last_name': user['last_name'],
-            'role': user['role'],
-            'phone': phone,
-            'email': email,
-            'notifications_enabled': user.get('notifications_enabled', False)
-        })
+        # Получаем дополнительные данные из user_data одним запросом
+        profile = db.get_user_data_many(user_id, ['phone', 'email'])
+        return jsonify(serialize_user(user, profile))
     
     elif request.method == 'PUT':
         data = request.json
@@ -286,10 +400,7 @@ def user():
         )
         
         # Сохраняем дополнительные данные
-        if 'phone' in data:
-            db.save_user_data(user_id, 'phone', data['phone'])
-        if 'email' in data:
-            db.save_user_data(user_id, 'email', data['email'])
+        db.save_user_data_many(user_id, {key: data[key] for key in ('phone', 'email') if key in data})
         
         # Обновляем настройки уведомлений
         if 'notifications_enabled' in data:
@@ -310,18 +421,23 @@ def orders():
     order_type = request.args.get('type')
     
     if request.method == 'GET':
-        # Получаем заказы в зависимости от роли
-        if role == UserRole.CLIENT:
-            orders_list = db.get_user_orders(user_id, role)
-        elif role == UserRole.MANAGER:
-            if order_type == 'incoming':
-                orders_list = db.get_incoming_orders()
-            elif order_type in ('assigned', 'my', 'mine'):
-                orders_list = db.get_manager_assigned_orders(user_id)
-            else:
-                orders_list = db.get_manager_assigned_orders(user_id)
-        else:  # ADMIN
-            orders_list = db.get_user_orders(0, role)
+        # Узкая проекция (fields= / view=summary) читает меньше колонок и уменьшает ответ
+        fields = requested_fields(ORDER_SUMMARY_FIELDS)
+        try:
+            # Получаем заказы в зависимости от роли
+            if role == UserRole.CLIENT:
+                orders_list = db.get_user_orders(user_id, role, fields)
+            elif role == UserRole.MANAGER:
+                if order_type == 'incoming':
+                    orders_list = db.get_incoming_orders(fields)
+                elif order_type in ('assigned', 'my', 'mine'):
+                    orders_list = db.get_manager_assigned_orders(user_id, fields)
+                else:
+                    orders_list = db.get_manager_assigned_orders(user_id, fields)
+            else:  # ADMIN
+                orders_list = db.get_user_orders(0, role, fields)
+        except ValueError as exc:
+            return jsonify({'error': str(exc)}), 400
         
         return jsonify({'orders': orders_list})
     
@@ -355,7 +471,75 @@ def orders():
         return jsonify({'success': True, 'order': dict(order)}), 201
 
 
+@app.route('/api/orders/import', methods=['POST'])
+def import_orders():
+    """
+    Пакетный импорт заказов из CSV или JSONL (админ/менеджер)
+    ---
+    consumes:
+      - multipart/form-data
+      - text/csv
+      - application/x-ndjson
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: ['csv', 'jsonl']
+      - name: file
+        in: formData
+        type: file
+    responses:
+      200:
+        description: Отчет по каждой строке файла
+      400:
+        description: Файл не читается; если ошибка в середине файла - отчет о созданных до нее заказах
+    """
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    user = db.get_user(user_id)
+    if user['role'] not in [UserRole.MANAGER, UserRole.ADMIN]:
+        return jsonify({'error': 'Only managers and admins can import orders'}), 403
+
+    # Файл можно передать как multipart-поле file или как тело запроса
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    filename = (upload.filename or '') if upload else ''
+    content_type = (upload.mimetype if upload else request.mimetype) or ''
+
+    import_format = (request.args.get('format') or '').lower()
+    if not import_format:
+        if filename.endswith('.jsonl') or filename.endswith('.ndjson') or 'ndjson' in content_type or 'jsonl' in content_type:
+            import_format = 'jsonl'
+        elif filename.endswith('.csv') or content_type == 'text/csv':
+            import_format = 'csv'
+    if import_format not in ('csv', 'jsonl'):
+        return jsonify({'error': 'Unsupported format, use csv or jsonl'}), 400
+
+    # Менеджер импортирует заказы на себя, если менеджер не указан в строке
+    default_manager_id = user_id if user['role'] == UserRole.MANAGER else None
+    rows = iter_csv_rows(stream) if import_format == 'csv' else iter_jsonl_rows(stream)
+    try:
+        report = import_orders_from_rows(
+            db, rows,
+            chunk_size=config.ORDER_IMPORT_CHUNK_SIZE,
+            max_rows=config.ORDER_IMPORT_MAX_ROWS,
+            default_manager_id=default_manager_id
+        )
+    except (OrderImportError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': f'Invalid file: {e}'}), 400
+
+    app_logger.info("Orders import: user_id=%s created=%s failed=%s",
+                    user_id, report['created'], report['failed'])
+    if 'error' in report:
+        # Файл испорчен в середине: созданные до ошибки заказы в отчете, повторять их не нужно
+        return jsonify({'success': False, **report}), 400
+    return jsonify({'success': True, **report})
+
+
 @app.route('/api/orders/<int:order_id>', methods=['GET'])
+@cached_response(order_tags)
 def get_order(order_id):
     """Получает информацию о заказе"""
     user_id = session.get('user_id')
@@ -563,6 +747,7 @@ def update_order_status(order_id):
 
 
 @app.route('/api/tickets', methods=['GET'])
+@cached_response(lambda user: {f'manager:{user["user_id"]}'})
 def get_tickets():
     """Получает тикеты менеджера"""
     user_id = session.get('user_id')
@@ -574,7 +759,10 @@ def get_tickets():
         return jsonify({'error': 'Only managers can view tickets'}), 403
     
     status = request.args.get('status')
-    tickets = db.get_manager_tickets(user_id, status)
+    try:
+        tickets = db.get_manager_tickets(user_id, status, requested_fields(TICKET_SUMMARY_FIELDS))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
     
     return jsonify({'tickets': tickets})
 
@@ -597,6 +785,7 @@ def accept_ticket(ticket_id):
 
 
 @app.route('/api/orders/<int:order_id>/tracking', methods=['GET'])
+@cached_response(order_tags)
 def get_tracking(order_id):
     """Получает историю отслеживания заказа"""
     user_id = session.get('user_id')
@@ -616,6 +805,67 @@ def get_tracking(order_id):
     return jsonify({'tracking': tracking})
 
 
+@app.route('/api/tracking/bulk', methods=['POST'])
+def bulk_tracking_events():
+    """
+    Пакетная загрузка событий отслеживания от перевозчика
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            events:
+              type: array
+              items:
+                type: object
+                properties:
+                  tracking_number:
+                    type: string
+                  order_id:
+                    type: integer
+                  status:
+                    type: string
+                  location:
+                    type: string
+                  description:
+                    type: string
+                  event_id:
+                    type: string
+                    description: Ключ события у перевозчика, повторы с тем же ключом пропускаются
+                  timestamp:
+                    type: string
+                    description: Время скана (ISO 8601)
+            advance_status:
+              type: boolean
+              description: Продвигать статус заказа по событиям
+    responses:
+      200:
+        description: Результат по каждому событию
+    """
+    if not has_carrier_token() and not ensure_admin_or_token():
+        return jsonify({'error': 'Carrier token or admin access required'}), 403
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('events'), list):
+        return jsonify({'error': 'events array is required'}), 400
+
+    events = data['events']
+    if len(events) > config.TRACKING_BULK_MAX_EVENTS:
+        return jsonify({'error': f'Too many events, limit is {config.TRACKING_BULK_MAX_EVENTS}'}), 413
+
+    report = ingest_tracking_events(
+        db, events,
+        chunk_size=config.TRACKING_BULK_CHUNK_SIZE,
+        advance_status=bool(data.get('advance_status'))
+    )
+    app_logger.info("Tracking bulk: created=%s duplicates=%s failed=%s",
+                    report['created'], report['duplicates'], report['failed'])
+    return jsonify({'success': True, **report})
+
+
 @app.route('/api/orders/<int:order_id>/contact-logist', methods=['POST'])
 def contact_logist(order_id):
     """Создает тикет для связи клиента с менеджером"""
@@ -873,6 +1123,7 @@ def complete_payment(payment_id):
 
 
 @app.route('/api/stats', methods=['GET'])
+@cached_response(stats_tags)
 def get_stats():
     """Получает статистику"""
     user_id = session.get('user_id')
@@ -880,34 +1131,247 @@ def get_stats():
         return jsonify({'error': 'Not authenticated'}), 401
     
     user = db.get_user(user_id)
-    
-    if user['role'] == UserRole.CLIENT:
-        orders = db.get_user_orders(user_id, user['role'])
-        stats = {
-            'total_orders': len(orders),
-            'pending': len([o for o in orders if o['status'] == 'pending']),
-            'in_transit': len([o for o in orders if o['status'] == 'in_transit']),
-            'delivered': len([o for o in orders if o['status'] == 'delivered'])
-        }
-    elif user['role'] == UserRole.MANAGER:
-        tickets = db.get_manager_tickets(user_id)
-        orders = db.get_user_orders(user_id, user['role'])
-        stats = {
-            'total_tickets': len(tickets),
-            'new_tickets': len([t for t in tickets if t['status'] == 'new']),
-            'total_orders': len(orders),
-            'in_progress': len([o for o in orders if o['status'] == 'in_transit'])
-        }
-    else:  # ADMIN
-        all_orders = db.get_user_orders(0, user['role'])
-        all_users = db.get_all_users()
-        stats = {
-            'total_orders': len(all_orders),
-            'total_users': len(all_users),
-            'pending_orders': len([o for o in all_orders if o['status'] == 'pending'])
-        }
-    
-    return jsonify({'stats': stats})
+    return jsonify({'stats': db.get_user_stats(user)})
+
+
+@app.route('/api/bootstrap', methods=['GET'])
+def bootstrap():
+    """
+    Стартовые данные WebApp одним запросом
+    Заменяет последовательные /api/user, /api/orders, /api/stats и /api/tickets при открытии приложения.
+    ---
+    responses:
+      200:
+        description: user, первая страница заказов (orders, orders_total), stats, tickets; для менеджера также incoming
+      401:
+        description: Нет действующей сессии
+    """
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    data = db.get_webapp_bootstrap(user_id, session.get('session_token'),
+                                   orders_limit=config.WEBAPP_BOOTSTRAP_ORDERS)
+    if data is None:
+        session.clear()
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    data['user'] = serialize_user(data['user'], data.pop('profile'))
+    return jsonify(data)
+
+
+@app.route('/api/sync', methods=['GET'])
+def sync_orders():
+    """
+    Изменения заказов после курсора - для инкрементальной синхронизации списков
+    ---
+    parameters:
+      - name: since
+        in: query
+        type: string
+        description: Курсор cursor из предыдущего ответа; пусто или 0 - с начала журнала
+      - name: limit
+        in: query
+        type: integer
+        description: Сколько записей журнала прочитать (на шард)
+      - name: fields
+        in: query
+        type: string
+      - name: view
+        in: query
+        type: string
+        enum: ['summary']
+    responses:
+      200:
+        description: Сжатые изменения (по одному на заказ), новый курсор и признак has_more
+    """
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    user = db.get_user(user_id)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+
+    try:
+        limit = min(max(int(request.args.get('limit', ORDER_SYNC_LIMIT)), 1), ORDER_SYNC_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    try:
+        result = db.get_order_changes(user_id, user['role'], request.args.get('since'), limit,
+                                      requested_fields(ORDER_SUMMARY_FIELDS))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return jsonify(result)
+
+
+@app.route('/api/admin/metrics', methods=['GET'])
+def admin_metrics():
+    """
+    Метрики подсистем хранения и уведомлений (пул чтения, очередь записи, кэши, канал изменений)
+    ---
+    responses:
+      200:
+        description: Счетчики по подсистемам
+    """
+    if not ensure_admin_or_token():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    return jsonify({
+        'read_pool': db.read_pool.metrics(),
+        'writer': db.writer.metrics() if db.writer else None,
+        'changes': db.changes.metrics(),
+        'cache': db.cache.stats(),
+        'responses': get_response_cache().metrics(),
+        'singleflight': db.flights.metrics(),
+        'notifications': db.notifier.metrics(),
+        'telegram': dict(get_telegram_runtime().metrics(), rate=get_rate_governor().metrics())
+    })
+
+
+@app.route('/api/admin/broadcasts', methods=['POST'])
+def admin_create_broadcast():
+    """
+    Рассылка сообщения всем клиентам с включенными уведомлениями
+    ---
+    parameters:
+      - name: body
+        in: body
+        required: true
+        schema:
+          type: object
+          properties:
+            text:
+              type: string
+              description: Текст сообщения (HTML, до 4096 символов)
+    responses:
+      201:
+        description: Рассылка создана и отправляется в фоне
+      400:
+        description: Пустой или слишком длинный текст
+      503:
+        description: Не настроен BOT_TOKEN
+    """
+    if not ensure_admin_or_token():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    text = ((request.json or {}).get('text') or '').strip()
+    if not text:
+        return jsonify({'error': 'text is required'}), 400
+    if len(text) > BROADCAST_MAX_LENGTH:
+        return jsonify({'error': f'text is longer than {BROADCAST_MAX_LENGTH} characters'}), 400
+    if not config.BOT_TOKEN:
+        return jsonify({'error': 'BOT_TOKEN is not configured'}), 503
+
+    user = get_current_user()
+    target = app.config.get('DB_INSTANCE') or get_database()
+    broadcast_id = target.create_broadcast(text, created_by=user['user_id'] if user else None)
+    BroadcastEngine(target).start(broadcast_id)
+    return jsonify(target.get_broadcast(broadcast_id)), 201
+
+
+@app.route('/api/admin/broadcasts/<int:broadcast_id>', methods=['GET'])
+def admin_get_broadcast(broadcast_id):
+    """
+    Прогресс рассылки: доставлено, ошибки, заблокировавшие бота, скорость отправки
+    ---
+    parameters:
+      - name: broadcast_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Рассылка со счетчиками и throughput (сообщений в секунду)
+      404:
+        description: Рассылка не найдена
+    """
+    if not ensure_admin_or_token():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    broadcast = db.get_broadcast(broadcast_id)
+    if not broadcast:
+        return jsonify({'error': 'Broadcast not found'}), 404
+    return jsonify(broadcast)
+
+
+@app.route('/api/admin/broadcasts/<int:broadcast_id>/cancel', methods=['POST'])
+def admin_cancel_broadcast(broadcast_id):
+    """
+    Остановка рассылки (уже отправленные сообщения не отзываются)
+    ---
+    responses:
+      200:
+        description: Рассылка остановлена
+      404:
+        description: Рассылка не найдена или уже завершена
+    """
+    if not ensure_admin_or_token():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    if not db.cancel_broadcast(broadcast_id):
+        return jsonify({'error': 'Broadcast not found or already finished'}), 404
+    return jsonify(db.get_broadcast(broadcast_id))
+
+
+@app.route('/api/admin/export/orders', methods=['GET'])
+def export_orders():
+    """
+    Потоковая выгрузка заказов со сводкой отслеживания и платежей
+    ---
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: ['csv', 'jsonl']
+      - name: status
+        in: query
+        type: string
+      - name: from
+        in: query
+        type: string
+        description: Начало периода (YYYY-MM-DD[ HH:MM:SS]), включительно
+      - name: to
+        in: query
+        type: string
+        description: Конец периода; дата без времени включает весь день
+      - name: gzip
+        in: query
+        type: boolean
+    responses:
+      200:
+        description: CSV или JSONL файл
+    """
+    if not ensure_admin_or_token():
+        return jsonify({'error': 'Admin access required'}), 403
+
+    export_format = (request.args.get('format') or 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported format, use csv or jsonl'}), 400
+
+    try:
+        date_from, date_to = parse_date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({'error': 'Invalid date, use YYYY-MM-DD'}), 400
+
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    rows = db.iter_orders_for_export(
+        status=request.args.get('status') or None,
+        date_from=date_from,
+        date_to=date_to
+    )
+
+    filename = f"orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    return Response(
+        stream_with_context(iter_export(rows, export_format, compress)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
 
 
 # Обработчики ошибок Flask
@@ -937,6 +1401,16 @@ def before_request():
     import time
     request._start_time = time.time()  # Сохраняем время начала запроса
     app_logger.debug(f'Request: {request.method} {request.path}')
+    # GET-запросы читают через пул только-чтения и не конкурируют с записью
+    if request.method in ('GET', 'HEAD'):
+        g.read_lane_token = enter_read_lane()
+
+
+@app.teardown_request
+def teardown_request(error=None):
+    token = g.pop('read_lane_token', None)
+    if token is not None:
+        exit_read_lane(token)
 
 
 @app.after_request
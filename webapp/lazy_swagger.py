@@ -0,0 +1,60 @@
+"""
+Ленивое подключение Swagger UI (flasgger).
+
+flasgger при импорте тянет jsonschema и yaml и заметно замедляет запуск,
+а документация API открывается редко. Маршруты /apidocs/ и /apispec_1.json
+регистрируются сразу, а сам flasgger импортируется при первом обращении к ним.
+"""
+import importlib.util
+import logging
+import os
+import threading
+
+from flask import Blueprint, current_app
+
+logger = logging.getLogger(__name__)
+
+SPEC_ENDPOINT = 'apispec_1'
+
+
+def init_lazy_swagger(app) -> bool:
+    """Регистрирует маршруты документации. Возвращает False, если flasgger не установлен"""
+    spec = importlib.util.find_spec('flasgger')
+    if spec is None:
+        logger.warning("flasgger не установлен - документация API отключена")
+        return False
+    ui_dir = os.path.join(os.path.dirname(spec.origin), 'ui3')
+
+    # Имя blueprint совпадает с flasgger, чтобы работали его шаблоны (url_for('flasgger.static'))
+    blueprint = Blueprint(
+        'flasgger', __name__,
+        template_folder=os.path.join(ui_dir, 'templates'),
+        static_folder=os.path.join(ui_dir, 'static'),
+        static_url_path='/flasgger_static'
+    )
+    state = {}
+    lock = threading.Lock()
+
+    def get_swagger():
+        with lock:
+            if 'swagger' not in state:
+                from flasgger import Swagger
+                # Без init_app: маршруты уже зарегистрированы, нужен только сбор спецификации
+                swagger = Swagger()
+                swagger.app = current_app._get_current_object()
+                swagger.load_config(swagger.app)
+                state['swagger'] = swagger
+            return state['swagger']
+
+    def apidocs():
+        from flasgger.base import APIDocsView
+        return APIDocsView(view_args={'config': get_swagger().config}).get()
+
+    def apispec():
+        from flasgger.base import APISpecsView
+        return APISpecsView(loader=lambda: get_swagger().get_apispecs(SPEC_ENDPOINT)).get()
+
+    blueprint.add_url_rule('/apidocs/', 'apidocs', apidocs)
+    blueprint.add_url_rule('/apispec_1.json', SPEC_ENDPOINT, apispec)
+    app.register_blueprint(blueprint)
+    return True
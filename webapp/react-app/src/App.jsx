@@ -5,12 +5,13 @@ import ClientView from './components/ClientView'
 import ManagerView from './components/ManagerView'
 import AdminView from './components/AdminView'
 import LoadingScreen from './components/LoadingScreen'
-import { authUser, logout } from './services/api'
+import { authUser, getBootstrap, logout } from './services/api'
 
 function App() {
   const [loading, setLoading] = useState(true)
   const [authenticated, setAuthenticated] = useState(false)
   const [user, setUser] = useState(null)
+  const [bootstrap, setBootstrap] = useState(null)
 
   useEffect(() => {
     initApp()
@@ -29,7 +30,12 @@ function App() {
         if (initData) {
           const response = await authUser(initData)
           if (response.success) {
-            setUser(response.user)
+            // Профиль, заказы, статистика и тикеты приходят одним ответом
+            const data = await getBootstrap()
+            if (data) {
+              setBootstrap(data)
+            }
+            setUser(data?.user ? { ...response.user, ...data.user } : response.user)
             setAuthenticated(true)
           }
         }
@@ -66,6 +72,7 @@ function App() {
     } finally {
       localStorage.removeItem('testUser')
       setUser(null)
+      setBootstrap(null)
       setAuthenticated(false)
     }
   }
@@ -80,9 +87,9 @@ function App() {
 
   return (
     <div className="app">
-      {user?.role === 'client' && <ClientView user={user} onLogout={handleLogout} />}
-      {user?.role === 'manager' && <ManagerView user={user} onLogout={handleLogout} />}
-      {user?.role === 'admin' && <AdminView user={user} onLogout={handleLogout} />}
+      {user?.role === 'client' && <ClientView user={user} initialData={bootstrap} onLogout={handleLogout} />}
+      {user?.role === 'manager' && <ManagerView user={user} initialData={bootstrap} onLogout={handleLogout} />}
+      {user?.role === 'admin' && <AdminView user={user} initialData={bootstrap} onLogout={handleLogout} />}
     </div>
   )
 }
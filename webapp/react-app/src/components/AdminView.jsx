@@ -5,18 +5,21 @@ import OrderCard from './OrderCard'
 import AdminTestPanel from './AdminTestPanel'
 import UserInfoBar from './UserInfoBar'
 
-const AdminView = ({ user, onLogout }) => {
-  const [orders, setOrders] = useState([])
-  const [stats, setStats] = useState({})
-  const [loading, setLoading] = useState(true)
+const AdminView = ({ user, initialData, onLogout }) => {
+  const [orders, setOrders] = useState(initialData?.orders || [])
+  const [stats, setStats] = useState(initialData?.stats || {})
+  const [loading, setLoading] = useState(!initialData)
 
   useEffect(() => {
-    loadData()
+    // Стартовые данные уже пришли из /api/bootstrap; дозагружаем список, только если он не поместился в первую страницу
+    if (!initialData || initialData.orders_total > initialData.orders.length) {
+      loadData()
+    }
   }, [])
 
   const loadData = async () => {
     try {
-      setLoading(true)
+      setLoading(orders.length === 0)
       const [ordersData, statsData] = await Promise.all([
         getOrders(),
         getStats()
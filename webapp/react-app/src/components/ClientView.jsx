@@ -10,7 +10,7 @@ import ChatScreen from './ChatScreen'
 import OfferScreen from './OfferScreen'
 import UserInfoBar from './UserInfoBar'
 
-const ClientView = ({ user, onLogout }) => {
+const ClientView = ({ user, initialData, onLogout }) => {
   const [activeTab, setActiveTab] = useState('home')
   const [showCreateOrder, setShowCreateOrder] = useState(false)
   const [selectedOrder, setSelectedOrder] = useState(null)
@@ -72,6 +72,7 @@ const ClientView = ({ user, onLogout }) => {
           <OrdersScreen
             key={refreshKey}
             user={user}
+            initialData={refreshKey === 0 ? initialData : null}
             onOrderClick={handleOrderClick}
             onCreateOrder={() => setShowCreateOrder(true)}
           />
@@ -83,6 +84,7 @@ const ClientView = ({ user, onLogout }) => {
           <OrdersScreen
             key={refreshKey}
             user={user}
+            initialData={refreshKey === 0 ? initialData : null}
             onOrderClick={handleOrderClick}
             onCreateOrder={() => setShowCreateOrder(true)}
           />
@@ -104,6 +106,7 @@ const ClientView = ({ user, onLogout }) => {
           <OrdersScreen
             key={refreshKey}
             user={user}
+            initialData={refreshKey === 0 ? initialData : null}
             onOrderClick={handleOrderClick}
             onCreateOrder={() => setShowCreateOrder(true)}
           />
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import './ManagerView.css'
 import { getOrders, assignOrder } from '../services/api'
 import OrderCard from './OrderCard'
@@ -6,21 +6,31 @@ import ChatScreen from './ChatScreen'
 import OfferEditor from './OfferEditor'
 import UserInfoBar from './UserInfoBar'
 
-const ManagerView = ({ user, onLogout }) => {
+const ManagerView = ({ user, initialData, onLogout }) => {
   const [activeSection, setActiveSection] = useState('incoming')
-  const [incomingOrders, setIncomingOrders] = useState([])
-  const [myOrders, setMyOrders] = useState([])
+  const [incomingOrders, setIncomingOrders] = useState(initialData?.incoming || [])
+  const [myOrders, setMyOrders] = useState(initialData?.orders || [])
   const [loading, setLoading] = useState(false)
   const [actionLoading, setActionLoading] = useState(null)
   const [chatOrder, setChatOrder] = useState(null)
   const [offerOrder, setOfferOrder] = useState(null)
+  const firstRender = useRef(true)
 
   useEffect(() => {
-    loadIncoming()
-    loadMyOrders()
+    // Первая страница обоих списков уже пришла из /api/bootstrap
+    if (!initialData || initialData.incoming_total > initialData.incoming.length) {
+      loadIncoming()
+    }
+    if (!initialData || initialData.orders_total > initialData.orders.length) {
+      loadMyOrders()
+    }
   }, [])
 
   useEffect(() => {
+    if (firstRender.current) {
+      firstRender.current = false
+      return
+    }
     if (activeSection === 'incoming') {
       loadIncoming()
     } else if (activeSection === 'my') {
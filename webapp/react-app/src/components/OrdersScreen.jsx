@@ -3,15 +3,18 @@ import './OrdersScreen.css'
 import { getOrders } from '../services/api'
 import OrderCard from './OrderCard'
 
-const OrdersScreen = ({ user, onOrderClick, onCreateOrder }) => {
-  const [orders, setOrders] = useState([])
+const OrdersScreen = ({ user, initialData, onOrderClick, onCreateOrder }) => {
+  const [orders, setOrders] = useState(initialData?.orders || [])
   const [filteredOrders, setFilteredOrders] = useState([])
-  const [loading, setLoading] = useState(true)
+  const [loading, setLoading] = useState(!initialData)
   const [searchQuery, setSearchQuery] = useState('')
   const [statusFilter, setStatusFilter] = useState('all')
 
   useEffect(() => {
-    loadOrders()
+    // Первая страница уже пришла из /api/bootstrap; остальное дозагружаем в фоне
+    if (!initialData || initialData.orders_total > initialData.orders.length) {
+      loadOrders()
+    }
   }, [])
 
   useEffect(() => {
@@ -20,7 +23,7 @@ const OrdersScreen = ({ user, onOrderClick, onCreateOrder }) => {
 
   const loadOrders = async () => {
     try {
-      setLoading(true)
+      setLoading(orders.length === 0)
       const data = await getOrders()
       setOrders(data.orders || [])
     } catch (error) {
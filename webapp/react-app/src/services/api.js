@@ -14,6 +14,15 @@ export const getCurrentUser = async () => {
   return response.json()
 }
 
+// Стартовые данные одним запросом: user, первая страница заказов, stats, tickets
+export const getBootstrap = async () => {
+  const response = await fetch(`${API_BASE}/api/bootstrap`)
+  if (!response.ok) {
+    return null
+  }
+  return response.json()
+}
+
 export const getOrders = async (options = {}) => {
   let url = `${API_BASE}/api/orders`
   if (typeof options === 'string' && options) {
@@ -0,0 +1,116 @@
+"""
+Кэш готовых ответов GET-маршрутов с инвалидацией по тегам.
+
+Ключ записи - маршрут, параметры запроса и пользователь с ролью; запись
+помечена тегами сущностей, из которых собран ответ ('order:7', 'user:42',
+'manager:3', 'orders' - любой заказ, 'users' - состав пользователей). Теги
+совпадают с ключами изменений db_changes: после записи в БД (в этом или
+другом процессе) сбрасываются ровно те ответы, которые от нее зависят.
+Объем ограничен бюджетом памяти, лишнее вытесняется по LRU.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, NamedTuple, Optional, Set, Tuple
+
+# Примерные накладные расходы на запись сверх тела ответа (ключ, теги, служебные объекты)
+ENTRY_OVERHEAD = 256
+
+
+class CachedResponse(NamedTuple):
+    route: str
+    body: bytes
+    mimetype: str
+    tags: frozenset
+    size: int
+
+
+class ResponseCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+        self._by_tag: Dict[str, Set[Hashable]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        # Растет при каждой инвалидации: ответ, собранный до нее, не сохраняется
+        self._version = 0
+        self._routes: Dict[str, Dict[str, int]] = {}
+
+    def _route_stats(self, route: str) -> Dict[str, int]:
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+        return stats
+
+    def get(self, route: str, key: Hashable) -> Tuple[Optional[CachedResponse], int]:
+        """(ответ или None, версия); версию передать в set вместе с собранным ответом"""
+        with self._lock:
+            entry = self._entries.get(key)
+            stats = self._route_stats(route)
+            if entry is None:
+                stats['misses'] += 1
+                return None, self._version
+            self._entries.move_to_end(key)
+            stats['hits'] += 1
+            return entry, self._version
+
+    def set(self, route: str, key: Hashable, body: bytes, mimetype: str,
+            tags: Iterable[str], version: int) -> bool:
+        size = len(body) + ENTRY_OVERHEAD
+        with self._lock:
+            if version != self._version or size > self.max_bytes:
+                return False
+            self._remove(key)
+            entry = CachedResponse(route, body, mimetype, frozenset(tags), size)
+            self._entries[key] = entry
+            self._size += size
+            for tag in entry.tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            self._route_stats(route)['stores'] += 1
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._route_stats(self._entries[oldest].route)['evictions'] += 1
+                self._remove(oldest)
+            return True
+
+    def _remove(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._size -= entry.size
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+        return entry
+
+    def invalidate(self, tags: Optional[Iterable[str]]) -> None:
+        """Сбрасывает ответы с любым из тегов; None - все ответы"""
+        with self._lock:
+            self._version += 1
+            if tags is None:
+                for entry in self._entries.values():
+                    self._route_stats(entry.route)['invalidations'] += 1
+                self._entries.clear()
+                self._by_tag.clear()
+                self._size = 0
+                return
+            for tag in tags:
+                for key in list(self._by_tag.get(tag, ())):
+                    entry = self._remove(key)
+                    self._route_stats(entry.route)['invalidations'] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            routes = {}
+            for route, stats in self._routes.items():
+                lookups = stats['hits'] + stats['misses']
+                routes[route] = dict(stats, hit_rate=round(stats['hits'] / lookups, 3) if lookups else 0)
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'tags': len(self._by_tag),
+                'routes': routes,
+            }